@@ -390,74 +390,19 @@ print("\n" + "="*50)
 print(" LIMPIEZA DE TEXTO (tu tarea del documento)")
 print("="*50)
 
-import re
-import nltk
-from nltk.corpus import stopwords
+# La limpieza vive en normalizacion.py y es la MISMA que usa la API (app.py),
+# así el modelo recibe en producción el mismo tipo de texto con el que se entrenó.
+# Stopwords: lista de NLTK (español + inglés) guardada en stopwords.txt
+from normalizacion import limpiar_muchos
 
-# Descargar stopwords
-nltk.download('stopwords')
-stop_words_es = set(stopwords.words('spanish'))
-stop_words_en = set(stopwords.words('english'))
-
-print(" Stopwords descargadas")
-
-def limpiar_texto(texto):
-    """
-    Aplica todas las limpiezas del documento:
-    1. Lowercase
-    2. Eliminar URLs
-    3. Eliminar emojis/menciones/hashtags
-    4. Eliminar stopwords
-    5. Corrección básica de ruido
-    """
-    if not isinstance(texto, str):
-        return ""
-
-    # 1. Minúsculas
-    texto = texto.lower()
-
-    # 2. Eliminar URLs
-    texto = re.sub(r'https?://\S+|www\.\S+', ' ', texto)
-
-    # 3. Eliminar menciones (@usuario) y hashtags
-    texto = re.sub(r'@\w+', ' ', texto)
-    texto = re.sub(r'#\w+', ' ', texto)
-
-    # 4. Eliminar emojis
-    emoji_pattern = re.compile("["
-        u"\U0001F600-\U0001F64F"  # emoticons
-        u"\U0001F300-\U0001F5FF"  # symbols & pictographs
-        u"\U0001F680-\U0001F6FF"  # transport & map symbols
-        u"\U0001F1E0-\U0001F1FF"  # flags
-        "]+", flags=re.UNICODE)
-    texto = emoji_pattern.sub(r' ', texto)
-
-    # 5. Eliminar caracteres especiales (mantener letras, números, espacios básicos)
-    texto = re.sub(r'[^\w\sáéíóúñü]', ' ', texto)
-
-    # 6. Eliminar números (opcional - descomenta si quieres)
-    # texto = re.sub(r'\d+', ' ', texto)
-
-    # 7. Eliminar espacios múltiples
-    texto = re.sub(r'\s+', ' ', texto).strip()
-
-    # 8. Eliminar stopwords
-    palabras = texto.split()
-    palabras_filtradas = []
-    for palabra in palabras:
-        if palabra not in stop_words_es and palabra not in stop_words_en and len(palabra) > 2:
-            palabras_filtradas.append(palabra)
-
-    texto = ' '.join(palabras_filtradas)
-
-    return texto
+print(" Stopwords cargadas")
 
 # Aplicar limpieza a una muestra primero (para probar)
 print("\n🔧 Aplicando limpieza de texto...")
 print("   (Esto puede tomar varios minutos para 115k filas)")
 
 # Aplicar a TODO el dataset
-df['text_clean'] = df['text'].apply(limpiar_texto)
+df['text_clean'] = limpiar_muchos(df['text'])
 
 print(" Texto limpiado")
 
@@ -749,11 +694,22 @@ model.save('modelo_final_sentiment.h5')
 with open('tokenizer.pickle', 'wb') as handle:
     pickle.dump(tokenizer, handle, protocol=pickle.HIGHEST_PROTOCOL)
 
+# Vocabulario compacto que usa la API (solo las MAX_NB_WORDS palabras del modelo)
+from vocabulario import exportar_vocabulario
+compacto = exportar_vocabulario(tokenizer, 'vocabulario.json')
+
+# Artefacto para servir con np.memmap (pesos crudos + vocabulario + manifest)
+from artefacto import exportar_desde_h5
+version_artefacto = exportar_desde_h5('modelo_final_sentiment.h5', compacto, 'modelo_artefacto',
+                                      MAX_SEQUENCE_LENGTH, {0: 'Negative', 1: 'Neutral', 2: 'Positive'})
+
 print("\n✅ ENTREGABLES GENERADOS (Cristian):")
 print("   1. 'modelo_final_sentiment.h5' (El modelo entrenado)")
 print("   2. 'pesos_modelo_bilstm.h5' (Solo los mejores pesos)")
 print("   3. 'tokenizer.pickle' (Diccionario para traducir texto a números)")
-print("   4. 'graficas_entrenamiento.png' (Reporte visual)")
+print("   4. 'vocabulario.json' (Vocabulario compacto para la API)")
+print(f"   5. 'modelo_artefacto/' (Pesos para np.memmap, versión {version_artefacto})")
+print("   6. 'graficas_entrenamiento.png' (Reporte visual)")
 
 # ==============================================================================
 # PARTE DE SANTY - EVALUACIÓN Y PRODUCCIÓN
@@ -761,8 +717,6 @@ print("   4. 'graficas_entrenamiento.png' (Reporte visual)")
 import pandas as pd
 import numpy as np
 import pickle
-import re
-import nltk
 import matplotlib.pyplot as plt
 import seaborn as sns
 from tensorflow.keras.models import load_model
@@ -770,11 +724,6 @@ from tensorflow.keras.preprocessing.sequence import pad_sequences
 from sklearn.metrics import classification_report, confusion_matrix
 
 # Configuración inicial
-nltk.download('stopwords')
-from nltk.corpus import stopwords
-stop_words_es = set(stopwords.words('spanish'))
-stop_words_en = set(stopwords.words('english'))
-
 MAX_SEQUENCE_LENGTH = 100
 categorias = {0: 'Negativo', 1: 'Neutro', 2: 'Positivo'}
 
@@ -789,18 +738,8 @@ try:
 except Exception as e:
     print(f"❌ Error al cargar archivos: {e}. Verifica los nombres en el panel izquierdo.")
 
-def limpiar_texto_santy(texto):
-    if not isinstance(texto, str): return ""
-    texto = texto.lower()
-    # Eliminar URLs, menciones y hashtags según el requerimiento del proyecto
-    texto = re.sub(r'https?://\S+|www\.\S+', ' ', texto)
-    texto = re.sub(r'@\w+|#\w+', ' ', texto)
-    # Eliminar caracteres especiales y emojis
-    texto = re.sub(r'[^\w\sáéíóúñü]', ' ', texto)
-    texto = re.sub(r'\s+', ' ', texto).strip()
-    # Filtrado de stopwords (español e inglés)
-    palabras = [p for p in texto.split() if p not in stop_words_es and p not in stop_words_en and len(p) > 2]
-    return ' '.join(palabras)
+# Misma limpieza del entrenamiento y de la API (normalizacion.py)
+from normalizacion import limpiar_texto as limpiar_texto_santy
 
 print("🧪 Generando métricas de evaluación...")
 
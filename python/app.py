@@ -1,90 +1,525 @@
 
 import os
-import re
-import sys
-import pickle
+import math
 import traceback
 import numpy as np
-import tensorflow as tf
-from flask import Flask, request, jsonify
-from tensorflow.keras.preprocessing.sequence import pad_sequences
+from flask import Flask, Response, g, request, jsonify, stream_with_context
 from werkzeug.exceptions import BadRequest
 from dotenv import load_dotenv
 from bluesky_service import BlueskyService
+from reddit_praw_service import REDDIT_COMMENT_MAX, REDDIT_COMMENT_MAX_DEPTH, RedditPrawService
+from limites_upstream import ErrorUpstream, planificador
+from micro_batcher import MicroBatcher
+from inference import crear_motor, huella_modelo, predecir_por_cubetas
+from cache import LRUCache, RedisPredictionCache
+from vocabulario import cargar_tokenizer
+from artefacto import abrir_artefacto, es_artefacto
+from modelo_rapido import RUTA_BILSTM, RUTA_RAPIDA, ClasificadorRapido
+from registro_modelos import ModeloCargado, RegistroModelos
+from normalizacion import limpiar_texto, limpiar_muchos
+from serializacion import ProveedorJSON, desde_json, linea_ndjson
 
 # Cargar variables de entorno desde .env
 load_dotenv()
 
 # --- Configuración Inicial ---
 MAX_SEQUENCE_LENGTH = 100
-MODEL_PATH = 'modelo_final_sentiment.h5'
 TOKENIZER_PATH = 'tokenizer.pickle'
+# Vocabulario compacto exportado desde el pickle con vocabulario.py
+VOCAB_PATH = 'vocabulario.json'
+
+# Artefacto del modelo (ver artefacto.py): pesos para np.memmap, vocabulario y
+# manifest con MAX_SEQUENCE_LENGTH, categorías y versión
+MODEL_ARTIFACT_DIR = os.getenv('MODEL_ARTIFACT_DIR', 'modelo_artefacto')
+
+# Backend de inferencia: 'keras' (TensorFlow completo), 'tflite', 'onnx' o
+# 'numpy' (BiLSTM en NumPy puro, sin TensorFlow: abre el artefacto si existe
+# o lee el mismo .h5). Los archivos .tflite / .onnx se generan con convert_model.py
+INFERENCE_BACKEND = os.getenv('INFERENCE_BACKEND', 'keras').lower()
+MODEL_PATHS = {
+    'keras': 'modelo_final_sentiment.h5',
+    'tflite': 'modelo_final_sentiment.tflite',
+    'onnx': 'modelo_final_sentiment.onnx',
+    'numpy': MODEL_ARTIFACT_DIR if es_artefacto(MODEL_ARTIFACT_DIR) else 'modelo_final_sentiment.h5',
+}
+MODEL_PATH = MODEL_PATHS.get(INFERENCE_BACKEND, MODEL_PATHS['keras'])
+
+# Registro de modelos (ver registro_modelos.py): si existe MODELS_DIR (una
+# subcarpeta por versión) las versiones nuevas se cargan en segundo plano, con
+# warmup, y reemplazan a la activa sin reiniciar; si no, se vigilan los
+# archivos de MODEL_PATH y se recargan cuando cambian. MODEL_CANARY_PERCENT
+# manda ese porcentaje de las solicitudes a la versión candidata (la más nueva)
+# hasta promoverla escribiendo su nombre en MODELS_DIR/ACTIVE.
+MODELS_DIR = os.getenv('MODELS_DIR', 'modelos')
+MODEL_WATCH_INTERVAL = float(os.getenv('MODEL_WATCH_INTERVAL', 10))
+MODEL_CANARY_PERCENT = float(os.getenv('MODEL_CANARY_PERCENT', 0))
+MODEL_DRAIN_TIMEOUT = float(os.getenv('MODEL_DRAIN_TIMEOUT', 120))
+MODEL_RETRY_SECONDS = float(os.getenv('MODEL_RETRY_SECONDS', 60))
+MODEL_WARMUP_BATCHES = int(os.getenv('MODEL_WARMUP_BATCHES', 3))
+
+# Clasificador rápido de primera etapa (ver modelo_rapido.py y
+# destilar_modelo_rapido.py): responde los textos en los que su confianza llega
+# al umbral y deriva el resto al BiLSTM. FAST_PATH_THRESHOLD reemplaza el
+# umbral ajustado al destilar. Con MODELS_DIR cada versión trae el suyo.
+FAST_PATH_ENABLED = os.getenv('FAST_PATH_ENABLED', '1') == '1'
+FAST_PATH_MODEL = os.getenv('FAST_PATH_MODEL', 'modelo_rapido.npz')
+FAST_PATH_THRESHOLD = float(os.environ['FAST_PATH_THRESHOLD']) if os.getenv('FAST_PATH_THRESHOLD') else None
+
+# Número máximo de textos aceptados por /predict/batch en una sola solicitud
+PREDICT_MAX_BATCH_SIZE = int(os.getenv('PREDICT_MAX_BATCH_SIZE', 256))
+
+# /predict/stream lee y puntúa las líneas de a PREDICT_STREAM_BATCH_SIZE, así
+# la memoria usada no depende del tamaño total del cuerpo
+PREDICT_STREAM_BATCH_SIZE = int(os.getenv('PREDICT_STREAM_BATCH_SIZE', 512))
+
+# Cubetas de largo (en tokens) para la inferencia por lotes: cada grupo se
+# ejecuta con su propio ancho de padding en vez de MAX_SEQUENCE_LENGTH
+LENGTH_BUCKETS = [int(valor) for valor in os.getenv('LENGTH_BUCKETS', '16,32,64,100').split(',') if valor.strip()]
+
+# Micro-batching de /predict: las solicitudes concurrentes se agrupan en un
+# solo lote al llegar a MICROBATCH_MAX_SIZE textos o tras MICROBATCH_MAX_WAIT_MS
+MICROBATCH_ENABLED = os.getenv('MICROBATCH_ENABLED', '1') == '1'
+MICROBATCH_MAX_SIZE = int(os.getenv('MICROBATCH_MAX_SIZE', 64))
+MICROBATCH_MAX_WAIT_MS = float(os.getenv('MICROBATCH_MAX_WAIT_MS', 5))
+
+# Máximo de páginas (parámetro 'pages') que sigue una ruta de Bluesky
+BLUESKY_MAX_PAGES = int(os.getenv('BLUESKY_MAX_PAGES', 20))
+
+# Máximo de autores por solicitud en /bluesky/authors (se consultan en paralelo)
+BLUESKY_MAX_AUTHORS = int(os.getenv('BLUESKY_MAX_AUTHORS', 25))
+
+# Comentarios de Reddit por llamada al modelo al puntuar un árbol completo
+REDDIT_SCORE_BATCH_SIZE = int(os.getenv('REDDIT_SCORE_BATCH_SIZE', 128))
+
+# Máximo de posts por solicitud en las rutas de Reddit (límite de un listado)
+REDDIT_MAX_LIMIT = 100
+
+# Con gunicorn --preload (ver gunicorn.conf.py) este módulo se importa una sola
+# vez en el proceso maestro y los workers comparten por copy-on-write los pesos
+# y el vocabulario. Lo que no sobrevive a un fork (sesiones del runtime de
+# inferencia, hilos, conexiones) se crea en cada worker en preparar_worker().
+APP_PRELOADED = os.getenv('APP_PRELOADED') == '1'
 
 # Diccionario para mapear el resultado
 CATEGORIAS = {0: 'Negative', 1: 'Neutral', 2: 'Positive'}
 
+# Caché de predicciones por texto limpio (0 = desactivada). Con
+# PREDICTION_CACHE_REDIS_URL se comparte entre los workers de gunicorn.
+PREDICTION_CACHE_SIZE = int(os.getenv('PREDICTION_CACHE_SIZE', 10000))
+PREDICTION_CACHE_TTL = float(os.getenv('PREDICTION_CACHE_TTL', 3600))
+PREDICTION_CACHE_REDIS_URL = os.getenv('PREDICTION_CACHE_REDIS_URL')
+
 # --- Creación de la App Flask ---
 app = Flask(__name__)
+# jsonify con orjson (si está instalado) y soporte para Publicacion
+app.json = ProveedorJSON(app)
 
 # --- Inicializar servicio de Bluesky ---
 bluesky_service = BlueskyService()
 
-# --- Carga de Modelo y Tokenizer (al inicio, a nivel de módulo) ---
-loading_error = None
-model = None
-tokenizer = None
+# --- Inicializar servicio de Reddit (el cliente de PRAW se crea en la primera consulta) ---
+reddit_service = RedditPrawService()
 
+# --- Registro de modelos (ver registro_modelos.py) ---
+def cargar_clasificador_rapido(ruta, version):
+    """
+    Clasificador rápido de una versión (opcional: sin él todo va al BiLSTM).
+    """
+    if not FAST_PATH_ENABLED or not os.path.exists(ruta):
+        return None
+    try:
+        rapido = ClasificadorRapido.cargar(ruta, FAST_PATH_THRESHOLD)
+    except Exception as e:
+        app.logger.warning(f"⚠️ No se pudo cargar el clasificador rápido {ruta} ({e}); todo se puntúa con el BiLSTM.")
+        return None
+    if rapido.version_bilstm and rapido.version_bilstm != version:
+        app.logger.warning(f"⚠️ El clasificador rápido {ruta} se destiló del modelo {rapido.version_bilstm}, "
+                           f"no de {version}: conviene volver a destilarlo.")
+    return rapido
+
+def cargar_version(nombre, ruta):
+    """
+    Cargar una versión: una carpeta de MODELS_DIR (artefacto, o los archivos
+    del backend con su vocabulario) o, sin MODELS_DIR, MODEL_PATH con el
+    vocabulario y el clasificador rápido de este directorio.
+    """
+    if MODELS_DIR_ACTIVO:
+        carpeta = ruta
+        if INFERENCE_BACKEND == 'numpy' and es_artefacto(carpeta):
+            ruta_modelo = carpeta
+        else:
+            # El backend numpy sin artefacto lee el .h5
+            ruta_modelo = os.path.join(carpeta, MODEL_PATHS['keras'] if INFERENCE_BACKEND == 'numpy' else MODEL_PATH)
+        ruta_vocab = os.path.join(carpeta, VOCAB_PATH)
+        ruta_pickle = os.path.join(carpeta, TOKENIZER_PATH)
+        ruta_rapido = os.path.join(carpeta, os.path.basename(FAST_PATH_MODEL))
+    else:
+        ruta_modelo, ruta_vocab, ruta_pickle, ruta_rapido = ruta, VOCAB_PATH, TOKENIZER_PATH, FAST_PATH_MODEL
+    artefacto = abrir_artefacto(ruta_modelo) if es_artefacto(ruta_modelo) else None
+
+    if not os.path.exists(ruta_modelo):
+        raise FileNotFoundError(f"El archivo del modelo no se encontró en la ruta: {ruta_modelo}")
+    if artefacto is None and not os.path.exists(ruta_vocab) and not os.path.exists(ruta_pickle):
+        raise FileNotFoundError(f"No se encontró el vocabulario ({ruta_vocab}) ni el tokenizer ({ruta_pickle})")
+
+    if artefacto is not None:
+        # El artefacto trae su propio vocabulario, largo de secuencia y categorías
+        if artefacto.categorias != CATEGORIAS:
+            raise ValueError(f"Las categorías del artefacto {artefacto.categorias} no coinciden con las de la API {CATEGORIAS}")
+        max_sequence_length = artefacto.max_sequence_length
+        version = artefacto.version
+        tokenizer = artefacto.tokenizer()
+    else:
+        max_sequence_length = MAX_SEQUENCE_LENGTH
+        version = huella_modelo(ruta_modelo)
+        # Tokenizador compacto (mismas secuencias que el Tokenizer de Keras); si
+        # falta vocabulario.json se convierte tokenizer.pickle en memoria
+        tokenizer = cargar_tokenizer(ruta_vocab, ruta_pickle)
+    if not MODELS_DIR_ACTIVO:
+        version = os.getenv('MODEL_VERSION') or version
+
+    # Motor de inferencia del backend elegido (ver inference.py)
+    motor = crear_motor(INFERENCE_BACKEND, ruta_modelo, max_sequence_length)
+    return ModeloCargado(nombre, version, motor, tokenizer, max_sequence_length,
+                         cuantizacion=artefacto.cuantizacion if artefacto is not None else None,
+                         rapido=cargar_clasificador_rapido(ruta_rapido, version))
+
+MODELS_DIR_ACTIVO = os.path.isdir(MODELS_DIR)
+registro = RegistroModelos(
+    cargar_version,
+    directorio=MODELS_DIR if MODELS_DIR_ACTIVO else None,
+    ruta_unica=MODEL_PATH,
+    archivos_vigilados=[MODEL_PATH, VOCAB_PATH, TOKENIZER_PATH, FAST_PATH_MODEL],
+    cubetas=LENGTH_BUCKETS,
+    canary_percent=MODEL_CANARY_PERCENT,
+    intervalo=MODEL_WATCH_INTERVAL,
+    drain_timeout=MODEL_DRAIN_TIMEOUT,
+    reintento=MODEL_RETRY_SECONDS,
+    lotes_warmup=MODEL_WARMUP_BATCHES,
+)
+
+# Primera carga en el arranque (sin warmup en el maestro de gunicorn --preload).
+# Si falla, la app arranca igual: las rutas de predicción responden 503 y el
+# registro sigue reintentando en segundo plano.
 app.logger.info("Iniciando la carga del modelo y el tokenizer...")
-try:
-    if not os.path.exists(MODEL_PATH):
-        raise FileNotFoundError(f"El archivo del modelo no se encontró en la ruta: {MODEL_PATH}")
-    if not os.path.exists(TOKENIZER_PATH):
-        raise FileNotFoundError(f"El archivo del tokenizer no se encontró en la ruta: {TOKENIZER_PATH}")
-
-    model = tf.keras.models.load_model(MODEL_PATH)
-    with open(TOKENIZER_PATH, 'rb') as handle:
-        tokenizer = pickle.load(handle)
-    
-    app.logger.info("✅ Modelo y tokenizer cargados correctamente.")
-
-except Exception as e:
-    # Guardar el error y el traceback completo para un diagnóstico detallado
-    error_trace = traceback.format_exc()
-    loading_error = e
-    app.logger.error(f"❌ Error crítico al cargar los archivos: {e}")
-    app.logger.error(f"Traceback completo:\n{error_trace}")
-    model = None
-    tokenizer = None
-
-# --- Fail-Fast: Salir si los modelos no se cargaron ---
-if loading_error is not None:
-    app.logger.critical("La aplicación no puede iniciar porque los modelos no se cargaron. Saliendo.")
-    sys.exit(1) # Salir con un código de error
-
-# --- Función de Limpieza de Texto ---
-def limpiar_texto(texto):
-    if not isinstance(texto, str):
-        return ""
-    texto = texto.lower()
-    texto = re.sub(r'https?://\S+|www\.\S+', ' ', texto)
-    texto = re.sub(r'@\w+|#\w+', ' ', texto)
-    texto = re.sub(r'[^\w\s]', ' ', texto)
-    texto = re.sub(r'\s+', ' ', texto).strip()
-    return texto
+registro.revisar(calentar=not APP_PRELOADED)
+if registro.activo is not None:
+    app.logger.info(f"✅ Modelo y tokenizer cargados correctamente (backend: {INFERENCE_BACKEND}, "
+                    f"versión: {registro.activo.version}).")
+else:
+    app.logger.error(f"❌ No se pudo cargar ninguna versión del modelo ({registro.ultimo_error}); "
+                     f"se reintenta en segundo plano.")
+
+def iniciar_en_segundo_plano():
+    """
+    Hilos de fondo del proceso que atiende las solicitudes: vigilancia de
+    versiones e inicio de sesión en Bluesky. Es el único lugar que los
+    arranca; ambos se inician una sola vez por proceso.
+    """
+    registro.iniciar_vigilancia()
+    bluesky_service.iniciar_sesion_en_segundo_plano()
+
+if not APP_PRELOADED:
+    iniciar_en_segundo_plano()
+
+def preparar_worker():
+    """
+    Llamado por gunicorn en cada worker recién creado cuando la app se
+    precargó en el maestro: crea la sesión de inferencia de este proceso
+    (warmup) y arranca los hilos de fondo.
+    """
+    registro.calentar_cargados()
+    iniciar_en_segundo_plano()
+    app.logger.info(f"✅ Worker {os.getpid()} listo (backend: {INFERENCE_BACKEND}).")
+
+def modelo_actual():
+    """
+    Versión del modelo (ModeloCargado) que atiende esta solicitud, o None si
+    no hay ninguna cargada. Se elige una vez por solicitud (la activa o, con
+    MODEL_CANARY_PERCENT, a veces la candidata) y se sigue usando hasta que la
+    solicitud termina aunque mientras tanto se active otra versión.
+    """
+    if 'modelo' not in g:
+        g.modelo = registro.adquirir()
+    return g.modelo
+
+@app.after_request
+def cabecera_version_modelo(respuesta):
+    modelo = g.get('modelo')
+    if modelo is not None:
+        respuesta.headers['X-Model-Version'] = modelo.version
+    return respuesta
+
+@app.teardown_request
+def liberar_modelo(_error=None):
+    # En las respuestas en streaming (stream_with_context) corre al terminar el generador
+    modelo = g.pop('modelo', None)
+    if modelo is not None:
+        registro.liberar(modelo)
+
+# --- Caché de Predicciones ---
+def crear_cache_predicciones():
+    if PREDICTION_CACHE_SIZE <= 0:
+        return None
+    if PREDICTION_CACHE_REDIS_URL:
+        try:
+            return RedisPredictionCache(PREDICTION_CACHE_REDIS_URL, ttl=PREDICTION_CACHE_TTL)
+        except ImportError as e:
+            app.logger.warning(f"⚠️ Caché Redis no disponible ({e}); se usa la caché en memoria.")
+    return LRUCache(max_size=PREDICTION_CACHE_SIZE, ttl=PREDICTION_CACHE_TTL)
+
+prediction_cache = crear_cache_predicciones()
+
+def clave_cache(modelo, texto_limpio):
+    # La versión del modelo separa la caché de cada versión desplegada
+    return f"{modelo.version}:{texto_limpio}"
+
+# --- Predicción por Lotes ---
+def predecir_lote(textos, modelo=None):
+    """
+    Limpia (ver normalizacion.py), tokeniza y aplica padding a todos los
+    textos juntos y ejecuta una sola llamada al modelo sobre la matriz completa.
+    modelo es la versión a usar (por defecto la de la solicitud actual).
+
+    Devuelve (probabilidades, rutas): un arreglo (n, 3) en el mismo orden de
+    entrada y, por texto, qué modelo lo respondió (RUTA_RAPIDA o RUTA_BILSTM).
+    """
+    return predecir_limpios(limpiar_muchos(textos), modelo)
+
+def filtrar_ruta_rapida(modelo, textos_limpios):
+    """
+    Devolver (probabilidades, confiables) del clasificador rápido de la
+    versión; sin él, ningún texto es confiable.
+    """
+    if modelo.rapido is None:
+        return None, np.zeros(len(textos_limpios), dtype=bool)
+    return modelo.rapido.filtrar(textos_limpios)
+
+def predecir_limpios(textos_limpios, modelo=None, consultar_cache=True, usar_ruta_rapida=True):
+    """
+    Igual que predecir_lote() pero con textos ya limpios.
+
+    Primero responde el clasificador rápido los textos en los que está
+    seguro; del resto, los que están en la caché (o repetidos dentro del
+    lote) no se tokenizan ni pasan por el BiLSTM. La caché guarda solo
+    resultados del BiLSTM. Con consultar_cache=False / usar_ruta_rapida=False
+    se salta ese paso (el llamador ya lo hizo).
+    """
+    modelo = modelo or modelo_actual()
+    probabilidades = np.empty((len(textos_limpios), len(CATEGORIAS)), dtype=np.float32)
+    rutas = [RUTA_BILSTM] * len(textos_limpios)
+    if usar_ruta_rapida:
+        rapidas, confiables = filtrar_ruta_rapida(modelo, textos_limpios)
+    else:
+        rapidas, confiables = None, np.zeros(len(textos_limpios), dtype=bool)
+    pendientes = {}
+    for i, texto_limpio in enumerate(textos_limpios):
+        if confiables[i]:
+            probabilidades[i] = rapidas[i]
+            rutas[i] = RUTA_RAPIDA
+            continue
+        if texto_limpio in pendientes:
+            pendientes[texto_limpio].append(i)
+            continue
+        guardado = None
+        if consultar_cache and prediction_cache is not None:
+            guardado = prediction_cache.get(clave_cache(modelo, texto_limpio))
+        if guardado is not None:
+            probabilidades[i] = guardado
+        else:
+            pendientes[texto_limpio] = [i]
+
+    if pendientes:
+        unicos = list(pendientes)
+        secuencias = modelo.tokenizer.texts_to_sequences(unicos)
+        # Agrupar por largo real para no recorrer pasos de padding innecesarios
+        salida = predecir_por_cubetas(modelo.motor, secuencias, LENGTH_BUCKETS, modelo.max_sequence_length)
+        for texto_limpio, fila in zip(unicos, salida):
+            probabilidades[pendientes[texto_limpio]] = fila
+            if prediction_cache is not None:
+                prediction_cache.set(clave_cache(modelo, texto_limpio), fila)
+
+    return probabilidades, rutas
+
+def formatear_prediccion(prediccion_probs, ruta):
+    """
+    Convertir un vector de probabilidades al formato de respuesta de la API;
+    route indica qué modelo respondió ("fast" o "bilstm").
+    """
+    indice_predicho = int(np.argmax(prediccion_probs))
+    return {
+        "sentiment": CATEGORIAS[indice_predicho],
+        "confidence": float(prediccion_probs[indice_predicho]),
+        "probabilities": [
+            {"name": CATEGORIAS[indice], "value": float(prediccion_probs[indice])}
+            for indice in sorted(CATEGORIAS)
+        ],
+        "route": ruta
+    }
+
+def leer_elemento(elemento, descripcion):
+    """
+    Devolver (id, texto) de un elemento de entrada: un texto o un objeto
+    {"id": ..., "text": ...}. Lanza BadRequest si el texto no es válido.
+    """
+    if isinstance(elemento, dict):
+        id_cliente = elemento.get('id')
+        texto = elemento.get('text')
+    else:
+        id_cliente = None
+        texto = elemento
+    if not isinstance(texto, str) or not texto.strip():
+        raise BadRequest(f"{descripcion} debe ser un texto no vacío.")
+    return id_cliente, texto
+
+def resultado_con_id(id_cliente, prediccion_probs, ruta):
+    resultado = formatear_prediccion(prediccion_probs, ruta)
+    if id_cliente is not None:
+        resultado = {"id": id_cliente, **resultado}
+    return resultado
+
+def modelo_no_disponible():
+    """
+    Respuesta de error cuando no hay ninguna versión del modelo cargada
+    (503: el registro sigue intentando cargarla en segundo plano).
+    """
+    error_details = {
+        "message": "El modelo no está disponible o no se pudo cargar.",
+        "root_cause": registro.ultimo_error or "Error desconocido post-inicio."
+    }
+    app.logger.warning(f"Intento de predicción fallido: {error_details['message']}")
+    return jsonify({"status": "error", "error": error_details}), 503
+
+def parametros_paginacion():
+    """
+    Leer 'pages' y 'cursor' de la query de una ruta de Bluesky.
+    Devuelve (pages, cursor); pages se acota a 1..BLUESKY_MAX_PAGES.
+    """
+    pages = min(max(int(request.args.get('pages', 1)), 1), BLUESKY_MAX_PAGES)
+    return pages, request.args.get('cursor') or None
+
+def recolectar_paginas(paginas, puntuar=False):
+    """
+    Juntar los posts de un generador de páginas de BlueskyService.
+    Con puntuar=True cada página se puntúa apenas llega, mientras la
+    siguiente se sigue descargando en segundo plano.
+    Devuelve (posts, cursor de la página siguiente).
+    """
+    posts = []
+    cursor = None
+    for pagina in paginas:
+        if puntuar:
+            puntuar_posts(pagina.posts)
+        posts.extend(pagina.posts)
+        cursor = pagina.cursor
+    return posts, cursor
+
+def puntuar_posts(posts):
+    """
+    Agregar sentiment/confidence/probabilities a cada Publicacion con una
+    sola llamada al modelo para todos sus textos.
+    """
+    if not posts:
+        return posts
+    prediccion_probs, rutas = predecir_lote([post.text or '' for post in posts])
+    for post, probs, ruta in zip(posts, prediccion_probs, rutas):
+        post.puntuar(formatear_prediccion(probs, ruta))
+    return posts
+
+def resumen_sentimiento(posts):
+    """
+    Distribución agregada de sentimiento de posts ya puntuados.
+    """
+    total = len(posts)
+    conteo = {nombre: 0 for nombre in CATEGORIAS.values()}
+    suma_probs = {nombre: 0.0 for nombre in CATEGORIAS.values()}
+    for post in posts:
+        conteo[post.sentiment] += 1
+        for probabilidad in post.probabilities:
+            suma_probs[probabilidad['name']] += probabilidad['value']
+
+    return {
+        "total": total,
+        "counts": conteo,
+        "distribution": {nombre: round(conteo[nombre] / total, 4) if total else 0.0 for nombre in conteo},
+        "mean_probabilities": {nombre: round(suma_probs[nombre] / total, 4) if total else 0.0 for nombre in suma_probs},
+    }
+
+def resumen_por_hilo(comentarios):
+    """
+    Distribución de sentimiento de cada hilo (comentario de primer nivel y
+    sus respuestas), de mayor a menor cantidad de comentarios.
+    """
+    hilos = {}
+    for comentario in comentarios:
+        hilos.setdefault(comentario.thread_id, []).append(comentario)
+    return [
+        {"thread_id": hilo, "summary": resumen_sentimiento(del_hilo)}
+        for hilo, del_hilo in sorted(hilos.items(), key=lambda par: len(par[1]), reverse=True)
+    ]
+
+def limites_arbol_reddit():
+    """
+    max_depth y max_comments del query string acotados a
+    [0, REDDIT_COMMENT_MAX_DEPTH] y [0, REDDIT_COMMENT_MAX]; None si no vienen
+    (se usan esos mismos topes).
+    """
+    max_depth = request.args.get('max_depth', type=int)
+    max_comments = request.args.get('max_comments', type=int)
+    if max_depth is not None:
+        max_depth = min(max(max_depth, 0), REDDIT_COMMENT_MAX_DEPTH)
+    if max_comments is not None:
+        max_comments = min(max(max_comments, 0), REDDIT_COMMENT_MAX)
+    return max_depth, max_comments
+
+
+def respuesta_upstream(error):
+    """
+    Respuesta cuando el upstream limita o falla: 429 si es rate limit,
+    503 si está caído o el circuit breaker está abierto, con Retry-After.
+    """
+    app.logger.warning(f"Upstream no disponible: {error}")
+    status = 429 if error.motivo == 'rate_limited' else 503
+    respuesta = jsonify({
+        "error": "El servicio externo no está disponible en este momento, intenta de nuevo más tarde.",
+        "reason": error.motivo,
+        "retry_after": math.ceil(error.retry_after) if error.retry_after else None
+    })
+    if error.retry_after:
+        respuesta.headers['Retry-After'] = str(math.ceil(error.retry_after))
+    return respuesta, status
+
+# --- Agrupador de solicitudes concurrentes de /predict ---
+def predecir_encolados(elementos):
+    """
+    elementos: (versión del modelo, texto limpio). Un lote puede mezclar
+    versiones (canary o un cambio de versión en curso): se agrupa por versión.
+    /predict ya probó el clasificador rápido y la caché antes de encolar.
+    """
+    probabilidades = np.empty((len(elementos), len(CATEGORIAS)), dtype=np.float32)
+    grupos = {}
+    for i, (modelo, _) in enumerate(elementos):
+        grupos.setdefault(id(modelo), (modelo, []))[1].append(i)
+    for modelo, indices in grupos.values():
+        salida, _ = predecir_limpios([elementos[i][1] for i in indices], modelo,
+                                     consultar_cache=False, usar_ruta_rapida=False)
+        probabilidades[indices] = salida
+    return probabilidades
+
+micro_batcher = MicroBatcher(
+    predecir_encolados,
+    max_batch_size=MICROBATCH_MAX_SIZE,
+    max_wait_ms=MICROBATCH_MAX_WAIT_MS
+) if MICROBATCH_ENABLED else None
 
 # --- Endpoints de la API ---
 
 @app.route('/predict', methods=['POST'])
 def predict():
-    # Este chequeo es ahora redundante si la app sale al fallar,
-    # pero se mantiene como una capa extra de seguridad.
-    if model is None or tokenizer is None:
-        error_details = {
-            "message": "El modelo no está disponible o no se pudo cargar.",
-            "root_cause": str(loading_error) if loading_error else "Error desconocido post-inicio."
-        }
-        app.logger.warning(f"Intento de predicción fallido: {error_details['message']}")
-        return jsonify({"status": "error", "error": error_details}), 500
+    # Sin ninguna versión cargada (el registro sigue reintentando) se responde 503
+    modelo = modelo_actual()
+    if modelo is None:
+        return modelo_no_disponible()
 
     try:
         data = request.get_json()
@@ -95,34 +530,23 @@ def predict():
         if not texto_original.strip():
             raise BadRequest("El campo 'text' no puede estar vacío.")
 
-        # 1. Limpiar el texto
+        # Limpieza, tokenización y predicción; si el clasificador rápido está
+        # seguro responde él, un acierto de caché responde sin pasar por el
+        # BiLSTM, y con micro-batching el texto se agrupa con las solicitudes
+        # concurrentes en una sola llamada
         texto_limpio = limpiar_texto(texto_original)
+        rapidas, confiables = filtrar_ruta_rapida(modelo, [texto_limpio])
+        if confiables[0]:
+            return jsonify(formatear_prediccion(rapidas[0], RUTA_RAPIDA))
 
-        # 2. Tokenizar y aplicar padding
-        secuencia = tokenizer.texts_to_sequences([texto_limpio])
-        secuencia_pad = pad_sequences(secuencia, maxlen=MAX_SEQUENCE_LENGTH)
-
-        # 3. Realizar la predicción
-        prediccion_probs = model.predict(secuencia_pad)[0]
-        
-        # 4. Formatear la respuesta
-        indice_predicho = np.argmax(prediccion_probs)
-        sentimiento_predicho = CATEGORIAS[indice_predicho]
-        confianza = float(prediccion_probs[indice_predicho])
-
-        probabilidades = [
-            {"name": "Negative", "value": float(prediccion_probs[0])},
-            {"name": "Neutral", "value": float(prediccion_probs[1])},
-            {"name": "Positive", "value": float(prediccion_probs[2])}
-        ]
+        prediccion_probs = prediction_cache.get(clave_cache(modelo, texto_limpio)) if prediction_cache is not None else None
+        if prediccion_probs is None:
+            if micro_batcher is not None:
+                prediccion_probs = micro_batcher.predict((modelo, texto_limpio))
+            else:
+                prediccion_probs = predecir_limpios([texto_limpio], modelo, usar_ruta_rapida=False)[0][0]
 
-        response = {
-            "sentiment": sentimiento_predicho,
-            "confidence": confianza,
-            "probabilities": probabilidades
-        }
-        
-        return jsonify(response)
+        return jsonify(formatear_prediccion(prediccion_probs, RUTA_BILSTM))
 
     except BadRequest as e:
         app.logger.error(f"Error de BadRequest en /predict: {e}")
@@ -132,95 +556,538 @@ def predict():
         app.logger.error(f"Error inesperado durante la predicción: {e}\n{error_trace}")
         return jsonify({"status": "error", "error": {"message": "Ocurrió un error interno al procesar la solicitud."}}), 500
 
+@app.route('/predict/batch', methods=['POST'])
+def predict_batch():
+    """
+    Predecir el sentimiento de varios textos con una sola llamada al modelo.
+
+    Cuerpo JSON:
+    - texts: lista de textos, o de objetos {"id": ..., "text": ...}
+      (máximo PREDICT_MAX_BATCH_SIZE elementos)
+
+    Los resultados se devuelven en el mismo orden de entrada; si un elemento
+    trae "id", se copia en su resultado.
+    """
+    if modelo_actual() is None:
+        return modelo_no_disponible()
+
+    try:
+        data = request.get_json()
+        if not data or 'texts' not in data:
+            raise BadRequest("El campo 'texts' es requerido en el JSON.")
+
+        elementos = data['texts']
+        if not isinstance(elementos, list) or not elementos:
+            raise BadRequest("El campo 'texts' debe ser una lista no vacía.")
+        if len(elementos) > PREDICT_MAX_BATCH_SIZE:
+            raise BadRequest(f"El campo 'texts' admite como máximo {PREDICT_MAX_BATCH_SIZE} elementos.")
+
+        ids = []
+        textos = []
+        for i, elemento in enumerate(elementos):
+            id_cliente, texto = leer_elemento(elemento, f"El elemento {i} de 'texts'")
+            ids.append(id_cliente)
+            textos.append(texto)
+
+        prediccion_probs, rutas = predecir_lote(textos)
+        resultados = [resultado_con_id(id_cliente, probs, ruta)
+                      for id_cliente, probs, ruta in zip(ids, prediccion_probs, rutas)]
+
+        return jsonify({"results": resultados, "count": len(resultados)})
+
+    except BadRequest as e:
+        app.logger.error(f"Error de BadRequest en /predict/batch: {e}")
+        return jsonify({"status": "error", "error": {"message": str(e)}}), 400
+    except Exception as e:
+        error_trace = traceback.format_exc()
+        app.logger.error(f"Error inesperado durante la predicción por lotes: {e}\n{error_trace}")
+        return jsonify({"status": "error", "error": {"message": "Ocurrió un error interno al procesar la solicitud."}}), 500
+
+@app.route('/predict/stream', methods=['POST'])
+def predict_stream():
+    """
+    Puntuar un cuerpo NDJSON de cualquier tamaño (se puede enviar con
+    Transfer-Encoding: chunked).
+
+    Cada línea es un texto JSON ("...") o un objeto {"id": ..., "text": ...}.
+    El cuerpo se lee de a PREDICT_STREAM_BATCH_SIZE líneas y los resultados
+    de cada lote se envían en cuanto terminan, como NDJSON y en el mismo orden
+    de entrada. Una línea inválida produce una línea de error con su número
+    ("line") sin cortar el resto; la última línea es un resumen con
+    "status": "done".
+    """
+    if modelo_actual() is None:
+        return modelo_no_disponible()
+
+    def puntuar(pendientes):
+        # pendientes: (id, texto) o (numero_linea, mensaje_error) si falló
+        textos = [texto for es_error, _, texto in pendientes if not es_error]
+        predicciones = zip(*predecir_lote(textos)) if textos else iter(())
+        salida = []
+        for es_error, clave, valor in pendientes:
+            if es_error:
+                salida.append(linea_ndjson({"line": clave, "status": "error", "error": {"message": valor}}))
+            else:
+                salida.append(linea_ndjson(resultado_con_id(clave, *next(predicciones))))
+        return b''.join(salida)
+
+    def generar():
+        pendientes = []
+        procesados = 0
+        errores = 0
+        try:
+            for numero_linea, linea in enumerate(request.stream, start=1):
+                linea = linea.strip()
+                if not linea:
+                    continue
+                try:
+                    id_cliente, texto = leer_elemento(desde_json(linea), f"La línea {numero_linea}")
+                    pendientes.append((False, id_cliente, texto))
+                except (ValueError, BadRequest) as e:
+                    mensaje = e.description if isinstance(e, BadRequest) else f"La línea {numero_linea} no es JSON válido."
+                    pendientes.append((True, numero_linea, mensaje))
+                    errores += 1
+
+                if len(pendientes) >= PREDICT_STREAM_BATCH_SIZE:
+                    yield puntuar(pendientes)
+                    procesados += len(pendientes)
+                    pendientes = []
+
+            if pendientes:
+                yield puntuar(pendientes)
+                procesados += len(pendientes)
+
+            yield linea_ndjson({"status": "done", "count": procesados - errores, "errors": errores})
+
+        except Exception as e:
+            # Las cabeceras ya se enviaron: el error va como última línea
+            error_trace = traceback.format_exc()
+            app.logger.error(f"Error inesperado durante la predicción en streaming: {e}\n{error_trace}")
+            yield linea_ndjson({"status": "error", "error": {"message": "Ocurrió un error interno al procesar la solicitud."}})
+
+    return Response(stream_with_context(generar()), mimetype='application/x-ndjson')
+
 @app.route('/health', methods=['GET'])
 def health_check():
+    # 503 mientras no haya ninguna versión del modelo cargada
+    activo = registro.activo
     return jsonify({
-        "status": "ok",
+        "status": "ok" if activo is not None else "degraded",
         "service_status": "Running",
-        "model_status": "Loaded Successfully"
-    })
+        "model_status": "Loaded Successfully" if activo is not None else "Not Loaded",
+        "inference_backend": INFERENCE_BACKEND,
+        "model_version": activo.version if activo is not None else None,
+        "model_quantization": activo.cuantizacion if activo is not None else None,
+        "models": registro.estadisticas(),
+        "prediction_cache": prediction_cache.estadisticas() if prediction_cache is not None else {"enabled": False},
+        "fast_path": activo.rapido.estadisticas() if activo is not None and activo.rapido is not None else {"enabled": False},
+        "micro_batching": micro_batcher.estadisticas() if micro_batcher is not None else {"enabled": False},
+        "bluesky_cache": bluesky_service.cache.estadisticas() if bluesky_service.cache is not None else {"enabled": False},
+        "reddit_cache": reddit_service.cache.estadisticas() if reddit_service.cache is not None else {"enabled": False}
+    }), 200 if activo is not None else 503
+
+@app.route('/metrics/upstream', methods=['GET'])
+def upstream_metrics():
+    """
+    Estado del planificador de solicitudes a Bluesky y Reddit: token bucket,
+    límites anunciados por el upstream, reintentos y circuit breaker.
+    """
+    return jsonify({"upstreams": planificador.estadisticas()})
+
+# --- Endpoints de Reddit ---
+
+@app.route('/reddit/subreddit/<subreddit>', methods=['GET'], defaults={'puntuar': False})
+@app.route('/reddit/subreddit/<subreddit>/sentiment', methods=['GET'], defaults={'puntuar': True})
+def get_reddit_subreddit(subreddit, puntuar):
+    """
+    Obtener posts de un subreddit.
+    En /reddit/subreddit/<subreddit>/sentiment cada post trae además su
+    sentimiento (una sola llamada al modelo) y la respuesta incluye la
+    distribución agregada ("summary").
+    
+    Parámetros query:
+    - sort: hot, new o top (default: hot)
+    - limit: número de posts (default: 10, máximo: 100)
+    
+    Ejemplo: /reddit/subreddit/python/sentiment?sort=new&limit=50
+    """
+    if puntuar and modelo_actual() is None:
+        return modelo_no_disponible()
+
+    try:
+        sort = request.args.get('sort', 'hot')
+        limit = min(int(request.args.get('limit', 10)), REDDIT_MAX_LIMIT)
+        
+        posts = reddit_service.get_subreddit_posts(subreddit, sort=sort, limit=limit)
+        if not posts:
+            return jsonify({"error": f"No se pudieron obtener posts de r/{subreddit}"}), 400
+        
+        respuesta = {"subreddit": subreddit, "sort": sort, "posts": posts, "count": len(posts)}
+        if puntuar:
+            puntuar_posts(posts)
+            respuesta["summary"] = resumen_sentimiento(posts)
+        return jsonify(respuesta)
+    
+    except ErrorUpstream as e:
+        return respuesta_upstream(e)
+    except ValueError:
+        return jsonify({"error": "El parámetro 'limit' debe ser un número."}), 400
+    except Exception as e:
+        app.logger.error(f"Error obteniendo subreddit: {e}\n{traceback.format_exc()}")
+        return jsonify({"error": "Error al obtener posts del subreddit"}), 500
+
+@app.route('/reddit/search', methods=['GET'], defaults={'puntuar': False})
+@app.route('/reddit/search/sentiment', methods=['GET'], defaults={'puntuar': True})
+def search_reddit(puntuar):
+    """
+    Buscar posts de la última semana en un subreddit.
+    En /reddit/search/sentiment cada post trae además su sentimiento y la
+    respuesta incluye la distribución agregada ("summary").
+    
+    Parámetros query:
+    - q: término de búsqueda (requerido)
+    - subreddit: subreddit donde buscar (default: all)
+    - limit: número de resultados (default: 10, máximo: 100)
+    
+    Ejemplo: /reddit/search/sentiment?q=python&subreddit=programming&limit=25
+    """
+    if puntuar and modelo_actual() is None:
+        return modelo_no_disponible()
+
+    try:
+        query = request.args.get('q')
+        subreddit = request.args.get('subreddit', 'all')
+        limit = min(int(request.args.get('limit', 10)), REDDIT_MAX_LIMIT)
+        
+        if not query:
+            return jsonify({"error": "El parámetro 'q' (query) es requerido."}), 400
+        
+        posts = reddit_service.search_posts(subreddit, query, limit=limit)
+        if not posts:
+            return jsonify({"error": f"No se encontraron posts con '{query}' en r/{subreddit}"}), 400
+        
+        respuesta = {"query": query, "subreddit": subreddit, "posts": posts, "count": len(posts)}
+        if puntuar:
+            puntuar_posts(posts)
+            respuesta["summary"] = resumen_sentimiento(posts)
+        return jsonify(respuesta)
+    
+    except ErrorUpstream as e:
+        return respuesta_upstream(e)
+    except ValueError:
+        return jsonify({"error": "El parámetro 'limit' debe ser un número."}), 400
+    except Exception as e:
+        app.logger.error(f"Error buscando en Reddit: {e}\n{traceback.format_exc()}")
+        return jsonify({"error": "Error al buscar en Reddit"}), 500
+
+@app.route('/reddit/post', methods=['GET'], defaults={'puntuar': False})
+@app.route('/reddit/post/sentiment', methods=['GET'], defaults={'puntuar': True})
+def get_reddit_post(puntuar):
+    """
+    Obtener un post de Reddit con sus comentarios.
+    En /reddit/post/sentiment el post y todos sus comentarios se puntúan en
+    una sola llamada al modelo; "summary" es la distribución de los
+    comentarios y, con full_tree, "threads" la de cada hilo.
+    
+    Parámetros query:
+    - url: URL del post (requerido)
+    - full_tree: 1 para recorrer el árbol completo de comentarios (default: 0,
+      primeros 10 comentarios de primer nivel)
+    - max_depth, max_comments: límites del árbol completo (como máximo REDDIT_COMMENT_MAX_DEPTH y REDDIT_COMMENT_MAX)
+    
+    Ejemplo: /reddit/post/sentiment?url=https://www.reddit.com/r/python/comments/abc123/titulo/&full_tree=1
+    """
+    if puntuar and modelo_actual() is None:
+        return modelo_no_disponible()
+
+    try:
+        post_url = request.args.get('url', '').strip()
+        full_tree = request.args.get('full_tree', '0') == '1'
+        max_depth, max_comments = limites_arbol_reddit()
+        
+        if not post_url:
+            return jsonify({"error": "El parámetro 'url' es requerido."}), 400
+        
+        resultado = reddit_service.get_post_from_url(
+            post_url, full_tree=full_tree, max_depth=max_depth, max_comments=max_comments
+        )
+        if not resultado:
+            return jsonify({"error": "No se pudo obtener el post de Reddit"}), 400
+        
+        comentarios = resultado['comments']
+        respuesta = dict(resultado, count=len(comentarios))
+        if puntuar:
+            puntuar_posts([resultado['post']] + comentarios)
+            respuesta["summary"] = resumen_sentimiento(comentarios)
+            if full_tree:
+                respuesta["threads"] = resumen_por_hilo(comentarios)
+        return jsonify(respuesta)
+    
+    except ErrorUpstream as e:
+        return respuesta_upstream(e)
+    except Exception as e:
+        app.logger.error(f"Error obteniendo post de Reddit: {e}\n{traceback.format_exc()}")
+        return jsonify({"error": "Error al obtener el post de Reddit"}), 500
+
+@app.route('/reddit/post/comments/sentiment', methods=['GET'])
+def reddit_comment_tree_sentiment():
+    """
+    Recorrer el árbol completo de comentarios de un post de Reddit y
+    puntuarlo a medida que llega, como NDJSON:
+    - una línea {"type": "post", ...} con el post ya puntuado
+    - líneas {"type": "comment", ...} por cada comentario, enviadas por lotes
+      de REDDIT_SCORE_BATCH_SIZE (una llamada al modelo por lote) mientras
+      los "MoreComments" se siguen expandiendo en paralelo
+    - una última línea {"type": "summary", "status": "done"} con la
+      distribución total ("summary") y la de cada hilo ("threads")
+    
+    Parámetros query:
+    - url: URL del post (obligatorio)
+    - max_depth: profundidad máxima (0 = solo comentarios de primer nivel; como máximo REDDIT_COMMENT_MAX_DEPTH)
+    - max_comments: tope de comentarios (como máximo REDDIT_COMMENT_MAX)
+    
+    Ejemplo: /reddit/post/comments/sentiment?url=https://www.reddit.com/r/python/comments/abc123/titulo/
+    """
+    if modelo_actual() is None:
+        return modelo_no_disponible()
+
+    post_url = request.args.get('url', '').strip()
+    if not post_url:
+        return jsonify({"error": "El parámetro 'url' es obligatorio."}), 400
+
+    try:
+        max_depth, max_comments = limites_arbol_reddit()
+        resultado = reddit_service.comment_tree(post_url, max_depth=max_depth, max_comments=max_comments)
+    except ErrorUpstream as e:
+        return respuesta_upstream(e)
+
+    if resultado is None:
+        return jsonify({"error": "No se pudo obtener el post de Reddit"}), 400
+    post, arbol = resultado
+
+    def generar():
+        try:
+            puntuar_posts([post])
+            yield linea_ndjson(dict(post.a_dict(), type="post"))
+
+            comentarios = []
+            for lote in arbol.lotes(REDDIT_SCORE_BATCH_SIZE):
+                puntuar_posts(lote)
+                comentarios.extend(lote)
+                yield b''.join(linea_ndjson(dict(comentario.a_dict(), type="comment")) for comentario in lote)
+
+            yield linea_ndjson({
+                "type": "summary",
+                "status": "done",
+                "count": len(comentarios),
+                "truncated": arbol.truncated,
+                "failed_expansions": arbol.failed_expansions,
+                "summary": resumen_sentimiento(comentarios),
+                "threads": resumen_por_hilo(comentarios),
+            })
+
+        except Exception as e:
+            # Las cabeceras ya se enviaron: el error va como última línea
+            app.logger.error(f"Error recorriendo comentarios de Reddit: {e}\n{traceback.format_exc()}")
+            yield linea_ndjson({"type": "summary", "status": "error",
+                           "error": {"message": "Ocurrió un error al obtener los comentarios."}})
+
+    return Response(stream_with_context(generar()), mimetype='application/x-ndjson')
 
 # --- Endpoints de Bluesky ---
 
-@app.route('/bluesky/feed', methods=['GET'])
-def get_bluesky_feed():
+@app.route('/bluesky/feed', methods=['GET'], defaults={'puntuar': False})
+@app.route('/bluesky/feed/sentiment', methods=['GET'], defaults={'puntuar': True})
+def get_bluesky_feed(puntuar):
     """
     Obtener el feed de Bluesky del usuario conectado.
+    En /bluesky/feed/sentiment cada post trae además su sentimiento y la
+    respuesta incluye la distribución agregada ("summary").
     
     Parámetros query:
-    - limit: número de posts (default: 10, máximo: 50)
+    - limit: número de posts por página (default: 10, máximo: 50)
+    - pages: páginas a recorrer siguiendo el cursor (default: 1, máximo: BLUESKY_MAX_PAGES)
+    - cursor: continuar desde el cursor devuelto por una llamada anterior
     
-    Ejemplo: /bluesky/feed?limit=5
+    Ejemplo: /bluesky/feed?limit=50&pages=4
     """
+    if puntuar and modelo_actual() is None:
+        return modelo_no_disponible()
+
     try:
         limit = min(int(request.args.get('limit', 10)), 50)
+        pages, cursor = parametros_paginacion()
         
-        posts = bluesky_service.get_feed(limit=limit)
+        paginado = pages > 1 or cursor is not None
+        if paginado:
+            posts, cursor = recolectar_paginas(
+                bluesky_service.iter_feed(max_posts=limit * pages, page_size=limit, cursor=cursor),
+                puntuar=puntuar
+            )
+        else:
+            posts = bluesky_service.get_feed(limit=limit)
+            if puntuar:
+                puntuar_posts(posts)
         
         if not posts:
             return jsonify({"error": "No se pudieron obtener posts del feed de Bluesky"}), 400
         
-        return jsonify({"posts": posts, "count": len(posts)})
+        respuesta = {"posts": posts, "count": len(posts)}
+        if puntuar:
+            respuesta["summary"] = resumen_sentimiento(posts)
+        if paginado:
+            respuesta["cursor"] = cursor
+        return jsonify(respuesta)
     
+    except ErrorUpstream as e:
+        return respuesta_upstream(e)
     except ValueError:
-        return jsonify({"error": "El parámetro 'limit' debe ser un número."}), 400
+        return jsonify({"error": "Los parámetros 'limit' y 'pages' deben ser números."}), 400
     except Exception as e:
         app.logger.error(f"Error obteniendo feed de Bluesky: {e}\n{traceback.format_exc()}")
         return jsonify({"error": "Error al obtener el feed de Bluesky"}), 500
 
-@app.route('/bluesky/search', methods=['GET'])
-def search_bluesky():
+@app.route('/bluesky/search', methods=['GET'], defaults={'puntuar': False})
+@app.route('/bluesky/search/sentiment', methods=['GET'], defaults={'puntuar': True})
+def search_bluesky(puntuar):
     """
     Buscar posts en Bluesky.
+    En /bluesky/search/sentiment cada post trae además su sentimiento y la
+    respuesta incluye la distribución agregada ("summary").
     
     Parámetros query (requeridos):
     - q: término de búsqueda
-    - limit: número de resultados (default: 10, máximo: 50)
+    - limit: número de resultados por página (default: 10, máximo: 50)
+    - pages: páginas a recorrer siguiendo el cursor (default: 1, máximo: BLUESKY_MAX_PAGES)
+    - cursor: continuar desde el cursor devuelto por una llamada anterior
     
-    Ejemplo: /bluesky/search?q=python&limit=5
+    Ejemplo: /bluesky/search?q=python&limit=50&pages=10
     """
+    if puntuar and modelo_actual() is None:
+        return modelo_no_disponible()
+
     try:
         query = request.args.get('q')
         limit = min(int(request.args.get('limit', 10)), 50)
+        pages, cursor = parametros_paginacion()
         
         if not query:
             return jsonify({"error": "El parámetro 'q' (query) es requerido."}), 400
         
-        posts = bluesky_service.search_posts(query, limit=limit)
+        paginado = pages > 1 or cursor is not None
+        if paginado:
+            posts, cursor = recolectar_paginas(
+                bluesky_service.iter_search_posts(query, max_posts=limit * pages, page_size=limit, cursor=cursor),
+                puntuar=puntuar
+            )
+        else:
+            posts = bluesky_service.search_posts(query, limit=limit)
+            if puntuar:
+                puntuar_posts(posts)
         
         if not posts:
             return jsonify({"error": f"No se encontraron posts con '{query}'"}), 400
         
-        return jsonify({"query": query, "posts": posts, "count": len(posts)})
+        respuesta = {"query": query, "posts": posts, "count": len(posts)}
+        if puntuar:
+            respuesta["summary"] = resumen_sentimiento(posts)
+        if paginado:
+            respuesta["cursor"] = cursor
+        return jsonify(respuesta)
     
+    except ErrorUpstream as e:
+        return respuesta_upstream(e)
     except ValueError:
-        return jsonify({"error": "El parámetro 'limit' debe ser un número."}), 400
+        return jsonify({"error": "Los parámetros 'limit' y 'pages' deben ser números."}), 400
     except Exception as e:
         app.logger.error(f"Error buscando en Bluesky: {e}\n{traceback.format_exc()}")
         return jsonify({"error": "Error al buscar en Bluesky"}), 500
 
-@app.route('/bluesky/author/<author>', methods=['GET'])
-def get_bluesky_author(author):
+@app.route('/bluesky/authors', methods=['GET'])
+def get_bluesky_authors():
+    """
+    Obtener posts de varios autores de Bluesky en paralelo.
+
+    Parámetros query:
+    - actors: handles separados por comas (máximo BLUESKY_MAX_AUTHORS)
+    - limit: número de posts por autor (default: 10, máximo: 50)
+
+    Ejemplo: /bluesky/authors?actors=a.bsky.social,b.bsky.social&limit=5
+    """
+    try:
+        actors = [actor.strip() for actor in request.args.get('actors', '').split(',') if actor.strip()]
+        limit = min(int(request.args.get('limit', 10)), 50)
+
+        if not actors:
+            return jsonify({"error": "El parámetro 'actors' es requerido."}), 400
+        if len(actors) > BLUESKY_MAX_AUTHORS:
+            return jsonify({"error": f"El parámetro 'actors' admite como máximo {BLUESKY_MAX_AUTHORS} autores."}), 400
+
+        posts_por_autor = bluesky_service.get_posts_by_authors(actors, limit=limit)
+
+        if not any(posts_por_autor.values()):
+            return jsonify({"error": "No se pudieron obtener posts de los autores"}), 400
+
+        return jsonify({
+            "authors": posts_por_autor,
+            "count": sum(len(posts) for posts in posts_por_autor.values())
+        })
+
+    except ErrorUpstream as e:
+        return respuesta_upstream(e)
+    except ValueError:
+        return jsonify({"error": "El parámetro 'limit' debe ser un número."}), 400
+    except Exception as e:
+        app.logger.error(f"Error obteniendo posts de varios autores: {e}\n{traceback.format_exc()}")
+        return jsonify({"error": "Error al obtener posts de los autores"}), 500
+
+@app.route('/bluesky/author/<author>', methods=['GET'], defaults={'puntuar': False})
+@app.route('/bluesky/author/<author>/sentiment', methods=['GET'], defaults={'puntuar': True})
+def get_bluesky_author(author, puntuar):
     """
     Obtener posts de un autor en Bluesky.
+    En /bluesky/author/<author>/sentiment cada post trae además su
+    sentimiento y la respuesta incluye la distribución agregada ("summary").
     
     Parámetros query:
-    - limit: número de posts (default: 10, máximo: 50)
+    - limit: número de posts por página (default: 10, máximo: 50)
+    - pages: páginas a recorrer siguiendo el cursor (default: 1, máximo: BLUESKY_MAX_PAGES)
+    - cursor: continuar desde el cursor devuelto por una llamada anterior
     
-    Ejemplo: /bluesky/author/user.bsky.social?limit=5
+    Ejemplo: /bluesky/author/user.bsky.social?limit=50&pages=3
     """
+    if puntuar and modelo_actual() is None:
+        return modelo_no_disponible()
+
     try:
         limit = min(int(request.args.get('limit', 10)), 50)
+        pages, cursor = parametros_paginacion()
         
-        posts = bluesky_service.get_posts_by_author(author, limit=limit)
+        paginado = pages > 1 or cursor is not None
+        if paginado:
+            posts, cursor = recolectar_paginas(
+                bluesky_service.iter_posts_by_author(author, max_posts=limit * pages, page_size=limit, cursor=cursor),
+                puntuar=puntuar
+            )
+        else:
+            posts = bluesky_service.get_posts_by_author(author, limit=limit)
+            if puntuar:
+                puntuar_posts(posts)
         
         if not posts:
             return jsonify({"error": f"No se pudieron obtener posts de @{author}"}), 400
         
-        return jsonify({"author": author, "posts": posts, "count": len(posts)})
+        respuesta = {"author": author, "posts": posts, "count": len(posts)}
+        if puntuar:
+            respuesta["summary"] = resumen_sentimiento(posts)
+        if paginado:
+            respuesta["cursor"] = cursor
+        return jsonify(respuesta)
     
+    except ErrorUpstream as e:
+        return respuesta_upstream(e)
     except ValueError:
-        return jsonify({"error": "El parámetro 'limit' debe ser un número."}), 400
+        return jsonify({"error": "Los parámetros 'limit' y 'pages' deben ser números."}), 400
     except Exception as e:
         app.logger.error(f"Error obteniendo posts del autor: {e}\n{traceback.format_exc()}")
         return jsonify({"error": "Error al obtener posts del autor"}), 500
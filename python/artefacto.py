@@ -0,0 +1,276 @@
+"""
+Artefacto del modelo para servir con memoria compartida
+
+Un directorio con:
+    manifest.json   formato, MAX_SEQUENCE_LENGTH, categorías, capas del modelo,
+                    tabla de arreglos (offset, forma) y hash de versión
+    weights.bin     pesos little-endian uno tras otro, cada uno alineado a 64
+                    bytes: float32, o float16 / int8 en un artefacto
+                    cuantizado (cuantizar_modelo.py)
+    vocab.txt       una palabra por línea: la línea i tiene el índice i + 1
+
+Los pesos se abren con np.memmap y cada arreglo es una vista de solo lectura
+sobre el archivo: abrir el artefacto no copia nada, el sistema operativo trae
+las páginas a medida que se usan y todos los procesos que lo abren (workers de
+gunicorn, réplicas en el mismo nodo) comparten esas páginas.
+
+Exportar desde el .h5 y el vocabulario actuales (no necesita TensorFlow):
+    python artefacto.py --model modelo_final_sentiment.h5 --vocab vocabulario.json --output modelo_artefacto
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+from typing import Dict, List, NamedTuple, Optional
+
+import numpy as np
+
+from vocabulario import CompactTokenizer, cargar_tokenizer
+
+ARTIFACT_FORMAT_VERSION = 2
+# La versión 1 no guarda el dtype de cada arreglo (todos son float32)
+FORMATOS_SOPORTADOS = (1, 2)
+MANIFEST = 'manifest.json'
+WEIGHTS = 'weights.bin'
+VOCAB = 'vocab.txt'
+ALINEACION = 64
+DTYPE = '<f4'
+DTYPE_FLOAT16 = '<f2'
+DTYPE_INT8 = 'i1'
+CUANTIZACIONES = ('int8', 'float16')
+
+CATEGORIAS_POR_DEFECTO = {0: 'Negative', 1: 'Neutral', 2: 'Positive'}
+
+
+class MatrizInt8:
+    """
+    Matriz int8 con una escala float32 por fila (eje 0) o por columna (eje 1):
+    el valor real es valores * escala. Ambas son vistas sobre el np.memmap.
+    """
+
+    __slots__ = ('valores', 'escala', 'eje')
+
+    def __init__(self, valores: np.ndarray, escala: np.ndarray, eje: int):
+        self.valores = valores
+        self.escala = escala
+        self.eje = eje
+
+    @property
+    def shape(self):
+        return self.valores.shape
+
+    def __getitem__(self, indices) -> np.ndarray:
+        # Búsqueda de filas (Embedding): solo se convierten las filas pedidas
+        filas = self.valores[indices].astype(np.float32)
+        if self.eje == 0:
+            return filas * self.escala[indices][..., None]
+        return filas * self.escala
+
+    def a_float32(self) -> np.ndarray:
+        escala = self.escala[:, None] if self.eje == 0 else self.escala
+        return self.valores.astype(np.float32) * escala
+
+
+def cuantizar_int8(arreglo: np.ndarray, eje: int):
+    """
+    Cuantización simétrica: una escala por fila (eje 0) o por columna (eje 1)
+    con el máximo absoluto llevado a 127. Devuelve (valores int8, escala).
+    """
+    arreglo = np.asarray(arreglo, dtype=np.float32)
+    maximo = np.abs(arreglo).max(axis=1 - eje)
+    escala = np.where(maximo > 0, maximo / 127.0, 1.0).astype(np.float32)
+    divisor = escala[:, None] if eje == 0 else escala
+    valores = np.clip(np.rint(arreglo / divisor), -127, 127).astype(np.int8)
+    return valores, escala
+
+
+class Artefacto(NamedTuple):
+    directorio: str
+    version: str
+    max_sequence_length: int
+    categorias: Dict[int, str]
+    # capa -> arreglos en el orden de layer.weights (vistas sobre el memmap;
+    # MatrizInt8 para las matrices cuantizadas a int8)
+    pesos: Dict[str, List[np.ndarray]]
+    # (class_name, config) de cada capa, como en el model_config del .h5
+    configs: List
+    manifest: Dict
+
+    @property
+    def cuantizacion(self) -> Optional[str]:
+        return self.manifest.get('quantization')
+
+    def tokenizer(self) -> CompactTokenizer:
+        """
+        Tokenizador compacto a partir de vocab.txt.
+        """
+        vocab = self.manifest['vocab']
+        with open(os.path.join(self.directorio, VOCAB), 'r', encoding='utf-8') as handle:
+            palabras = handle.read().split('\n')
+        palabras = palabras[:vocab['size']]
+        return CompactTokenizer(palabras, vocab['num_words'], vocab['oov_index'],
+                                filters=vocab['filters'], lower=vocab['lower'], split=vocab['split'])
+
+
+def es_artefacto(ruta: str) -> bool:
+    return os.path.isfile(os.path.join(ruta, MANIFEST))
+
+
+def exportar_artefacto(directorio: str, pesos: Dict[str, List[np.ndarray]], configs: List,
+                       tokenizer: CompactTokenizer, max_sequence_length: int,
+                       categorias: Dict[int, str] = None, cuantizacion: str = None,
+                       solo_embedding: bool = False) -> str:
+    """
+    Escribir el artefacto y devolver su versión (prefijo del SHA-256 del
+    contenido). El manifest se escribe al final, así un directorio sin
+    manifest nunca se confunde con un artefacto completo.
+
+    cuantizacion ('int8' o 'float16') reduce las matrices de pesos: en int8
+    el Embedding lleva una escala por fila y el resto de las matrices una por
+    columna de salida. Los sesgos quedan en float32. Con solo_embedding se
+    cuantiza únicamente el Embedding (casi todo el tamaño del modelo).
+    """
+    if cuantizacion is not None and cuantizacion not in CUANTIZACIONES:
+        raise ValueError(f"Cuantización no soportada: '{cuantizacion}' (opciones: {', '.join(CUANTIZACIONES)})")
+    categorias = categorias or CATEGORIAS_POR_DEFECTO
+    clases = {config.get('name'): clase for clase, config in configs}
+    os.makedirs(directorio, exist_ok=True)
+    digest = hashlib.sha256()
+
+    arreglos = []
+    offset = 0
+    with open(os.path.join(directorio, WEIGHTS), 'wb') as handle:
+        def escribir(datos: bytes) -> int:
+            nonlocal offset
+            relleno = -offset % ALINEACION
+            if relleno:
+                handle.write(b'\0' * relleno)
+                offset += relleno
+            inicio = offset
+            handle.write(datos)
+            digest.update(datos)
+            offset += len(datos)
+            return inicio
+
+        for capa, lista in pesos.items():
+            es_embedding = clases.get(capa) == 'Embedding'
+            cuantizar = cuantizacion is not None and (es_embedding or not solo_embedding)
+            for indice, arreglo in enumerate(lista):
+                entrada = {'layer': capa, 'index': indice, 'shape': list(arreglo.shape)}
+                if cuantizar and arreglo.ndim == 2 and cuantizacion == 'int8':
+                    eje = 0 if es_embedding else 1
+                    valores, escala = cuantizar_int8(arreglo, eje)
+                    entrada['dtype'] = DTYPE_INT8
+                    entrada['offset'] = escribir(valores.tobytes())
+                    entrada['scale_offset'] = escribir(escala.astype(DTYPE).tobytes())
+                    entrada['scale_axis'] = eje
+                else:
+                    dtype = DTYPE_FLOAT16 if cuantizar and arreglo.ndim == 2 else DTYPE
+                    entrada['dtype'] = dtype
+                    entrada['offset'] = escribir(np.ascontiguousarray(arreglo, dtype=dtype).tobytes())
+                arreglos.append(entrada)
+
+    if any('\n' in palabra for palabra in tokenizer.palabras):
+        raise ValueError("El vocabulario tiene palabras con saltos de línea: no se puede guardar en vocab.txt")
+    texto_vocab = '\n'.join(tokenizer.palabras).encode('utf-8')
+    with open(os.path.join(directorio, VOCAB), 'wb') as handle:
+        handle.write(texto_vocab)
+    digest.update(texto_vocab)
+
+    manifest = {
+        'format_version': ARTIFACT_FORMAT_VERSION,
+        'max_sequence_length': max_sequence_length,
+        'categories': {str(indice): nombre for indice, nombre in sorted(categorias.items())},
+        'dtype': DTYPE,
+        'quantization': cuantizacion,
+        'weights_file': WEIGHTS,
+        'arrays': arreglos,
+        'layers': [{'class_name': clase, 'config': config} for clase, config in configs],
+        'vocab': {
+            'file': VOCAB,
+            'size': len(tokenizer.palabras),
+            'num_words': tokenizer.num_words,
+            'oov_index': tokenizer.oov_index,
+            'filters': tokenizer.filters,
+            'lower': tokenizer.lower,
+            'split': tokenizer.split,
+        },
+    }
+    digest.update(json.dumps(manifest, sort_keys=True).encode('utf-8'))
+    manifest['version'] = digest.hexdigest()[:12]
+
+    temporal = os.path.join(directorio, MANIFEST + '.tmp')
+    with open(temporal, 'w', encoding='utf-8') as handle:
+        json.dump(manifest, handle, ensure_ascii=False, indent=1)
+    os.replace(temporal, os.path.join(directorio, MANIFEST))
+    return manifest['version']
+
+
+def exportar_desde_h5(ruta_modelo: str, tokenizer: CompactTokenizer, directorio: str,
+                      max_sequence_length: int, categorias: Dict[int, str] = None,
+                      cuantizacion: str = None, solo_embedding: bool = False) -> str:
+    """
+    Exportar el artefacto a partir de un .h5 de Keras (sin importar TensorFlow).
+    """
+    from bilstm_numpy import leer_pesos_h5
+
+    pesos, configs = leer_pesos_h5(ruta_modelo)
+    return exportar_artefacto(directorio, pesos, configs, tokenizer, max_sequence_length, categorias,
+                              cuantizacion, solo_embedding)
+
+
+def abrir_artefacto(directorio: str) -> Artefacto:
+    """
+    Abrir el artefacto sin copiar los pesos: un solo np.memmap de solo
+    lectura sobre weights.bin y una vista por arreglo (las matrices int8
+    quedan como MatrizInt8, sin descuantizar).
+    """
+    with open(os.path.join(directorio, MANIFEST), 'r', encoding='utf-8') as handle:
+        manifest = json.load(handle)
+    if manifest.get('format_version') not in FORMATOS_SOPORTADOS:
+        raise ValueError(f"Versión de artefacto no soportada en {directorio}: {manifest.get('format_version')}")
+
+    mapa = np.memmap(os.path.join(directorio, manifest['weights_file']), dtype=np.uint8, mode='r')
+    pesos: Dict[str, List[np.ndarray]] = {}
+    for arreglo in manifest['arrays']:
+        forma = arreglo['shape']
+        cantidad = int(np.prod(forma, dtype=np.int64))
+        dtype = np.dtype(arreglo.get('dtype', manifest['dtype']))
+        vista = np.frombuffer(mapa, dtype=dtype, count=cantidad, offset=arreglo['offset']).reshape(forma)
+        if 'scale_offset' in arreglo:
+            eje = arreglo['scale_axis']
+            escala = np.frombuffer(mapa, dtype=DTYPE, count=forma[eje], offset=arreglo['scale_offset'])
+            vista = MatrizInt8(vista, escala, eje)
+        pesos.setdefault(arreglo['layer'], []).append(vista)
+
+    return Artefacto(
+        directorio=directorio,
+        version=manifest['version'],
+        max_sequence_length=manifest['max_sequence_length'],
+        categorias={int(indice): nombre for indice, nombre in manifest['categories'].items()},
+        pesos=pesos,
+        configs=[(capa['class_name'], capa['config']) for capa in manifest['layers']],
+        manifest=manifest,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Exportar el modelo como artefacto para np.memmap")
+    parser.add_argument('--model', default='modelo_final_sentiment.h5')
+    parser.add_argument('--vocab', default='vocabulario.json')
+    parser.add_argument('--tokenizer', default='tokenizer.pickle',
+                        help="Se usa si no existe el vocabulario compacto")
+    parser.add_argument('--output', default='modelo_artefacto')
+    parser.add_argument('--max-sequence-length', type=int, default=100)
+    args = parser.parse_args()
+
+    tokenizer = cargar_tokenizer(args.vocab, args.tokenizer)
+    version = exportar_desde_h5(args.model, tokenizer, args.output, args.max_sequence_length)
+    print(f"✅ Artefacto exportado: {args.output} (versión {version}, {len(tokenizer.palabras):,} palabras)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
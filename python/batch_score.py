@@ -0,0 +1,306 @@
+"""
+Puntuación de sentimiento por lotes de un archivo CSV o Parquet
+
+Lee el archivo por bloques (nunca completo en memoria), limpia y tokeniza
+cada bloque repartido en un pool de procesos, ejecuta el modelo en lotes
+grandes y escribe los resultados a medida que terminan:
+- salida .csv: un solo archivo al que se agregan filas
+- salida .parquet: un directorio con un part-NNNNN.parquet por bloque
+
+El avance se guarda en <salida>.progreso.json después de cada bloque; con
+--resume se retoma desde el último bloque completo.
+
+Ejemplos:
+    python batch_score.py --input DATASET_LIMPIO_FINAL.csv --output puntuados.csv
+    python batch_score.py --input posts.parquet --output puntuados.parquet --id-column uri --resume
+    python batch_score.py --input posts.csv --output out.csv --backend onnx --workers 8
+
+Parquet requiere pyarrow (pip install pyarrow).
+"""
+
+import argparse
+import csv
+import json
+import multiprocessing
+import os
+import sys
+import time
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+from inference import BACKENDS, crear_motor, predecir_por_cubetas
+from normalizacion import limpiar_muchos
+from vocabulario import cargar_tokenizer
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+MAX_SEQUENCE_LENGTH = 100
+VOCAB_PATH = 'vocabulario.json'
+TOKENIZER_PATH = 'tokenizer.pickle'
+LENGTH_BUCKETS = (16, 32, 64, 100)
+
+MODELOS_POR_DEFECTO = {
+    'keras': 'modelo_final_sentiment.h5',
+    'tflite': 'modelo_final_sentiment.tflite',
+    'onnx': 'modelo_final_sentiment.onnx',
+    'numpy': 'modelo_final_sentiment.h5',
+}
+
+CATEGORIAS = {0: 'Negative', 1: 'Neutral', 2: 'Positive'}
+
+# Bloques en vuelo en el pool mientras el modelo procesa el actual
+BLOQUES_EN_VUELO = 2
+
+
+def es_parquet(ruta: str) -> bool:
+    return ruta.lower().endswith(('.parquet', '.pq'))
+
+
+# --- Trabajo de los procesos del pool ---
+
+_tokenizer = None
+
+
+def _iniciar_proceso(ruta_vocabulario: str, ruta_pickle: str):
+    global _tokenizer
+    _tokenizer = cargar_tokenizer(ruta_vocabulario, ruta_pickle)
+
+
+def _preparar(textos):
+    """
+    Limpiar y tokenizar una parte del bloque. Devuelve las secuencias
+    concatenadas en un solo arreglo int32 más sus desplazamientos, que se
+    envían de vuelta mucho más rápido que una lista de listas.
+    """
+    secuencias = _tokenizer.texts_to_sequences(limpiar_muchos(textos))
+    largos = np.fromiter((len(secuencia) for secuencia in secuencias), dtype=np.int64, count=len(secuencias))
+    desplazamientos = np.zeros(len(secuencias) + 1, dtype=np.int64)
+    np.cumsum(largos, out=desplazamientos[1:])
+    valores = np.fromiter((indice for secuencia in secuencias for indice in secuencia),
+                          dtype=np.int32, count=int(desplazamientos[-1]))
+    return valores, desplazamientos
+
+
+# --- Lectura por bloques ---
+
+def leer_bloques(ruta: str, columnas, chunk_size: int, saltar_filas: int = 0):
+    """
+    Generar DataFrames de hasta chunk_size filas con las columnas pedidas,
+    omitiendo las primeras saltar_filas filas (para --resume).
+    """
+    if es_parquet(ruta):
+        if not PYARROW_AVAILABLE:
+            raise ImportError("Leer Parquet requiere el paquete 'pyarrow'")
+        archivo = pq.ParquetFile(ruta)
+        pendiente = None
+        for lote in archivo.iter_batches(batch_size=chunk_size, columns=columnas):
+            if saltar_filas:
+                if lote.num_rows <= saltar_filas:
+                    saltar_filas -= lote.num_rows
+                    continue
+                lote = lote.slice(saltar_filas)
+                saltar_filas = 0
+            # iter_batches puede cortar en los límites de row group: se
+            # reagrupa para que cada bloque tenga chunk_size filas
+            tabla = pa.Table.from_batches([lote])
+            pendiente = tabla if pendiente is None else pa.concat_tables([pendiente, tabla])
+            while pendiente.num_rows >= chunk_size:
+                yield pendiente.slice(0, chunk_size).to_pandas()
+                pendiente = pendiente.slice(chunk_size)
+        if pendiente is not None and pendiente.num_rows:
+            yield pendiente.to_pandas()
+    else:
+        yield from pd.read_csv(
+            ruta, usecols=columnas, chunksize=chunk_size, dtype=str, keep_default_na=False,
+            skiprows=range(1, saltar_filas + 1) if saltar_filas else None
+        )
+
+
+# --- Escritura incremental y avance ---
+
+class EscritorResultados:
+    def __init__(self, ruta: str, reanudar_desde: dict = None):
+        """
+        Escribir bloques de resultados en CSV (un archivo) o Parquet (un
+        directorio de partes). Al reanudar, descarta lo que haya quedado
+        escrito después del último bloque registrado en el avance.
+        """
+        self.ruta = ruta
+        self.parquet = es_parquet(ruta)
+        self.bloques = reanudar_desde['chunks'] if reanudar_desde else 0
+
+        if self.parquet:
+            if not PYARROW_AVAILABLE:
+                raise ImportError("Escribir Parquet requiere el paquete 'pyarrow'")
+            os.makedirs(ruta, exist_ok=True)
+            for nombre in os.listdir(ruta):
+                if nombre.startswith('part-') and self._numero_parte(nombre) >= self.bloques:
+                    os.remove(os.path.join(ruta, nombre))
+        elif reanudar_desde:
+            with open(ruta, 'r+b') as handle:
+                handle.truncate(reanudar_desde['bytes'])
+        elif os.path.exists(ruta):
+            os.remove(ruta)
+
+    @staticmethod
+    def _numero_parte(nombre: str) -> int:
+        try:
+            return int(nombre.split('-')[1].split('.')[0])
+        except (IndexError, ValueError):
+            return -1
+
+    def escribir(self, df: pd.DataFrame):
+        if self.parquet:
+            # Se escribe a un temporal y se renombra: una parte existe completa o no existe
+            destino = os.path.join(self.ruta, f'part-{self.bloques:05d}.parquet')
+            df.to_parquet(destino + '.tmp', index=False, engine='pyarrow')
+            os.replace(destino + '.tmp', destino)
+        else:
+            nuevo = not os.path.exists(self.ruta) or os.path.getsize(self.ruta) == 0
+            df.to_csv(self.ruta, mode='a', header=nuevo, index=False, quoting=csv.QUOTE_MINIMAL)
+        self.bloques += 1
+
+    def tamano(self) -> int:
+        return 0 if self.parquet else os.path.getsize(self.ruta)
+
+
+def ruta_avance(ruta_salida: str) -> str:
+    return ruta_salida.rstrip('/\\') + '.progreso.json'
+
+
+def leer_avance(ruta_salida: str, args) -> dict:
+    ruta = ruta_avance(ruta_salida)
+    if not os.path.exists(ruta):
+        return None
+    with open(ruta, 'r', encoding='utf-8') as handle:
+        avance = json.load(handle)
+    if avance.get('input') != os.path.abspath(args.input) or avance.get('chunk_size') != args.chunk_size:
+        raise ValueError(f"{ruta} corresponde a otra ejecución (entrada o --chunk-size distintos)")
+    return avance
+
+
+def guardar_avance(ruta_salida: str, avance: dict):
+    ruta = ruta_avance(ruta_salida)
+    with open(ruta + '.tmp', 'w', encoding='utf-8') as handle:
+        json.dump(avance, handle)
+    os.replace(ruta + '.tmp', ruta)
+
+
+# --- Puntuación ---
+
+def dividir(textos, partes: int):
+    paso = max(1, -(-len(textos) // partes))
+    return [textos[i:i + paso] for i in range(0, len(textos), paso)]
+
+
+def puntuar_bloque(motor, preparados, batch_size: int) -> np.ndarray:
+    secuencias = []
+    for valores, desplazamientos in preparados:
+        secuencias.extend(valores[inicio:fin] for inicio, fin in zip(desplazamientos[:-1], desplazamientos[1:]))
+
+    probabilidades = np.empty((len(secuencias), len(CATEGORIAS)), dtype=np.float32)
+    for inicio in range(0, len(secuencias), batch_size):
+        probabilidades[inicio:inicio + batch_size] = predecir_por_cubetas(
+            motor, secuencias[inicio:inicio + batch_size], LENGTH_BUCKETS, MAX_SEQUENCE_LENGTH
+        )
+    return probabilidades
+
+
+def armar_resultados(df: pd.DataFrame, columnas_salida, probabilidades: np.ndarray) -> pd.DataFrame:
+    resultado = df[columnas_salida].reset_index(drop=True)
+    indices = probabilidades.argmax(axis=1)
+    resultado['sentiment'] = np.array([CATEGORIAS[i] for i in sorted(CATEGORIAS)])[indices]
+    resultado['confidence'] = probabilidades[np.arange(len(indices)), indices]
+    for i in sorted(CATEGORIAS):
+        resultado[f'prob_{CATEGORIAS[i].lower()}'] = probabilidades[:, i]
+    return resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Puntuar el sentimiento de un archivo CSV o Parquet")
+    parser.add_argument('--input', required=True, help="Archivo de entrada (.csv o .parquet)")
+    parser.add_argument('--output', required=True, help="Salida: archivo .csv o directorio .parquet")
+    parser.add_argument('--text-column', default='text', help="Columna con el texto a puntuar")
+    parser.add_argument('--id-column', action='append', default=[],
+                        help="Columna a copiar en la salida (se puede repetir)")
+    parser.add_argument('--backend', choices=BACKENDS, default=os.getenv('INFERENCE_BACKEND', 'keras').lower())
+    parser.add_argument('--model', help="Modelo (por defecto según el backend)")
+    parser.add_argument('--vocab', default=VOCAB_PATH)
+    parser.add_argument('--tokenizer', default=TOKENIZER_PATH,
+                        help="Se usa si no existe el vocabulario compacto")
+    parser.add_argument('--chunk-size', type=int, default=100000, help="Filas leídas y escritas por bloque")
+    parser.add_argument('--batch-size', type=int, default=2048, help="Textos por llamada al modelo")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help="Procesos para limpiar y tokenizar")
+    parser.add_argument('--resume', action='store_true', help="Retomar desde el último bloque completo")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.input):
+        print(f"❌ No se encontró el archivo de entrada: {args.input}")
+        return 1
+    ruta_modelo = args.model or MODELOS_POR_DEFECTO[args.backend]
+    if not os.path.exists(ruta_modelo):
+        print(f"❌ No se encontró el modelo: {ruta_modelo}")
+        return 1
+
+    avance = leer_avance(args.output, args) if args.resume else None
+    if avance:
+        print(f"↩️ Retomando tras {avance['chunks']} bloques ({avance['rows']:,} filas)")
+    else:
+        avance = {'input': os.path.abspath(args.input), 'chunk_size': args.chunk_size,
+                  'chunks': 0, 'rows': 0, 'bytes': 0}
+    escritor = EscritorResultados(args.output, avance if avance['chunks'] else None)
+
+    columnas_salida = [columna for columna in args.id_column if columna != args.text_column]
+    columnas = list(dict.fromkeys(columnas_salida + [args.text_column]))
+
+    # El pool se crea antes de cargar el modelo: los procesos solo necesitan
+    # el vocabulario y no heredan el runtime de inferencia
+    pool = multiprocessing.Pool(args.workers, initializer=_iniciar_proceso,
+                                initargs=(args.vocab, args.tokenizer))
+    try:
+        print(f"🔄 Cargando modelo ({args.backend}): {ruta_modelo}")
+        motor = crear_motor(args.backend, ruta_modelo, MAX_SEQUENCE_LENGTH)
+        motor.warmup()
+
+        inicio = time.perf_counter()
+        filas_nuevas = 0
+        en_vuelo = deque()
+        bloques = leer_bloques(args.input, columnas, args.chunk_size, saltar_filas=avance['rows'])
+
+        def completar_siguiente():
+            nonlocal filas_nuevas
+            df, tarea = en_vuelo.popleft()
+            probabilidades = puntuar_bloque(motor, tarea.get(), args.batch_size)
+            escritor.escribir(armar_resultados(df, columnas_salida, probabilidades))
+            filas_nuevas += len(df)
+            avance.update(chunks=escritor.bloques, rows=avance['rows'] + len(df), bytes=escritor.tamano())
+            guardar_avance(args.output, avance)
+            velocidad = filas_nuevas / (time.perf_counter() - inicio)
+            print(f"   bloque {escritor.bloques}: {avance['rows']:,} filas ({velocidad:,.0f} filas/s)")
+
+        # Mientras el modelo puntúa un bloque, el pool ya prepara los siguientes
+        for df in bloques:
+            textos = df[args.text_column].tolist()
+            en_vuelo.append((df, pool.map_async(_preparar, dividir(textos, args.workers))))
+            if len(en_vuelo) > BLOQUES_EN_VUELO:
+                completar_siguiente()
+        while en_vuelo:
+            completar_siguiente()
+    finally:
+        pool.terminate()
+        pool.join()
+
+    print(f"✅ Listo: {avance['rows']:,} filas en {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
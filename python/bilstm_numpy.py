@@ -0,0 +1,253 @@
+"""
+Implementación en NumPy del grafo de inferencia del modelo BiLSTM
+
+Arquitectura (ver analisis_de_sentimiento_para_redes_sociales.py):
+    Embedding(20000, 100) -> SpatialDropout1D -> Bidirectional(LSTM(64))
+    -> Dense(32, relu) -> Dropout -> Dense(3, softmax)
+
+Los dropouts no hacen nada en inferencia. Los pesos se leen directamente del
+.h5 de Keras, así que servir con este motor no importa TensorFlow.
+"""
+
+import json
+from typing import Dict, List
+
+import numpy as np
+
+
+def _sigmoid(x: np.ndarray) -> np.ndarray:
+    # Forma estable de 1 / (1 + exp(-x)), sin overflow para x muy negativos
+    return 0.5 * (1.0 + np.tanh(0.5 * x))
+
+
+ACTIVACIONES = {
+    'sigmoid': _sigmoid,
+    'tanh': np.tanh,
+}
+
+
+def _leer_config(valor) -> Dict:
+    if isinstance(valor, bytes):
+        valor = valor.decode('utf-8')
+    return json.loads(valor)
+
+
+def _decodificar(nombre) -> str:
+    return nombre.decode('utf-8') if isinstance(nombre, bytes) else nombre
+
+
+def _a_float32(arreglo) -> np.ndarray:
+    """
+    Matriz float32 para los productos del grafo. Las vistas float32 del
+    artefacto se usan tal cual (sin copia); las cuantizadas (float16 o
+    MatrizInt8) se expanden al armar la red.
+    """
+    if hasattr(arreglo, 'a_float32'):
+        return arreglo.a_float32()
+    return np.asarray(arreglo, dtype=np.float32)
+
+
+def leer_pesos_h5(ruta: str):
+    """
+    Leer pesos y configuración de capas desde un .h5 guardado con model.save().
+
+    Devuelve (pesos, configs): pesos es un dict capa -> lista de arreglos en el
+    orden de layer.weights, y configs una lista de (class_name, config) en el
+    orden del modelo. Funciona con archivos de Keras 2 y de Keras 3.
+    """
+    import h5py
+
+    with h5py.File(ruta, 'r') as archivo:
+        config_modelo = _leer_config(archivo.attrs['model_config'])
+        grupo = archivo['model_weights'] if 'model_weights' in archivo else archivo
+
+        pesos = {}
+        for nombre_capa in grupo.attrs['layer_names']:
+            nombre_capa = _decodificar(nombre_capa)
+            capa = grupo[nombre_capa]
+            pesos[nombre_capa] = [
+                np.asarray(capa[_decodificar(nombre)], dtype=np.float32)
+                for nombre in capa.attrs['weight_names']
+            ]
+
+    configs = [(capa['class_name'], capa['config']) for capa in config_modelo['config']['layers']]
+    return pesos, configs
+
+
+class _LSTM:
+    def __init__(self, kernel, recurrent_kernel, bias, config: Dict):
+        self.kernel = kernel
+        self.recurrent_kernel = recurrent_kernel
+        self.bias = bias if bias is not None else np.zeros(kernel.shape[1], dtype=np.float32)
+        self.units = recurrent_kernel.shape[0]
+
+        activacion = config.get('activation', 'tanh')
+        recurrente = config.get('recurrent_activation', 'sigmoid')
+        for nombre in (activacion, recurrente):
+            if nombre not in ACTIVACIONES:
+                raise ValueError(f"Activación de LSTM no soportada: '{nombre}'")
+        self.activacion = ACTIVACIONES[activacion]
+        self.activacion_recurrente = ACTIVACIONES[recurrente]
+
+    def proyectar(self, embeddings: np.ndarray) -> np.ndarray:
+        # Aporte de la entrada a las 4 compuertas para todos los pasos de una vez
+        return embeddings @ self.kernel + self.bias
+
+    def paso(self, z: np.ndarray, h: np.ndarray, c: np.ndarray):
+        z = z + h @ self.recurrent_kernel
+        u = self.units
+        i = self.activacion_recurrente(z[..., :u])
+        f = self.activacion_recurrente(z[..., u:2 * u])
+        g = self.activacion(z[..., 2 * u:3 * u])
+        o = self.activacion_recurrente(z[..., 3 * u:])
+        c = f * c + i * g
+        h = o * self.activacion(c)
+        return h, c
+
+
+class BiLSTMNumpy:
+    def __init__(self, pesos: Dict[str, List[np.ndarray]], configs: List, max_sequence_length: int):
+        """
+        Armar el grafo de inferencia a partir de los pesos leídos del .h5.
+
+        Las secuencias llegan con padding de ceros al inicio (pad_sequences).
+        - Si el Embedding usa mask_zero, los pasos de padding se saltan.
+        - Si no (el modelo actual), el padding sí afecta al estado, pero el
+          estado de la dirección hacia adelante después de k ceros iniciales no
+          depende del texto: se precalcula para k = 0..max_sequence_length y la
+          recurrencia empieza directamente en el primer token real. La dirección
+          hacia atrás recorre el padding al final, con la proyección de entrada
+          del token 0 ya calculada.
+        """
+        self.max_sequence_length = max_sequence_length
+        densas = []
+
+        for clase, config in configs:
+            nombre = config.get('name')
+            if clase == 'Embedding':
+                # Se deja en el dtype del artefacto: solo se convierten las filas buscadas
+                self.embeddings = pesos[nombre][0]
+                self.mask_zero = bool(config.get('mask_zero', False))
+            elif clase == 'Bidirectional':
+                if config.get('merge_mode', 'concat') != 'concat':
+                    raise ValueError("Solo se soporta Bidirectional con merge_mode='concat'")
+                config_lstm = config['layer']['config']
+                usa_bias = config_lstm.get('use_bias', True)
+                n = 3 if usa_bias else 2
+                w = [_a_float32(arreglo) for arreglo in pesos[nombre]]
+                self.adelante = _LSTM(w[0], w[1], w[2] if usa_bias else None, config_lstm)
+                self.atras = _LSTM(w[n], w[n + 1], w[n + 2] if usa_bias else None, config_lstm)
+            elif clase == 'Dense':
+                w = [_a_float32(arreglo) for arreglo in pesos[nombre]]
+                bias = w[1] if len(w) > 1 else np.zeros(w[0].shape[1], dtype=np.float32)
+                densas.append((w[0], bias, config.get('activation', 'linear')))
+            elif clase not in ('InputLayer', 'SpatialDropout1D', 'Dropout'):
+                raise ValueError(f"Capa no soportada por el motor NumPy: {clase}")
+
+        self.densas = densas
+        self._preparar_padding()
+
+    @classmethod
+    def desde_h5(cls, ruta: str, max_sequence_length: int) -> 'BiLSTMNumpy':
+        pesos, configs = leer_pesos_h5(ruta)
+        return cls(pesos, configs, max_sequence_length)
+
+    @classmethod
+    def desde_artefacto(cls, directorio: str) -> 'BiLSTMNumpy':
+        """
+        Usar los pesos de un artefacto (ver artefacto.py) sin copiarlos: el
+        Embedding y los kernels quedan como vistas sobre el np.memmap. En un
+        artefacto cuantizado el Embedding sigue en int8/float16 y los kernels
+        (una fracción chica del modelo) se expanden a float32.
+        """
+        from artefacto import abrir_artefacto
+
+        artefacto = abrir_artefacto(directorio)
+        return cls(artefacto.pesos, artefacto.configs, artefacto.max_sequence_length)
+
+    def _preparar_padding(self):
+        units = self.adelante.units
+        embedding_pad = self._buscar(0)
+        self.proyeccion_pad_adelante = self.adelante.proyectar(embedding_pad)
+        self.proyeccion_pad_atras = self.atras.proyectar(embedding_pad)
+
+        # estados_pad[k] = (h, c) de la dirección hacia adelante tras k ceros
+        h = np.zeros(units, dtype=np.float32)
+        c = np.zeros(units, dtype=np.float32)
+        estados_h = [h]
+        estados_c = [c]
+        if not self.mask_zero:
+            for _ in range(self.max_sequence_length):
+                h, c = self.adelante.paso(self.proyeccion_pad_adelante, h, c)
+                estados_h.append(h)
+                estados_c.append(c)
+        else:
+            estados_h *= self.max_sequence_length + 1
+            estados_c *= self.max_sequence_length + 1
+        self.estados_pad_h = np.stack(estados_h).astype(np.float32)
+        self.estados_pad_c = np.stack(estados_c).astype(np.float32)
+
+    def _buscar(self, indices) -> np.ndarray:
+        return np.asarray(self.embeddings[indices], dtype=np.float32)
+
+    def predict(self, secuencias_pad: np.ndarray) -> np.ndarray:
+        """
+        Devolver las probabilidades (n, 3) para una matriz de secuencias con
+        padding al inicio.
+
+        La matriz puede ser más angosta que max_sequence_length: se interpreta
+        como si tuviera los ceros iniciales que faltan.
+        """
+        x = np.asarray(secuencias_pad, dtype=np.int64)
+        n = len(x)
+        units = self.adelante.units
+        if n == 0:
+            return np.zeros((0, self.densas[-1][0].shape[1]), dtype=np.float32)
+
+        # Recortar las columnas que son padding en todas las filas del lote
+        columnas_con_texto = np.flatnonzero((x != 0).any(axis=0))
+        x = x[:, columnas_con_texto[0]:] if len(columnas_con_texto) else x[:, :0]
+        ancho = x.shape[1]
+        padding_implicito = self.max_sequence_length - ancho
+
+        mascara = (x != 0)[..., None] if self.mask_zero else None
+        embeddings = self._buscar(x)
+
+        # Dirección hacia adelante: empieza en el estado tras el padding implícito
+        z_adelante = self.adelante.proyectar(embeddings)
+        h = np.repeat(self.estados_pad_h[padding_implicito][None], n, axis=0)
+        c = np.repeat(self.estados_pad_c[padding_implicito][None], n, axis=0)
+        for t in range(ancho):
+            h_nuevo, c_nuevo = self.adelante.paso(z_adelante[:, t], h, c)
+            if mascara is not None:
+                h_nuevo = np.where(mascara[:, t], h_nuevo, h)
+                c_nuevo = np.where(mascara[:, t], c_nuevo, c)
+            h, c = h_nuevo, c_nuevo
+        h_adelante = h
+
+        # Dirección hacia atrás: del último token al primero, luego el padding
+        z_atras = self.atras.proyectar(embeddings)
+        h = np.zeros((n, units), dtype=np.float32)
+        c = np.zeros((n, units), dtype=np.float32)
+        for t in range(ancho - 1, -1, -1):
+            h_nuevo, c_nuevo = self.atras.paso(z_atras[:, t], h, c)
+            if mascara is not None:
+                h_nuevo = np.where(mascara[:, t], h_nuevo, h)
+                c_nuevo = np.where(mascara[:, t], c_nuevo, c)
+            h, c = h_nuevo, c_nuevo
+        if not self.mask_zero:
+            for _ in range(padding_implicito):
+                h, c = self.atras.paso(self.proyeccion_pad_atras, h, c)
+        h_atras = h
+
+        salida = np.concatenate([h_adelante, h_atras], axis=1)
+        for kernel, bias, activacion in self.densas:
+            salida = salida @ kernel + bias
+            if activacion == 'relu':
+                salida = np.maximum(salida, 0.0)
+            elif activacion == 'softmax':
+                salida = np.exp(salida - salida.max(axis=1, keepdims=True))
+                salida /= salida.sum(axis=1, keepdims=True)
+            elif activacion != 'linear':
+                raise ValueError(f"Activación de Dense no soportada: '{activacion}'")
+        return salida.astype(np.float32)
@@ -2,17 +2,346 @@
 Servicio de Bluesky usando atproto - Conecta con tus credenciales
 """
 
+import asyncio
 import os
 import sys
-from typing import Dict, List, Optional
-from datetime import datetime
+import threading
+import time
+from typing import Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from bucle_async import bucle_compartido
+from cache import LRUCache
+from limites_upstream import ErrorUpstream, observar_cliente_atproto, planificador
+from publicaciones import Publicacion
 
 try:
-    from atproto import Client
+    from atproto import AsyncClient, Client
     ATPROTO_AVAILABLE = True
 except ImportError:
     ATPROTO_AVAILABLE = False
 
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# Máximo de solicitudes simultáneas a Bluesky en las consultas en paralelo
+BLUESKY_MAX_CONCURRENCY = int(os.getenv('BLUESKY_MAX_CONCURRENCY', 8))
+# Tiempo máximo (segundos) que una ruta espera una consulta en paralelo
+BLUESKY_FANOUT_TIMEOUT = float(os.getenv('BLUESKY_FANOUT_TIMEOUT', 30))
+# Máximo de posts por página que aceptan los endpoints de Bluesky
+BLUESKY_PAGE_SIZE_MAX = 100
+
+# Caché de respuestas de Bluesky por (método, argumentos, limit); 0 = desactivada.
+# Cada endpoint tiene su propio TTL en segundos.
+BLUESKY_CACHE_SIZE = int(os.getenv('BLUESKY_CACHE_SIZE', 1000))
+BLUESKY_CACHE_TTLS = {
+    'feed': float(os.getenv('BLUESKY_CACHE_TTL_FEED', 30)),
+    'search': float(os.getenv('BLUESKY_CACHE_TTL_SEARCH', 60)),
+    'author': float(os.getenv('BLUESKY_CACHE_TTL_AUTHOR', 120)),
+}
+
+# Sesión de atproto guardada en disco: al reiniciar se importa en vez de
+# volver a iniciar sesión con la contraseña. Cada proceso usa su propio
+# archivo a partir de esta ruta (ver ruta_sesion_del_proceso)
+BLUESKY_SESSION_PATH = os.getenv('BLUESKY_SESSION_PATH', '.bluesky_session')
+# Iniciar sesión en un hilo de fondo al arrancar (1) o recién en la primera consulta (0)
+BLUESKY_EAGER_LOGIN = os.getenv('BLUESKY_EAGER_LOGIN', '1') == '1'
+# Espera mínima (segundos) antes de reintentar un inicio de sesión fallido
+BLUESKY_LOGIN_RETRY_SECONDS = float(os.getenv('BLUESKY_LOGIN_RETRY_SECONDS', 30))
+
+
+class Pagina(NamedTuple):
+    posts: List[Publicacion]
+    # Cursor para pedir la página siguiente (None si no hay más)
+    cursor: Optional[str]
+
+
+def convertir_post(post) -> Publicacion:
+    """
+    Convertir un PostView de atproto al registro que devuelve el servicio.
+    """
+    return Publicacion.desde_bluesky(post)
+
+
+# (ruta base, pid) -> (archivo de sesión, descriptor con el lock tomado)
+_lugares_de_sesion: Dict[Tuple[str, int], Tuple[str, Optional[int]]] = {}
+_lock_lugares = threading.Lock()
+
+
+def ruta_sesion_del_proceso(base: str) -> str:
+    """
+    Archivo de sesión propio de este proceso. Los workers de gunicorn no
+    pueden compartir una sesión: atproto renueva los tokens en cada uno y la
+    renovación de uno invalida el refresh token de los demás.
+
+    Se toma el primer lugar libre (base.0, base.1, ...) con un lock de
+    archivo que dura lo que el proceso, así dos procesos vivos nunca usan el
+    mismo y al reiniciar cada worker retoma una sesión guardada. Sin fcntl
+    (Windows) se usa el pid.
+    """
+    pid = os.getpid()
+    with _lock_lugares:
+        lugar = _lugares_de_sesion.get((base, pid))
+        if lugar is None:
+            lugar = _tomar_lugar(base, pid)
+            _lugares_de_sesion[(base, pid)] = lugar
+        return lugar[0]
+
+
+def _tomar_lugar(base: str, pid: int) -> Tuple[str, Optional[int]]:
+    if fcntl is None:
+        return f"{base}.{pid}", None
+    indice = 0
+    while True:
+        ruta = f"{base}.{indice}"
+        try:
+            descriptor = os.open(f"{ruta}.lock", os.O_WRONLY | os.O_CREAT, 0o600)
+        except OSError as e:
+            print(f"⚠️ No se pudo reservar {ruta} ({e}); se usa un archivo por pid", flush=True)
+            return f"{base}.{pid}", None
+        try:
+            fcntl.flock(descriptor, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(descriptor)
+            indice += 1
+            continue
+        # El descriptor queda abierto (y el lock tomado) hasta que el proceso termina
+        os.set_inheritable(descriptor, False)
+        return ruta, descriptor
+
+
+def leer_sesion(ruta: str) -> Optional[str]:
+    try:
+        with open(ruta, 'r', encoding='utf-8') as handle:
+            return handle.read().strip() or None
+    except OSError:
+        return None
+
+
+def guardar_sesion(ruta: str, session_string: str):
+    """
+    Guardar la sesión (incluye los tokens) de forma atómica y solo legible
+    por el usuario dueño del proceso.
+    """
+    try:
+        temporal = f"{ruta}.{os.getpid()}.tmp"
+        descriptor = os.open(temporal, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(descriptor, 'w', encoding='utf-8') as handle:
+            handle.write(session_string)
+        os.replace(temporal, ruta)
+    except OSError as e:
+        print(f"⚠️ No se pudo guardar la sesión de Bluesky en {ruta}: {e}", flush=True)
+
+
+def es_error_de_sesion(error: Exception) -> bool:
+    """
+    True si el error indica que la sesión expiró o fue revocada y hay que
+    volver a iniciar sesión con la contraseña.
+    """
+    if type(error).__name__ == 'LoginRequiredError':
+        return True
+    # Las excepciones de atproto traen el código XRPC en response.content.error
+    contenido = getattr(getattr(error, 'response', None), 'content', None)
+    texto = f"{getattr(contenido, 'error', '')} {error}"
+    return any(codigo in texto for codigo in ('ExpiredToken', 'InvalidToken', 'AuthenticationRequired', 'AuthMissing'))
+
+
+def copiar_posts(posts: List[Publicacion]) -> List[Publicacion]:
+    # Las rutas agregan campos a cada post (p. ej. el sentimiento): se
+    # entrega una copia para no modificar lo que quedó en la caché
+    return [post.copiar() for post in posts]
+
+
+class AsyncBlueskyService:
+    def __init__(self, username: str = None, password: str = None, session_path: str = None,
+                 max_concurrency: int = BLUESKY_MAX_CONCURRENCY, cache: LRUCache = None):
+        """
+        Variante async del servicio sobre atproto.AsyncClient.
+
+        Un solo AsyncClient (y su pool de conexiones httpx) atiende todas las
+        consultas; las consultas en paralelo se limitan a max_concurrency.
+        Debe usarse siempre desde el mismo event loop (ver bucle_async.py);
+        el cliente se crea e inicia sesión en el primer uso (importando la
+        sesión de session_path si existe). Con cache, las páginas se guardan
+        con el TTL de su endpoint y las consultas iguales en curso se comparten.
+        """
+        self.cache = cache
+        self.username = username
+        self.password = password
+        self.session_path = session_path
+        self.max_concurrency = max(1, int(max_concurrency))
+
+        self._pid = None
+        self._client = None
+        self._lock = None
+        self._semaforo = None
+        self._ultimo_fallo = None
+
+    def _revisar_espera_login(self):
+        """
+        Tras un inicio de sesión fallido no se reintenta hasta que pasen
+        BLUESKY_LOGIN_RETRY_SECONDS (como el cliente síncrono): cada consulta
+        falla enseguida en vez de repetir createSession.
+        """
+        if self._ultimo_fallo is None:
+            return
+        restante = BLUESKY_LOGIN_RETRY_SECONDS - (time.monotonic() - self._ultimo_fallo)
+        if restante > 0:
+            raise ErrorUpstream('bluesky', 'unavailable', retry_after=restante)
+
+    async def _login_con_espera(self, usar_guardada: bool = True):
+        # Se llama con self._lock tomado
+        self._revisar_espera_login()
+        try:
+            client = await self._iniciar_sesion(usar_guardada)
+        except Exception as e:
+            print(f"❌ Error conectando a Bluesky: {e}", flush=True)
+            self._ultimo_fallo = time.monotonic()
+            raise
+        self._ultimo_fallo = None
+        return client
+
+    async def _obtener_cliente(self):
+        # Un proceso hijo (fork de gunicorn) no puede reutilizar las
+        # conexiones del padre: se crea un cliente nuevo por proceso
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._client = None
+            self._lock = asyncio.Lock()
+            self._semaforo = asyncio.Semaphore(self.max_concurrency)
+            self._ultimo_fallo = None
+
+        if self._client is None:
+            self._revisar_espera_login()
+        async with self._lock:
+            if self._client is None:
+                self._client = await self._login_con_espera()
+        return self._client
+
+    async def _iniciar_sesion(self, usar_guardada: bool = True):
+        client = AsyncClient()
+        observar_cliente_atproto(client)
+        if self.session_path:
+            ruta = ruta_sesion_del_proceso(self.session_path)
+
+            # atproto renueva el token solo; cada sesión nueva o renovada se guarda
+            async def al_cambiar_sesion(evento, sesion):
+                guardar_sesion(ruta, sesion.encode())
+            client.on_session_change(al_cambiar_sesion)
+
+            sesion = leer_sesion(ruta) if usar_guardada else None
+            if sesion:
+                try:
+                    await client.login(session_string=sesion)
+                    return client
+                except Exception as e:
+                    print(f"⚠️ Sesión de Bluesky guardada no válida ({e}); iniciando con contraseña", flush=True)
+        await client.login(self.username, self.password)
+        return client
+
+    async def _con_sesion(self, descargar: Callable):
+        """
+        Ejecutar una descarga; si la sesión expiró (y atproto no pudo
+        renovarla), iniciar sesión de nuevo con la contraseña y reintentar una vez.
+        """
+        try:
+            return await descargar()
+        except Exception as e:
+            if not es_error_de_sesion(e):
+                raise
+            print(f"🔑 Sesión de Bluesky expirada ({e}); iniciando sesión de nuevo", flush=True)
+            async with self._lock:
+                self._client = None
+                self._client = await self._login_con_espera(usar_guardada=False)
+            return await descargar()
+
+    async def _cacheado(self, endpoint: str, clave: Tuple, limit: int, descargar: Callable):
+        if self.cache is None:
+            return await self._con_sesion(descargar)
+        posts, cursor = await self.cache.obtener_o_calcular_async(
+            (endpoint + '_page',) + clave + (limit,), lambda: self._con_sesion(descargar),
+            ttl=BLUESKY_CACHE_TTLS[endpoint], guardar_si=lambda pagina: bool(pagina[0])
+        )
+        return copiar_posts(posts), cursor
+
+    async def feed_page(self, limit: int = 10, cursor: str = None) -> Tuple[List[Publicacion], Optional[str]]:
+        """
+        Una página del timeline: (posts, cursor de la página siguiente o None).
+        """
+        return await self._cacheado('feed', (cursor,), limit, lambda: self._feed_page(limit, cursor))
+
+    async def search_page(self, query: str, limit: int = 10, cursor: str = None) -> Tuple[List[Publicacion], Optional[str]]:
+        return await self._cacheado('search', (query, cursor), limit, lambda: self._search_page(query, limit, cursor))
+
+    async def author_page(self, author: str, limit: int = 10, cursor: str = None) -> Tuple[List[Publicacion], Optional[str]]:
+        return await self._cacheado('author', (author, cursor), limit, lambda: self._author_page(author, limit, cursor))
+
+    async def _feed_page(self, limit: int, cursor: Optional[str]):
+        client = await self._obtener_cliente()
+        async with self._semaforo:
+            response = await planificador.ejecutar_async(
+                'bluesky', lambda: client.app.bsky.feed.get_timeline({"limit": limit, "cursor": cursor})
+            )
+        return [convertir_post(feed_item.post) for feed_item in response.feed], response.cursor
+
+    async def _search_page(self, query: str, limit: int, cursor: Optional[str]):
+        client = await self._obtener_cliente()
+        async with self._semaforo:
+            response = await planificador.ejecutar_async(
+                'bluesky', lambda: client.app.bsky.feed.search_posts({"q": query, "limit": limit, "cursor": cursor})
+            )
+        if not response or not response.posts:
+            return [], None
+        return [convertir_post(post) for post in response.posts], response.cursor
+
+    async def _author_page(self, author: str, limit: int, cursor: Optional[str]):
+        client = await self._obtener_cliente()
+        async with self._semaforo:
+            response = await planificador.ejecutar_async(
+                'bluesky', lambda: client.app.bsky.feed.get_author_feed({"actor": author, "limit": limit, "cursor": cursor})
+            )
+        return [convertir_post(feed_item.post) for feed_item in response.feed], response.cursor
+
+    async def get_feed(self, limit: int = 10) -> List[Publicacion]:
+        return (await self.feed_page(limit))[0]
+
+    async def search_posts(self, query: str, limit: int = 10) -> List[Publicacion]:
+        return (await self.search_page(query, limit))[0]
+
+    async def get_posts_by_author(self, author: str, limit: int = 10) -> List[Publicacion]:
+        return (await self.author_page(author, limit))[0]
+
+    async def _en_paralelo(self, funcion, claves: Iterable[str], limit: int) -> Dict[str, List[Publicacion]]:
+        """
+        Ejecutar funcion(clave, limit) para todas las claves a la vez (el
+        semáforo limita cuántas van a la red). Una clave que falla devuelve
+        una lista vacía sin afectar a las demás.
+        """
+        claves = list(dict.fromkeys(claves))
+        resultados = await asyncio.gather(
+            *(funcion(clave, limit=limit) for clave in claves), return_exceptions=True
+        )
+        salida = {}
+        errores_upstream = []
+        for clave, resultado in zip(claves, resultados):
+            if isinstance(resultado, BaseException):
+                print(f"❌ Error consultando '{clave}' en Bluesky: {resultado}", flush=True)
+                if isinstance(resultado, ErrorUpstream):
+                    errores_upstream.append(resultado)
+                resultado = []
+            salida[clave] = resultado
+        # Si nada respondió por un problema del upstream, se informa como tal
+        if errores_upstream and not any(salida.values()):
+            raise errores_upstream[0]
+        return salida
+
+    async def search_many(self, queries: Iterable[str], limit: int = 10) -> Dict[str, List[Publicacion]]:
+        return await self._en_paralelo(self.search_posts, queries, limit)
+
+    async def get_posts_by_authors(self, authors: Iterable[str], limit: int = 10) -> Dict[str, List[Publicacion]]:
+        return await self._en_paralelo(self.get_posts_by_author, authors, limit)
+
 class BlueskyService:
     def __init__(self):
         """
@@ -22,100 +351,210 @@ class BlueskyService:
         print(msg, flush=True)
         sys.stdout.flush()
         
+        self.cache = LRUCache(BLUESKY_CACHE_SIZE) if BLUESKY_CACHE_SIZE > 0 else None
+        self.username = None
+        self.password = None
+        self.session_path = BLUESKY_SESSION_PATH
+        self._client = None
+        self._lock = threading.Lock()
+        self._ultimo_fallo = None
+        self._pid_login = None
+        self.async_service = None
+        
         if not ATPROTO_AVAILABLE:
             msg = "⚠️  atproto no está instalado"
             print(msg, flush=True)
             sys.stdout.flush()
-            self.client = None
             return
         
-        try:
-            username = os.getenv('BLUESKY_USERNAME')
-            password = os.getenv('BLUESKY_PASSWORD')
-            
-            msg = f"Usuario env: {username}, Password: {'*' * len(password) if password else 'NO SET'}"
+        username = os.getenv('BLUESKY_USERNAME')
+        password = os.getenv('BLUESKY_PASSWORD')
+        
+        msg = f"Usuario env: {username}, Password: {'*' * len(password) if password else 'NO SET'}"
+        print(msg, flush=True)
+        sys.stdout.flush()
+        
+        if not username or not password:
+            msg = "❌ Error: BLUESKY_USERNAME o BLUESKY_PASSWORD no configurados en .env"
             print(msg, flush=True)
             sys.stdout.flush()
-            
-            if not username or not password:
-                msg = "❌ Error: BLUESKY_USERNAME o BLUESKY_PASSWORD no configurados en .env"
-                print(msg, flush=True)
-                sys.stdout.flush()
-                self.client = None
+            return
+        
+        self.username = username
+        self.password = password
+        # El cliente async guarda su propia sesión: los refresh tokens se
+        # renuevan por separado y no se invalidan entre sí
+        self.async_service = AsyncBlueskyService(
+            username, password, session_path=f"{self.session_path}.async", cache=self.cache
+        )
+
+    def iniciar_sesion_en_segundo_plano(self):
+        """
+        El inicio de sesión no bloquea el arranque de la app: se hace en un
+        hilo de fondo o, si BLUESKY_EAGER_LOGIN está desactivado, en la
+        primera consulta. La app lo llama en el proceso que atiende las
+        solicitudes (con gunicorn --preload, en cada worker después del fork).
+        Se inicia una sola vez por proceso aunque se llame de nuevo.
+        """
+        if not BLUESKY_EAGER_LOGIN or not self.username:
+            return
+        pid = os.getpid()
+        with self._lock:
+            if self._pid_login == pid:
                 return
-            
-            msg = f"📡 Conectando a Bluesky con usuario: {username}..."
-            print(msg, flush=True)
-            sys.stdout.flush()
-            
-            self.client = Client()
-            self.client.login(username, password)
-            
-            msg = "✅ Bluesky: Conectado exitosamente"
-            print(msg, flush=True)
-            sys.stdout.flush()
-            
+            self._pid_login = pid
+        threading.Thread(target=lambda: self.client, name="bluesky-login", daemon=True).start()
+
+    @property
+    def client(self):
+        """
+        Cliente de atproto con sesión iniciada, o None si no hay credenciales
+        o el inicio de sesión falló (se reintenta tras BLUESKY_LOGIN_RETRY_SECONDS).
+        """
+        if self._client is not None or not self.username:
+            return self._client
+        if self._ultimo_fallo is not None and time.monotonic() - self._ultimo_fallo < BLUESKY_LOGIN_RETRY_SECONDS:
+            return None
+
+        with self._lock:
+            if self._client is None:
+                try:
+                    self._client = self._iniciar_sesion()
+                    self._ultimo_fallo = None
+                except Exception as e:
+                    msg = f"❌ Error conectando a Bluesky: {e}"
+                    print(msg, flush=True)
+                    sys.stdout.flush()
+                    self._ultimo_fallo = time.monotonic()
+        return self._client
+
+    def _iniciar_sesion(self, usar_guardada: bool = True):
+        client = Client()
+        observar_cliente_atproto(client)
+        ruta = ruta_sesion_del_proceso(self.session_path)
+        # atproto renueva el token solo; cada sesión nueva o renovada se guarda
+        client.on_session_change(lambda evento, sesion: guardar_sesion(ruta, sesion.encode()))
+
+        sesion = leer_sesion(ruta) if usar_guardada else None
+        if sesion:
+            try:
+                client.login(session_string=sesion)
+                print("✅ Bluesky: sesión guardada restaurada", flush=True)
+                return client
+            except Exception as e:
+                print(f"⚠️ Sesión de Bluesky guardada no válida ({e}); iniciando con contraseña", flush=True)
+
+        msg = f"📡 Conectando a Bluesky con usuario: {self.username}..."
+        print(msg, flush=True)
+        sys.stdout.flush()
+        client.login(self.username, self.password)
+        
+        msg = "✅ Bluesky: Conectado exitosamente"
+        print(msg, flush=True)
+        sys.stdout.flush()
+        return client
+
+    def _cliente_o_error(self):
+        """
+        Cliente con sesión iniciada. Sin credenciales, o si el inicio de
+        sesión falló y no pasó BLUESKY_LOGIN_RETRY_SECONDS, lanza
+        ErrorUpstream (503 con Retry-After) como el cliente async: no es lo
+        mismo que "sin resultados".
+        """
+        client = self.client
+        if client is not None:
+            return client
+        restante = None
+        if self._ultimo_fallo is not None:
+            restante = BLUESKY_LOGIN_RETRY_SECONDS - (time.monotonic() - self._ultimo_fallo)
+        raise ErrorUpstream('bluesky', 'unavailable', retry_after=restante if restante and restante > 0 else None)
+
+    def _con_sesion(self, descargar: Callable):
+        """
+        Ejecutar descargar(client); si la sesión expiró (y atproto no pudo
+        renovarla), iniciar sesión de nuevo con la contraseña y reintentar una vez.
+        """
+        client = self._cliente_o_error()
+        try:
+            return descargar(client)
         except Exception as e:
-            msg = f"❌ Error conectando a Bluesky: {e}"
-            print(msg, flush=True)
-            sys.stdout.flush()
-            self.client = None
+            if not es_error_de_sesion(e):
+                raise
+            print(f"🔑 Sesión de Bluesky expirada ({e}); iniciando sesión de nuevo", flush=True)
+        with self._lock:
+            if self._client is client:
+                self._client = None
+                try:
+                    self._client = self._iniciar_sesion(usar_guardada=False)
+                    self._ultimo_fallo = None
+                except Exception as e:
+                    print(f"❌ Error conectando a Bluesky: {e}", flush=True)
+                    self._ultimo_fallo = time.monotonic()
+        return descargar(self._cliente_o_error())
+
+    def _cacheado(self, endpoint: str, clave: Tuple, limit: int, descargar: Callable[[], List[Publicacion]]) -> List[Publicacion]:
+        """
+        Responder desde la caché o descargar una sola vez aunque lleguen
+        varias solicitudes iguales a la vez. Las listas vacías (sin
+        resultados o error) no se guardan.
+        """
+        if self.cache is None:
+            return descargar()
+        posts = self.cache.obtener_o_calcular(
+            (endpoint,) + clave + (limit,), descargar, ttl=BLUESKY_CACHE_TTLS[endpoint], guardar_si=bool
+        )
+        return copiar_posts(posts)
 
-    def get_feed(self, limit: int = 10) -> List[Dict]:
+    def get_feed(self, limit: int = 10) -> List[Publicacion]:
         """
         Obtener posts del feed (timeline) del usuario conectado.
         """
-        if not self.client:
-            return []
-        
+        return self._cacheado('feed', (), limit, lambda: self._get_feed(limit))
+
+    def search_posts(self, query: str, limit: int = 10) -> List[Publicacion]:
+        """
+        Buscar posts en Bluesky.
+        """
+        return self._cacheado('search', (query,), limit, lambda: self._search_posts(query, limit))
+
+    def get_posts_by_author(self, author: str, limit: int = 10) -> List[Publicacion]:
+        """
+        Obtener posts de un autor específico.
+        """
+        return self._cacheado('author', (author,), limit, lambda: self._get_posts_by_author(author, limit))
+
+    def _get_feed(self, limit: int) -> List[Publicacion]:
         try:
             print(f"📋 Obteniendo {limit} posts del feed...")
             
-            response = self.client.app.bsky.feed.get_timeline(limit=limit)
+            response = self._con_sesion(
+                lambda client: planificador.ejecutar('bluesky', lambda: client.app.bsky.feed.get_timeline(limit=limit))
+            )
             posts = []
             
             for feed_item in response.feed:
-                post = feed_item.post
-                author = post.author
-                
-                posts.append({
-                    'id': post.uri.split('/')[-1],
-                    'title': f"Post de {author.handle}",
-                    'text': post.record.text,
-                    'author': author.handle,
-                    'likes': post.like_count or 0,
-                    'replies': post.reply_count or 0,
-                    'reposts': post.repost_count or 0,
-                    'created': post.record.created_at if hasattr(post.record, 'created_at') else datetime.now().isoformat(),
-                    'uri': post.uri,
-                })
+                posts.append(convertir_post(feed_item.post))
             
             print(f"✅ Se obtuvieron {len(posts)} posts")
             return posts
         
+        except ErrorUpstream:
+            # Rate limit / upstream caído: no es lo mismo que "sin resultados"
+            raise
         except Exception as e:
             print(f"❌ Error obteniendo feed: {e}")
             return []
 
-    def search_posts(self, query: str, limit: int = 10) -> List[Dict]:
-        """
-        Buscar posts en Bluesky.
-        """
-        if not self.client:
-            msg = "❌ No hay cliente de Bluesky disponible"
-            print(msg, flush=True)
-            sys.stdout.flush()
-            return []
-        
+    def _search_posts(self, query: str, limit: int) -> List[Publicacion]:
         try:
             msg = f"🔍 Buscando '{query}' en Bluesky (limit={limit})..."
             print(msg, flush=True)
             sys.stdout.flush()
             
             # Usar feed.search_posts sin crear objetos Params
-            response = self.client.app.bsky.feed.search_posts(
-                {"q": query, "limit": limit}
-            )
+            response = self._con_sesion(lambda client: planificador.ejecutar(
+                'bluesky', lambda: client.app.bsky.feed.search_posts({"q": query, "limit": limit})
+            ))
             posts = []
             
             if not response or not response.posts:
@@ -125,24 +564,16 @@ class BlueskyService:
                 return []
             
             for post in response.posts:
-                author = post.author
-                posts.append({
-                    'id': post.uri.split('/')[-1],
-                    'title': f"Post de {author.handle}",
-                    'text': post.record.text,
-                    'author': author.handle,
-                    'likes': post.like_count or 0,
-                    'replies': post.reply_count or 0,
-                    'reposts': post.repost_count or 0,
-                    'created': post.record.created_at if hasattr(post.record, 'created_at') else datetime.now().isoformat(),
-                    'uri': post.uri,
-                })
+                posts.append(convertir_post(post))
             
             msg = f"✅ Se encontraron {len(posts)} posts"
             print(msg, flush=True)
             sys.stdout.flush()
             return posts
         
+        except ErrorUpstream:
+            # Rate limit / upstream caído: no es lo mismo que "sin resultados"
+            raise
         except Exception as e:
             msg = f"❌ Error buscando: {str(e)}"
             print(msg, flush=True)
@@ -151,60 +582,108 @@ class BlueskyService:
             traceback.print_exc()
             return []
 
-    def get_posts_by_author(self, author: str, limit: int = 10) -> List[Dict]:
-        """
-        Obtener posts de un autor específico.
-        """
-        if not self.client:
-            return []
-        
+    def _get_posts_by_author(self, author: str, limit: int) -> List[Publicacion]:
         try:
             print(f"👤 Obteniendo posts de @{author}...")
             
-            response = self.client.app.bsky.feed.get_author_feed(actor=author, limit=limit)
+            response = self._con_sesion(lambda client: planificador.ejecutar(
+                'bluesky', lambda: client.app.bsky.feed.get_author_feed(actor=author, limit=limit)
+            ))
             posts = []
             
             for feed_item in response.feed:
-                post = feed_item.post
-                author_obj = post.author
-                
-                posts.append({
-                    'id': post.uri.split('/')[-1],
-                    'title': f"Post de {author_obj.handle}",
-                    'text': post.record.text,
-                    'author': author_obj.handle,
-                    'likes': post.like_count or 0,
-                    'replies': post.reply_count or 0,
-                    'reposts': post.repost_count or 0,
-                    'created': post.record.created_at if hasattr(post.record, 'created_at') else datetime.now().isoformat(),
-                    'uri': post.uri,
-                })
+                posts.append(convertir_post(feed_item.post))
             
             print(f"✅ Se obtuvieron {len(posts)} posts de @{author}")
             return posts
         
+        except ErrorUpstream:
+            # Rate limit / upstream caído: no es lo mismo que "sin resultados"
+            raise
         except Exception as e:
             print(f"❌ Error obteniendo posts del autor: {e}")
             return []
 
-    def format_post_for_app(self, bluesky_post: Dict) -> Dict:
+    def search_many(self, queries: Iterable[str], limit: int = 10) -> Dict[str, List[Publicacion]]:
+        """
+        Buscar varias consultas en paralelo (una sola espera de red en vez de
+        una por consulta). Devuelve {consulta: posts}.
+        """
+        if not self.async_service:
+            return {}
+        return bucle_compartido.ejecutar(
+            self.async_service.search_many(queries, limit=limit), timeout=BLUESKY_FANOUT_TIMEOUT
+        )
+
+    def get_posts_by_authors(self, authors: Iterable[str], limit: int = 10) -> Dict[str, List[Publicacion]]:
+        """
+        Obtener los posts de varios autores en paralelo. Devuelve {autor: posts}.
+        """
+        if not self.async_service:
+            return {}
+        return bucle_compartido.ejecutar(
+            self.async_service.get_posts_by_authors(authors, limit=limit), timeout=BLUESKY_FANOUT_TIMEOUT
+        )
+
+    def _paginar(self, obtener_pagina: Callable, max_posts: int, page_size: int,
+                 cursor: Optional[str]) -> Iterator[Pagina]:
+        """
+        Seguir los cursores hasta juntar max_posts posts o agotar los
+        resultados. Mientras el llamador procesa una página, la siguiente ya
+        se está descargando en el loop de fondo.
+        """
+        if not self.async_service:
+            return
+        page_size = max(1, min(int(page_size), BLUESKY_PAGE_SIZE_MAX))
+        restante = max(0, int(max_posts))
+
+        futuro = bucle_compartido.enviar(obtener_pagina(min(page_size, restante), cursor)) if restante else None
+        try:
+            while futuro is not None:
+                posts, cursor = futuro.result(timeout=BLUESKY_FANOUT_TIMEOUT)
+                posts = posts[:restante]
+                restante -= len(posts)
+
+                # Prefetch de la página siguiente antes de entregar la actual
+                futuro = None
+                if cursor and posts and restante > 0:
+                    futuro = bucle_compartido.enviar(obtener_pagina(min(page_size, restante), cursor))
+                yield Pagina(posts, cursor)
+        finally:
+            # El llamador dejó de iterar: no se descarga la página pendiente
+            if futuro is not None:
+                futuro.cancel()
+
+    def iter_search_posts(self, query: str, max_posts: int = 1000, page_size: int = BLUESKY_PAGE_SIZE_MAX,
+                          cursor: Optional[str] = None) -> Iterator[Pagina]:
+        """
+        Generador de páginas de una búsqueda, siguiendo cursores de forma perezosa.
+
+        Ejemplo:
+            for pagina in bluesky_service.iter_search_posts('python', max_posts=5000):
+                procesar(pagina.posts)
+        """
+        return self._paginar(
+            lambda limite, cursor: self.async_service.search_page(query, limite, cursor),
+            max_posts, page_size, cursor
+        )
+
+    def iter_feed(self, max_posts: int = 1000, page_size: int = BLUESKY_PAGE_SIZE_MAX,
+                  cursor: Optional[str] = None) -> Iterator[Pagina]:
+        return self._paginar(
+            lambda limite, cursor: self.async_service.feed_page(limite, cursor),
+            max_posts, page_size, cursor
+        )
+
+    def iter_posts_by_author(self, author: str, max_posts: int = 1000, page_size: int = BLUESKY_PAGE_SIZE_MAX,
+                             cursor: Optional[str] = None) -> Iterator[Pagina]:
+        return self._paginar(
+            lambda limite, cursor: self.async_service.author_page(author, limite, cursor),
+            max_posts, page_size, cursor
+        )
+
+    def format_post_for_app(self, bluesky_post: Publicacion) -> Dict:
         """
         Convertir un post de Bluesky al formato de la app.
         """
-        return {
-            'id': bluesky_post['id'],
-            'author': {
-                'name': bluesky_post['author'],
-                'handle': bluesky_post['author'],
-                'avatarUrl': f"https://api.dicebear.com/7.x/avataaars/svg?seed={bluesky_post['author']}",
-            },
-            'content': bluesky_post['text'],
-            'timestamp': bluesky_post['created'],
-            'stats': {
-                'likes': bluesky_post['likes'],
-                'comments': bluesky_post['replies'],
-                'shares': bluesky_post['reposts'],
-            },
-            'platform': 'bluesky',
-            'url': bluesky_post['uri'],
-        }
+        return bluesky_post.formato_app()
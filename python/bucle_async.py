@@ -0,0 +1,72 @@
+"""
+Event loop de asyncio en un hilo de fondo para usar código async desde las
+rutas síncronas de Flask
+"""
+
+import asyncio
+import concurrent.futures
+import os
+import threading
+from typing import Any, Awaitable
+
+
+class BucleAsync:
+    def __init__(self, nombre: str = "bucle-async"):
+        """
+        Un solo event loop por proceso, corriendo en un hilo daemon.
+
+        ejecutar() manda una corrutina al loop y bloquea el hilo que llama
+        hasta tener el resultado, así varias solicitudes de Flask comparten el
+        mismo loop (y los clientes HTTP async creados en él).
+        """
+        self.nombre = nombre
+        self._lock = threading.Lock()
+        self._pid = None
+        self._loop = None
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        """
+        Arrancar el loop en el primer uso.
+
+        Se vuelve a crear si el proceso cambió (fork de gunicorn), porque los
+        hilos no sobreviven al fork.
+        """
+        pid = os.getpid()
+        if self._pid == pid:
+            return self._loop
+
+        with self._lock:
+            if self._pid != pid:
+                loop = asyncio.new_event_loop()
+                hilo = threading.Thread(target=self._correr, args=(loop,), name=self.nombre, daemon=True)
+                hilo.start()
+                self._loop = loop
+                self._pid = pid
+        return self._loop
+
+    @staticmethod
+    def _correr(loop: asyncio.AbstractEventLoop):
+        asyncio.set_event_loop(loop)
+        loop.run_forever()
+
+    def enviar(self, corrutina: Awaitable) -> concurrent.futures.Future:
+        """
+        Programar una corrutina en el loop de fondo sin esperarla.
+        """
+        return asyncio.run_coroutine_threadsafe(corrutina, self.loop)
+
+    def ejecutar(self, corrutina: Awaitable, timeout: float = None) -> Any:
+        """
+        Ejecutar una corrutina en el loop de fondo y esperar su resultado.
+        """
+        futuro = self.enviar(corrutina)
+        try:
+            return futuro.result(timeout=timeout)
+        except concurrent.futures.TimeoutError:
+            futuro.cancel()
+            raise
+
+
+# Loop compartido por los servicios de la app
+bucle_compartido = BucleAsync()
@@ -0,0 +1,231 @@
+"""
+Cachés en memoria (LRU + TTL) y compartida entre workers (Redis)
+"""
+
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+import numpy as np
+
+try:
+    import redis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+
+class LRUCache:
+    def __init__(self, max_size: int = 10000, ttl: Optional[float] = None):
+        """
+        Caché acotada por cantidad de entradas con expulsión LRU y expiración
+        opcional por TTL (segundos). Segura para usar desde varios hilos.
+        """
+        self.max_size = max(1, int(max_size))
+        self.ttl = ttl if ttl and ttl > 0 else None
+        self._datos = OrderedDict()
+        self._lock = threading.Lock()
+        # Cálculos en curso para obtener_o_calcular (single-flight)
+        self._en_vuelo = {}
+        self._en_vuelo_async = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.coalesced = 0
+
+    def get(self, clave: str) -> Any:
+        """
+        Devolver el valor guardado o None si no existe o expiró.
+        """
+        with self._lock:
+            entrada = self._datos.get(clave)
+            if entrada is None:
+                self.misses += 1
+                return None
+
+            valor, expira = entrada
+            if expira is not None and expira <= time.monotonic():
+                del self._datos[clave]
+                self.misses += 1
+                return None
+
+            self._datos.move_to_end(clave)
+            self.hits += 1
+            return valor
+
+    def set(self, clave: str, valor: Any, ttl: Optional[float] = None):
+        ttl = ttl if ttl is not None else self.ttl
+        expira = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._datos[clave] = (valor, expira)
+            self._datos.move_to_end(clave)
+            while len(self._datos) > self.max_size:
+                self._datos.popitem(last=False)
+                self.evictions += 1
+
+    def obtener_o_calcular(self, clave: Hashable, calcular: Callable[[], Any], ttl: Optional[float] = None,
+                           guardar_si: Callable[[Any], bool] = None) -> Any:
+        """
+        Devolver el valor guardado o calcularlo una sola vez: si otro hilo ya
+        está calculando la misma clave, se espera su resultado en vez de
+        repetir el cálculo. Con guardar_si solo se guardan los valores para
+        los que devuelve True (p. ej. no guardar respuestas vacías).
+        """
+        valor = self.get(clave)
+        if valor is not None:
+            return valor
+
+        with self._lock:
+            futuro = self._en_vuelo.get(clave)
+            propio = futuro is None
+            if propio:
+                futuro = Future()
+                self._en_vuelo[clave] = futuro
+            else:
+                self.coalesced += 1
+        if not propio:
+            return futuro.result()
+
+        try:
+            valor = calcular()
+        except BaseException as e:
+            with self._lock:
+                self._en_vuelo.pop(clave, None)
+            futuro.set_exception(e)
+            raise
+
+        # Se guarda antes de liberar la clave para que no haya un hueco en
+        # el que otra solicitud no encuentre ni el valor ni el cálculo
+        if valor is not None and (guardar_si is None or guardar_si(valor)):
+            self.set(clave, valor, ttl)
+        with self._lock:
+            self._en_vuelo.pop(clave, None)
+        futuro.set_result(valor)
+        return valor
+
+    async def obtener_o_calcular_async(self, clave: Hashable, calcular: Callable[[], Awaitable],
+                                       ttl: Optional[float] = None,
+                                       guardar_si: Callable[[Any], bool] = None) -> Any:
+        """
+        Igual que obtener_o_calcular() para corrutinas. Todas las llamadas
+        deben hacerse desde el mismo event loop.
+        """
+        valor = self.get(clave)
+        if valor is not None:
+            return valor
+
+        futuro = self._en_vuelo_async.get(clave)
+        if futuro is not None:
+            self.coalesced += 1
+            # shield: cancelar a quien espera no cancela el cálculo compartido
+            return await asyncio.shield(futuro)
+
+        futuro = asyncio.get_running_loop().create_future()
+        self._en_vuelo_async[clave] = futuro
+        try:
+            valor = await calcular()
+        except asyncio.CancelledError:
+            self._en_vuelo_async.pop(clave, None)
+            futuro.cancel()
+            raise
+        except BaseException as e:
+            self._en_vuelo_async.pop(clave, None)
+            futuro.set_exception(e)
+            # Marcar la excepción como leída si nadie más la esperaba
+            futuro.exception()
+            raise
+
+        if valor is not None and (guardar_si is None or guardar_si(valor)):
+            self.set(clave, valor, ttl)
+        self._en_vuelo_async.pop(clave, None)
+        futuro.set_result(valor)
+        return valor
+
+    def clear(self):
+        with self._lock:
+            self._datos.clear()
+
+    def __len__(self) -> int:
+        return len(self._datos)
+
+    def estadisticas(self) -> Dict:
+        consultas = self.hits + self.misses
+        return {
+            "backend": "memory",
+            "size": len(self._datos),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "coalesced": self.coalesced,
+            "hit_rate": round(self.hits / consultas, 4) if consultas else 0.0,
+        }
+
+
+class RedisPredictionCache:
+    def __init__(self, url: str, ttl: Optional[float] = None, prefijo: str = 'sentiment:'):
+        """
+        Caché de probabilidades compartida entre workers de gunicorn usando Redis.
+
+        Los vectores se guardan como bytes float32. La expulsión LRU la hace
+        Redis (maxmemory-policy allkeys-lru); aquí solo se aplica el TTL.
+        La conexión se abre en el primer uso, después del fork.
+        """
+        if not REDIS_AVAILABLE:
+            raise ImportError("El paquete 'redis' no está instalado")
+        self.url = url
+        self.ttl = ttl if ttl and ttl > 0 else None
+        self.prefijo = prefijo
+        self._cliente = None
+
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    @property
+    def cliente(self):
+        if self._cliente is None:
+            self._cliente = redis.Redis.from_url(self.url)
+        return self._cliente
+
+    def get(self, clave: str) -> Optional[np.ndarray]:
+        try:
+            valor = self.cliente.get(self.prefijo + clave)
+        except Exception:
+            # Si Redis no responde se trata como un miss y se calcula igual
+            self.errors += 1
+            self.misses += 1
+            return None
+
+        if valor is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return np.frombuffer(valor, dtype=np.float32)
+
+    def set(self, clave: str, valor: np.ndarray, ttl: Optional[float] = None):
+        ttl = ttl if ttl is not None else self.ttl
+        try:
+            self.cliente.set(
+                self.prefijo + clave,
+                np.asarray(valor, dtype=np.float32).tobytes(),
+                px=max(1, int(ttl * 1000)) if ttl else None
+            )
+        except Exception:
+            self.errors += 1
+
+    def estadisticas(self) -> Dict:
+        consultas = self.hits + self.misses
+        return {
+            "backend": "redis",
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "errors": self.errors,
+            "hit_rate": round(self.hits / consultas, 4) if consultas else 0.0,
+        }
@@ -0,0 +1,170 @@
+"""
+Conversión del modelo BiLSTM (.h5) a formatos livianos de inferencia
+
+Genera un .tflite o un .onnx que app.py puede cargar con
+INFERENCE_BACKEND=tflite / INFERENCE_BACKEND=onnx, y verifica que sus
+salidas coincidan con las del modelo Keras original. El archivo se escribe
+primero en <salida>.tmp y solo reemplaza a la salida si pasa la verificación.
+
+Ejemplos:
+    python convert_model.py --format tflite
+    python convert_model.py --format onnx --output modelo.onnx
+    python convert_model.py --format tflite --batch-sizes 1,16,64 --tolerance 1e-4
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+
+import numpy as np
+import tensorflow as tf
+
+from inference import crear_motor
+
+MAX_SEQUENCE_LENGTH = 100
+MAX_NB_WORDS = 20000
+MODEL_PATH = 'modelo_final_sentiment.h5'
+
+SALIDAS_POR_DEFECTO = {
+    'tflite': 'modelo_final_sentiment.tflite',
+    'onnx': 'modelo_final_sentiment.onnx',
+}
+
+
+def convertir_a_tflite(model, ruta_salida: str, batch_sizes=(1, 8, 32)):
+    """
+    Exportar el modelo a TFLite usando solo operaciones nativas (sin flex ops).
+
+    El convertidor solo logra bajar el bucle del LSTM a operaciones nativas
+    cuando la forma de entrada es completamente estática, así que se exporta
+    una firma 'serve_<lote>' por cada tamaño de lote; los pesos se comparten
+    entre firmas dentro del mismo archivo.
+    """
+    import keras
+
+    archivo = keras.export.ExportArchive()
+    archivo.track(model)
+    for batch_size in batch_sizes:
+        archivo.add_endpoint(
+            f'serve_{batch_size}',
+            lambda secuencias: model(secuencias, training=False),
+            input_signature=[tf.TensorSpec((batch_size, MAX_SEQUENCE_LENGTH), tf.int32, name='secuencias')],
+        )
+
+    directorio = tempfile.mkdtemp(prefix='saved_model_')
+    try:
+        archivo.write_out(directorio, verbose=False)
+        converter = tf.lite.TFLiteConverter.from_saved_model(
+            directorio, signature_keys=[f'serve_{batch_size}' for batch_size in batch_sizes]
+        )
+        contenido = converter.convert()
+    finally:
+        shutil.rmtree(directorio, ignore_errors=True)
+
+    with open(ruta_salida, 'wb') as handle:
+        handle.write(contenido)
+
+
+def convertir_a_onnx(model, ruta_salida: str, opset: int = 13):
+    """
+    Exportar el modelo a ONNX con lote dinámico usando tf2onnx.
+    """
+    import tf2onnx
+
+    firma = [tf.TensorSpec((None, MAX_SEQUENCE_LENGTH), tf.int32, name='secuencias')]
+
+    @tf.function(input_signature=firma)
+    def serve(secuencias):
+        return model(secuencias, training=False)
+
+    tf2onnx.convert.from_function(serve, input_signature=firma, opset=opset, output_path=ruta_salida)
+
+
+def generar_secuencias_prueba(n_muestras: int, seed: int = 0) -> np.ndarray:
+    """
+    Secuencias aleatorias con padding al inicio y largos variados, como las
+    que produce pad_sequences en producción (incluye filas vacías).
+    """
+    rng = np.random.default_rng(seed)
+    secuencias = np.zeros((n_muestras, MAX_SEQUENCE_LENGTH), dtype=np.int32)
+    largos = rng.integers(0, MAX_SEQUENCE_LENGTH + 1, size=n_muestras)
+    for i, largo in enumerate(largos):
+        if largo:
+            secuencias[i, -largo:] = rng.integers(1, MAX_NB_WORDS, size=largo)
+    return secuencias
+
+
+def verificar_paridad(model, motor, n_muestras: int = 256) -> float:
+    """
+    Devolver la máxima diferencia absoluta entre las probabilidades del
+    modelo Keras y las del motor convertido.
+    """
+    secuencias = generar_secuencias_prueba(n_muestras)
+    esperado = model(secuencias, training=False).numpy()
+
+    # Lotes de varios tamaños para cubrir el reparto entre firmas del motor
+    obtenido = np.concatenate([
+        motor.predict(secuencias[:1]),
+        motor.predict(secuencias[1:4]),
+        motor.predict(secuencias[4:]),
+    ])
+    return float(np.abs(esperado - obtenido).max())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convertir el modelo BiLSTM a TFLite u ONNX")
+    parser.add_argument('--format', choices=sorted(SALIDAS_POR_DEFECTO), required=True)
+    parser.add_argument('--model', default=MODEL_PATH, help="Modelo Keras de origen (.h5)")
+    parser.add_argument('--output', help="Archivo de salida (por defecto según el formato)")
+    parser.add_argument('--batch-sizes', default='1,8,32',
+                        help="Tamaños de lote a exportar en TFLite, separados por comas")
+    parser.add_argument('--opset', type=int, default=13, help="Opset de ONNX")
+    parser.add_argument('--samples', type=int, default=256, help="Muestras para la verificación de paridad")
+    parser.add_argument('--tolerance', type=float, default=1e-4,
+                        help="Máxima diferencia absoluta permitida frente a Keras")
+    parser.add_argument('--skip-check', action='store_true', help="No verificar la paridad")
+    args = parser.parse_args()
+
+    salida = args.output or SALIDAS_POR_DEFECTO[args.format]
+
+    if not os.path.exists(args.model):
+        print(f"❌ No se encontró el modelo: {args.model}")
+        return 1
+
+    print(f"🔄 Cargando {args.model}...")
+    model = tf.keras.models.load_model(args.model)
+
+    # Se escribe a un temporal y solo se publica si pasa la paridad: un
+    # archivo que falla nunca queda donde INFERENCE_BACKEND lo cargaría
+    temporal = salida + '.tmp'
+    print(f"⚙️ Convirtiendo a {args.format}...")
+    try:
+        if args.format == 'tflite':
+            batch_sizes = sorted({int(valor) for valor in args.batch_sizes.split(',') if valor.strip()})
+            convertir_a_tflite(model, temporal, batch_sizes)
+        else:
+            convertir_a_onnx(model, temporal, opset=args.opset)
+        print(f"✅ Generado: {temporal} ({os.path.getsize(temporal) / 1024 / 1024:.1f} MB)")
+
+        if not args.skip_check:
+            print(f"🧪 Verificando paridad con Keras ({args.samples} muestras)...")
+            motor = crear_motor(args.format, temporal, MAX_SEQUENCE_LENGTH)
+            diferencia = verificar_paridad(model, motor, args.samples)
+            if diferencia > args.tolerance:
+                print(f"❌ Diferencia máxima {diferencia:.2e} supera la tolerancia {args.tolerance:.0e}: "
+                      f"no se publica {salida}")
+                return 1
+            print(f"✅ Paridad OK: diferencia máxima {diferencia:.2e} (tolerancia {args.tolerance:.0e})")
+
+        os.replace(temporal, salida)
+    finally:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+
+    print(f"✅ Publicado: {salida}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,178 @@
+"""
+Cuantización del modelo BiLSTM después del entrenamiento (int8 o float16)
+
+Genera un artefacto (ver artefacto.py) con los pesos en int8 (escala por fila
+del Embedding y por columna del resto) o en float16, lo evalúa contra el
+modelo float32 sobre la partición de prueba de DATASET_LIMPIO_FINAL.csv (la
+misma de train_test_split del entrenamiento) con classification_report y solo
+lo publica si el macro-F1 no cae más que --max-f1-drop. Si no pasa, el
+directorio de salida no se toca.
+
+app.py lo sirve con INFERENCE_BACKEND=numpy y MODEL_ARTIFACT_DIR apuntando al
+directorio generado.
+
+Ejemplos:
+    python cuantizar_modelo.py --mode int8
+    python cuantizar_modelo.py --mode float16 --embedding-only --output modelo_artefacto_f16
+    python cuantizar_modelo.py --mode int8 --dataset https://raw.githubusercontent.com/robincajas12/TRABAJOS_UNI/refs/heads/main/DATASET_LIMPIO_FINAL.csv
+"""
+
+import argparse
+import os
+import shutil
+import sys
+
+import numpy as np
+import pandas as pd
+from sklearn.metrics import classification_report
+from sklearn.model_selection import train_test_split
+
+from artefacto import CUANTIZACIONES, WEIGHTS, abrir_artefacto, exportar_desde_h5
+from bilstm_numpy import BiLSTMNumpy
+from vocabulario import cargar_tokenizer
+
+MAX_SEQUENCE_LENGTH = 100
+MODEL_PATH = 'modelo_final_sentiment.h5'
+DATASET_PATH = 'DATASET_LIMPIO_FINAL.csv'
+NOMBRES_CLASES = ['Negativo', 'Neutro', 'Positivo']
+
+
+def dividir_dataset(ruta: str, test_size: float = 0.20, seed: int = 42):
+    """
+    Devolver (entrenamiento, prueba) con las mismas filas que el
+    entrenamiento del BiLSTM: train_test_split con el mismo test_size y
+    random_state sobre el dataset completo elige las mismas filas.
+    """
+    df = pd.read_csv(ruta, usecols=['text_clean', 'sentiment_num'])
+    df['text_clean'] = df['text_clean'].astype(str)
+    indices_entrenamiento, indices_prueba = train_test_split(np.arange(len(df)), test_size=test_size,
+                                                             random_state=seed)
+    return df.iloc[np.sort(indices_entrenamiento)], df.iloc[np.sort(indices_prueba)]
+
+
+def submuestra(df: pd.DataFrame, max_muestras: int = None, seed: int = 42) -> pd.DataFrame:
+    if max_muestras and len(df) > max_muestras:
+        return df.sample(max_muestras, random_state=seed)
+    return df
+
+
+def particion_de_prueba(ruta: str, test_size: float = 0.20, seed: int = 42,
+                        max_muestras: int = None) -> pd.DataFrame:
+    """
+    Filas de prueba del entrenamiento; max_muestras toma una submuestra fija
+    para evaluar más rápido.
+    """
+    _, prueba = dividir_dataset(ruta, test_size, seed)
+    return submuestra(prueba, max_muestras, seed)
+
+
+def predecir_en_lotes(red: BiLSTMNumpy, secuencias: np.ndarray, batch_size: int = 512) -> np.ndarray:
+    return np.concatenate([red.predict(secuencias[inicio:inicio + batch_size])
+                           for inicio in range(0, len(secuencias), batch_size)])
+
+
+def reporte_clasificacion(y_true: np.ndarray, y_pred: np.ndarray):
+    """
+    Devolver (reporte en texto, macro-F1) de classification_report.
+    """
+    texto = classification_report(y_true, y_pred, labels=[0, 1, 2], target_names=NOMBRES_CLASES,
+                                  digits=4, zero_division=0)
+    reporte = classification_report(y_true, y_pred, labels=[0, 1, 2], target_names=NOMBRES_CLASES,
+                                    output_dict=True, zero_division=0)
+    return texto, reporte['macro avg']['f1-score']
+
+
+def evaluar(red: BiLSTMNumpy, secuencias: np.ndarray, y_true: np.ndarray, batch_size: int = 512):
+    """
+    Devolver (predicciones, reporte en texto, macro-F1).
+    """
+    y_pred = np.argmax(predecir_en_lotes(red, secuencias, batch_size), axis=1)
+    return (y_pred, *reporte_clasificacion(y_true, y_pred))
+
+
+def publicar(temporal: str, salida: str):
+    """
+    Reemplazar el directorio de salida por el artefacto ya validado.
+    """
+    anterior = salida.rstrip(os.sep) + '.anterior'
+    shutil.rmtree(anterior, ignore_errors=True)
+    if os.path.exists(salida):
+        os.replace(salida, anterior)
+    os.replace(temporal, salida)
+    shutil.rmtree(anterior, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cuantizar el modelo BiLSTM con verificación de macro-F1")
+    parser.add_argument('--mode', choices=CUANTIZACIONES, default='int8')
+    parser.add_argument('--embedding-only', action='store_true',
+                        help="Cuantizar solo el Embedding (los kernels quedan en float32)")
+    parser.add_argument('--model', default=MODEL_PATH, help="Modelo Keras de origen (.h5)")
+    parser.add_argument('--vocab', default='vocabulario.json')
+    parser.add_argument('--tokenizer', default='tokenizer.pickle',
+                        help="Se usa si no existe el vocabulario compacto")
+    parser.add_argument('--dataset', default=DATASET_PATH, help="CSV con text_clean y sentiment_num (ruta o URL)")
+    parser.add_argument('--test-size', type=float, default=0.20, help="Igual que en el entrenamiento")
+    parser.add_argument('--seed', type=int, default=42, help="random_state del entrenamiento")
+    parser.add_argument('--samples', type=int, default=20000,
+                        help="Máximo de filas de prueba a evaluar (0 = todas)")
+    parser.add_argument('--max-f1-drop', type=float, default=0.01,
+                        help="Caída máxima de macro-F1 permitida frente al modelo float32")
+    parser.add_argument('--output', help="Directorio del artefacto (por defecto modelo_artefacto_<mode>)")
+    parser.add_argument('--max-sequence-length', type=int, default=MAX_SEQUENCE_LENGTH)
+    args = parser.parse_args()
+
+    salida = args.output or f'modelo_artefacto_{args.mode}'
+    temporal = salida.rstrip(os.sep) + '.tmp'
+
+    if not os.path.exists(args.model):
+        print(f"❌ No se encontró el modelo: {args.model}")
+        return 1
+
+    print(f"🔄 Cargando {args.dataset}...")
+    prueba = particion_de_prueba(args.dataset, args.test_size, args.seed, args.samples)
+    tokenizer = cargar_tokenizer(args.vocab, args.tokenizer)
+    secuencias = tokenizer.texts_to_matrix_int32(prueba['text_clean'].values, args.max_sequence_length)
+    y_true = prueba['sentiment_num'].values.astype(np.int64)
+    print(f"   Filas de prueba: {len(prueba):,}")
+
+    print(f"⚙️ Cuantizando a {args.mode}{' (solo Embedding)' if args.embedding_only else ''}...")
+    shutil.rmtree(temporal, ignore_errors=True)
+    version = exportar_desde_h5(args.model, tokenizer, temporal, args.max_sequence_length,
+                                cuantizacion=args.mode, solo_embedding=args.embedding_only)
+
+    try:
+        print("🧪 Evaluando modelo float32...")
+        original = BiLSTMNumpy.desde_h5(args.model, args.max_sequence_length)
+        pred_original, texto_original, f1_original = evaluar(original, secuencias, y_true)
+        print(texto_original)
+
+        print(f"🧪 Evaluando modelo {args.mode}...")
+        cuantizado = BiLSTMNumpy.desde_artefacto(temporal)
+        pred_cuantizado, texto_cuantizado, f1_cuantizado = evaluar(cuantizado, secuencias, y_true)
+        print(texto_cuantizado)
+    except Exception:
+        shutil.rmtree(temporal, ignore_errors=True)
+        raise
+
+    caida = f1_original - f1_cuantizado
+    peso_cuantizado = os.path.getsize(os.path.join(temporal, WEIGHTS))
+    formas = [arreglo['shape'] for arreglo in abrir_artefacto(temporal).manifest['arrays']]
+    peso_original = 4 * sum(int(np.prod(forma)) for forma in formas)
+    print(f"   Pesos: {peso_original / 1024 / 1024:.1f} MB -> {peso_cuantizado / 1024 / 1024:.1f} MB")
+    print(f"   Predicciones iguales al float32: {np.mean(pred_original == pred_cuantizado):.2%}")
+    print(f"   Macro-F1: {f1_original:.4f} -> {f1_cuantizado:.4f} (caída {caida:+.4f}, máximo {args.max_f1_drop})")
+
+    if caida > args.max_f1_drop:
+        shutil.rmtree(temporal, ignore_errors=True)
+        print(f"❌ La caída de macro-F1 supera {args.max_f1_drop}: no se publica {salida}")
+        return 1
+
+    publicar(temporal, salida)
+    print(f"✅ Publicado: {salida} (versión {version}). Servir con "
+          f"INFERENCE_BACKEND=numpy MODEL_ARTIFACT_DIR={salida}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
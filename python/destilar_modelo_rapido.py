@@ -0,0 +1,198 @@
+"""
+Destilación del BiLSTM en el clasificador rápido de primera etapa (modelo_rapido.py)
+
+1. Puntúa con el BiLSTM (artefacto o .h5, motor NumPy) la partición de
+   entrenamiento de DATASET_LIMPIO_FINAL.csv y usa sus probabilidades como
+   etiquetas suaves.
+2. Entrena una regresión logística multinomial sobre n-gramas con hashing
+   minimizando la entropía cruzada contra esas probabilidades (cada texto
+   entra una vez por clase, con la probabilidad del BiLSTM como peso).
+3. En una partición de validación separada del entrenamiento
+   (--validation-size) elige el umbral de confianza más bajo con el que la
+   cascada (rápido si confianza >= umbral, BiLSTM si no) no pierde más de
+   --max-f1-drop de macro-F1 frente al BiLSTM solo y coincide con él en al
+   menos --min-agreement de los textos.
+4. Reporta la cascada con ese umbral sobre la partición de prueba, que no se
+   usó ni para entrenar ni para elegir el umbral.
+
+app.py lo carga desde FAST_PATH_MODEL (por defecto modelo_rapido.npz).
+
+Ejemplos:
+    python destilar_modelo_rapido.py
+    python destilar_modelo_rapido.py --buckets 1048576 --train-samples 0 --max-f1-drop 0.002
+"""
+
+import argparse
+import os
+import sys
+
+import numpy as np
+from scipy.sparse import csr_matrix, vstack
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import f1_score
+from sklearn.model_selection import train_test_split
+
+from artefacto import abrir_artefacto, es_artefacto
+from bilstm_numpy import BiLSTMNumpy
+from cuantizar_modelo import DATASET_PATH, dividir_dataset, predecir_en_lotes, reporte_clasificacion, submuestra
+from inference import huella_modelo
+from modelo_rapido import ClasificadorRapido, caracteristicas
+from vocabulario import cargar_tokenizer
+
+MAX_SEQUENCE_LENGTH = 100
+MODEL_ARTIFACT_DIR = 'modelo_artefacto'
+MODEL_PATH = 'modelo_final_sentiment.h5'
+
+
+def cargar_bilstm(ruta: str, args):
+    """
+    Devolver (red, tokenizer, versión) del modelo maestro, con la misma
+    versión que reporta app.py.
+    """
+    if es_artefacto(ruta):
+        artefacto = abrir_artefacto(ruta)
+        return BiLSTMNumpy.desde_artefacto(ruta), artefacto.tokenizer(), artefacto.version
+    tokenizer = cargar_tokenizer(args.vocab, args.tokenizer)
+    return BiLSTMNumpy.desde_h5(ruta, args.max_sequence_length), tokenizer, huella_modelo(ruta)
+
+
+def matriz(textos, buckets: int, ngramas: int) -> csr_matrix:
+    filas, columnas, valores = caracteristicas(textos, buckets, ngramas)
+    return csr_matrix((valores, (filas, columnas)), shape=(len(textos), buckets))
+
+
+def entrenar(x: csr_matrix, suaves: np.ndarray, c: float, max_iter: int) -> LogisticRegression:
+    """
+    Regresión logística con etiquetas suaves: cada fila se repite una vez
+    por clase con peso igual a la probabilidad del BiLSTM, que es la misma
+    entropía cruzada que entrenar contra las probabilidades.
+    """
+    clases = suaves.shape[1]
+    x_repetida = vstack([x] * clases, format='csr')
+    y_repetida = np.repeat(np.arange(clases), x.shape[0])
+    modelo = LogisticRegression(C=c, max_iter=max_iter)
+    modelo.fit(x_repetida, y_repetida, sample_weight=suaves.T.ravel())
+    return modelo
+
+
+def elegir_umbral(confianza, pred_rapida, pred_bilstm, y_true, max_caida: float, min_acuerdo: float):
+    """
+    Umbral más bajo que cumple ambas condiciones, o None si ninguno las cumple.
+    Devuelve (umbral, cobertura, macro-F1 de la cascada, acuerdo con el BiLSTM).
+    """
+    f1_bilstm = f1_score(y_true, pred_bilstm, labels=[0, 1, 2], average='macro', zero_division=0)
+    for umbral in np.unique(np.round(confianza, 3)):
+        rapida = confianza >= umbral
+        cascada = np.where(rapida, pred_rapida, pred_bilstm)
+        acuerdo = float(np.mean(cascada == pred_bilstm))
+        if acuerdo < min_acuerdo:
+            continue
+        f1 = f1_score(y_true, cascada, labels=[0, 1, 2], average='macro', zero_division=0)
+        if f1_bilstm - f1 <= max_caida:
+            return float(umbral), float(rapida.mean()), f1, acuerdo
+    return None
+
+
+def puntuar_particion(df, red, tokenizer, rapido: ClasificadorRapido):
+    """
+    Devolver (probabilidades del rápido, predicción del rápido, predicción
+    del BiLSTM, etiquetas) de una partición.
+    """
+    textos = df['text_clean'].tolist()
+    pred_bilstm = np.argmax(predecir_en_lotes(
+        red, tokenizer.texts_to_matrix_int32(textos, red.max_sequence_length)), axis=1)
+    probabilidades = rapido.predict_proba(textos)
+    return (probabilidades, np.argmax(probabilidades, axis=1), pred_bilstm,
+            df['sentiment_num'].values.astype(np.int64))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Destilar el BiLSTM en un clasificador rápido de n-gramas")
+    parser.add_argument('--model', help="Artefacto o .h5 del BiLSTM (por defecto el artefacto si existe)")
+    parser.add_argument('--vocab', default='vocabulario.json')
+    parser.add_argument('--tokenizer', default='tokenizer.pickle',
+                        help="Se usa si no existe el vocabulario compacto")
+    parser.add_argument('--dataset', default=DATASET_PATH, help="CSV con text_clean y sentiment_num (ruta o URL)")
+    parser.add_argument('--test-size', type=float, default=0.20, help="Igual que en el entrenamiento")
+    parser.add_argument('--seed', type=int, default=42, help="random_state del entrenamiento")
+    parser.add_argument('--train-samples', type=int, default=200000,
+                        help="Máximo de filas de entrenamiento (0 = todas)")
+    parser.add_argument('--validation-size', type=float, default=0.10,
+                        help="Fracción del entrenamiento que se aparta para ajustar el umbral")
+    parser.add_argument('--validation-samples', type=int, default=20000,
+                        help="Máximo de filas de validación para ajustar el umbral (0 = todas)")
+    parser.add_argument('--samples', type=int, default=20000,
+                        help="Máximo de filas de prueba para el reporte final (0 = todas)")
+    parser.add_argument('--buckets', type=int, default=2 ** 18, help="Columnas del hashing de n-gramas")
+    parser.add_argument('--ngrams', type=int, default=2, help="Largo máximo de los n-gramas (en palabras)")
+    parser.add_argument('--C', type=float, default=10.0, help="Inverso de la regularización L2")
+    parser.add_argument('--max-iter', type=int, default=300)
+    parser.add_argument('--max-f1-drop', type=float, default=0.005,
+                        help="Caída máxima de macro-F1 de la cascada frente al BiLSTM solo")
+    parser.add_argument('--min-agreement', type=float, default=0.98,
+                        help="Fracción mínima de textos en que la cascada coincide con el BiLSTM")
+    parser.add_argument('--output', default='modelo_rapido.npz')
+    parser.add_argument('--max-sequence-length', type=int, default=MAX_SEQUENCE_LENGTH)
+    args = parser.parse_args()
+
+    ruta_modelo = args.model or (MODEL_ARTIFACT_DIR if es_artefacto(MODEL_ARTIFACT_DIR) else MODEL_PATH)
+    if not os.path.exists(ruta_modelo):
+        print(f"❌ No se encontró el modelo: {ruta_modelo}")
+        return 1
+
+    print(f"🔄 Cargando {args.dataset} y el BiLSTM ({ruta_modelo})...")
+    entrenamiento, prueba = dividir_dataset(args.dataset, args.test_size, args.seed)
+    entrenamiento, validacion = train_test_split(entrenamiento, test_size=args.validation_size,
+                                                 random_state=args.seed)
+    entrenamiento = submuestra(entrenamiento, args.train_samples, args.seed)
+    validacion = submuestra(validacion, args.validation_samples, args.seed)
+    prueba = submuestra(prueba, args.samples, args.seed)
+    red, tokenizer, version = cargar_bilstm(ruta_modelo, args)
+    print(f"   Entrenamiento: {len(entrenamiento):,} | Validación: {len(validacion):,} | "
+          f"Prueba: {len(prueba):,} | BiLSTM {version}")
+
+    print("🧪 Etiquetas suaves del BiLSTM...")
+    textos = entrenamiento['text_clean'].tolist()
+    suaves = predecir_en_lotes(red, tokenizer.texts_to_matrix_int32(textos, red.max_sequence_length))
+
+    print(f"⚙️ Entrenando regresión logística ({args.buckets:,} buckets, n-gramas 1-{args.ngrams})...")
+    modelo = entrenar(matriz(textos, args.buckets, args.ngrams), suaves, args.C, args.max_iter)
+
+    rapido = ClasificadorRapido(modelo.coef_.T, modelo.intercept_, umbral=1.0, ngramas=args.ngrams,
+                                version_bilstm=version)
+
+    print("🎚️ Ajustando el umbral en la validación...")
+    prob_validacion, pred_validacion, bilstm_validacion, y_validacion = puntuar_particion(
+        validacion, red, tokenizer, rapido)
+    print(f"   Clasificador rápido solo: coincide con el BiLSTM en "
+          f"{np.mean(pred_validacion == bilstm_validacion):.2%}")
+    eleccion = elegir_umbral(prob_validacion.max(axis=1), pred_validacion, bilstm_validacion, y_validacion,
+                             args.max_f1_drop, args.min_agreement)
+    if eleccion is None:
+        print("❌ Ningún umbral cumple --max-f1-drop y --min-agreement: no se guarda el clasificador")
+        return 1
+    umbral = eleccion[0]
+    rapido.umbral = umbral
+
+    # El reporte es sobre la prueba, que no se usó para elegir el umbral
+    prob_rapida, pred_rapida, pred_bilstm, y_true = puntuar_particion(prueba, red, tokenizer, rapido)
+    rapida = prob_rapida.max(axis=1) >= umbral
+    cascada = np.where(rapida, pred_rapida, pred_bilstm)
+    texto_bilstm, f1_bilstm = reporte_clasificacion(y_true, pred_bilstm)
+    texto_cascada, f1_cascada = reporte_clasificacion(y_true, cascada)
+    print("\n📝 BiLSTM solo (prueba):")
+    print(texto_bilstm)
+    print(f"📝 Cascada con umbral {umbral:.3f} (prueba):")
+    print(texto_cascada)
+    print(f"   Ruta rápida: {rapida.mean():.1%} de los textos | coincide con el BiLSTM: "
+          f"{np.mean(cascada == pred_bilstm):.2%}")
+    print(f"   Macro-F1: {f1_bilstm:.4f} -> {f1_cascada:.4f} (caída {f1_bilstm - f1_cascada:+.4f}, "
+          f"máximo ajustado en validación {args.max_f1_drop})")
+
+    rapido.guardar(args.output)
+    print(f"✅ Guardado: {args.output} ({os.path.getsize(args.output) / 1024 / 1024:.1f} MB)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,53 @@
+"""
+Configuración de gunicorn (se lee sola si gunicorn arranca en este directorio)
+
+Con GUNICORN_PRELOAD=1 (por defecto) la app se importa una sola vez en el
+proceso maestro y los workers nacen por fork: los pesos del modelo y el
+vocabulario quedan en páginas compartidas (copy-on-write) en vez de una copia
+por worker, y arrancar un worker no vuelve a leer los archivos. Cada worker
+crea después del fork lo que no se puede heredar (app.preparar_worker).
+
+Para que el recolector de basura de los workers no escriba en los objetos
+heredados (y así copie sus páginas), el gc se desactiva al leer este archivo,
+antes de que gunicorn importe la app (Arbiter.setup corre antes que
+on_starting), y los objetos del maestro se congelan antes de cada fork
+(gc.freeze). Desde el primer fork el maestro vuelve a tener el gc activo.
+"""
+
+import gc
+import os
+import sys
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:5001')
+workers = int(os.getenv('WEB_CONCURRENCY', 2))
+threads = int(os.getenv('GUNICORN_THREADS', 8))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 120))
+preload_app = os.getenv('GUNICORN_PRELOAD', '1') == '1'
+
+if preload_app:
+    # app.py deja para preparar_worker() lo que debe crearse después del fork
+    os.environ['APP_PRELOADED'] = '1'
+    # Este archivo se ejecuta antes de importar la app: el modelo y el
+    # vocabulario se cargan sin pasadas del gc que toquen sus objetos
+    gc.disable()
+
+
+def pre_fork(server, worker):
+    if preload_app:
+        gc.freeze()
+        # Lo heredado ya está congelado (el gc no lo recorre): el maestro
+        # recupera el gc desde el primer fork. when_ready no sirve para esto
+        # porque gunicorn lo llama antes de crear los primeros workers
+        gc.enable()
+
+
+def post_fork(server, worker):
+    if preload_app:
+        gc.enable()
+
+
+def post_worker_init(worker):
+    # La app ya está importada: en el maestro (preload) o recién en este worker
+    modulo = sys.modules.get('app')
+    if preload_app and modulo is not None and hasattr(modulo, 'preparar_worker'):
+        modulo.preparar_worker()
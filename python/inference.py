@@ -0,0 +1,345 @@
+"""
+Motores de inferencia para el modelo de sentimiento BiLSTM
+
+Todos los motores exponen la misma interfaz:
+- predict(secuencias_pad) -> arreglo (n, 3) de probabilidades
+- warmup() para preparar el motor antes del primer request
+- longitud_variable: True si predict() acepta matrices más angostas que
+  max_sequence_length con el mismo resultado que el padding completo
+
+El backend se elige al iniciar con crear_motor(); solo el backend 'keras'
+importa TensorFlow completo y el backend 'numpy' no necesita ningún runtime.
+
+Los pesos se leen al crear el motor, pero las sesiones de los runtimes
+(TensorFlow, intérprete TFLite, onnxruntime) se crean recién en el proceso que
+predice: con gunicorn --preload el proceso maestro carga los pesos una vez,
+los workers los comparten por copy-on-write y cada uno arma su sesión después
+del fork (los hilos internos de esos runtimes no sobreviven al fork).
+"""
+
+import hashlib
+import os
+import re
+import threading
+from typing import Iterable, Sequence
+
+import numpy as np
+
+BACKENDS = ('keras', 'tflite', 'onnx', 'numpy')
+
+
+def aplicar_padding(secuencias: Sequence[Sequence[int]], maxlen: int) -> np.ndarray:
+    """
+    Equivalente a pad_sequences(secuencias, maxlen) de Keras (padding y
+    truncado al inicio) sin depender de TensorFlow.
+    """
+    matriz = np.zeros((len(secuencias), maxlen), dtype=np.int32)
+    for i, secuencia in enumerate(secuencias):
+        if len(secuencia):
+            recorte = secuencia[-maxlen:]
+            matriz[i, maxlen - len(recorte):] = recorte
+    return matriz
+
+
+def huella_modelo(ruta: str, largo: int = 12) -> str:
+    """
+    Identificador de versión del modelo: prefijo del SHA-256 del archivo.
+    """
+    digest = hashlib.sha256()
+    with open(ruta, 'rb') as handle:
+        for bloque in iter(lambda: handle.read(1024 * 1024), b''):
+            digest.update(bloque)
+    return digest.hexdigest()[:largo]
+
+
+def predecir_por_cubetas(motor, secuencias: Sequence[Sequence[int]], cubetas: Iterable[int],
+                         max_sequence_length: int) -> np.ndarray:
+    """
+    Agrupar las secuencias por largo real en cubetas (p. ej. 16/32/64/100),
+    ejecutar cada cubeta con su propio ancho de padding y devolver las
+    probabilidades en el orden original.
+
+    Si el motor no garantiza el mismo resultado con anchos menores
+    (longitud_variable=False) se usa el padding completo en un solo lote.
+    """
+    if not getattr(motor, 'longitud_variable', False):
+        return motor.predict(aplicar_padding(secuencias, max_sequence_length))
+
+    anchos = sorted({min(int(cubeta), max_sequence_length) for cubeta in cubetas} | {max_sequence_length})
+    largos = np.fromiter((min(len(secuencia), max_sequence_length) for secuencia in secuencias),
+                         dtype=np.int32, count=len(secuencias))
+
+    probabilidades = None
+    limite_inferior = -1
+    for ancho in anchos:
+        indices = np.flatnonzero((largos > limite_inferior) & (largos <= ancho))
+        limite_inferior = ancho
+        if not len(indices):
+            continue
+
+        salida = motor.predict(aplicar_padding([secuencias[i] for i in indices], ancho))
+        if probabilidades is None:
+            probabilidades = np.empty((len(secuencias), salida.shape[1]), dtype=np.float32)
+        probabilidades[indices] = salida
+
+    if probabilidades is None:
+        return motor.predict(aplicar_padding(secuencias, max_sequence_length))
+    return probabilidades
+
+
+class _SesionPorProceso:
+    """
+    Sesión del runtime creada en el primer uso dentro de cada proceso.
+    """
+
+    def _iniciar_sesion_por_proceso(self):
+        self._sesion = None
+        self._pid_sesion = None
+        self._lock_sesion = threading.Lock()
+
+    def _crear_sesion(self):
+        raise NotImplementedError
+
+    @property
+    def sesion(self):
+        pid = os.getpid()
+        if self._pid_sesion != pid:
+            with self._lock_sesion:
+                if self._pid_sesion != pid:
+                    self._sesion = self._crear_sesion()
+                    self._pid_sesion = pid
+        return self._sesion
+
+
+class KerasInferenceEngine(_SesionPorProceso):
+    def __init__(self, model_path: str, max_sequence_length: int):
+        """
+        Modelo .h5 de Keras. TensorFlow no es seguro ante un fork, así que el
+        modelo se carga recién en el proceso que predice (ver _crear_sesion):
+        con este backend los workers no comparten pesos.
+        """
+        self.model_path = model_path
+        self.max_sequence_length = max_sequence_length
+        self._iniciar_sesion_por_proceso()
+
+    def _crear_sesion(self):
+        """
+        Cargar el modelo .h5 y preparar una función compilada de forma fija.
+
+        En lugar de model.predict() (que arma un data adapter e itera como si
+        fuera un dataset en cada llamada) se traza una sola vez un tf.function
+        con firma (None, max_sequence_length) int32 que llama directamente a
+        model(x, training=False).
+
+        Solo si el Embedding usa mask_zero los ceros iniciales no cambian el
+        resultado; en ese caso la firma admite cualquier ancho para poder
+        ejecutar cubetas más cortas.
+        """
+        import tensorflow as tf
+
+        model = tf.keras.models.load_model(self.model_path)
+        longitud_variable = any(getattr(capa, 'mask_zero', False) for capa in model.layers)
+
+        ancho = None if longitud_variable else self.max_sequence_length
+        firma = [tf.TensorSpec(shape=(None, ancho), dtype=tf.int32)]
+        inferir = tf.function(lambda secuencias: model(secuencias, training=False), input_signature=firma)
+        return model, longitud_variable, inferir
+
+    @property
+    def model(self):
+        return self.sesion[0]
+
+    @property
+    def longitud_variable(self) -> bool:
+        return self.sesion[1]
+
+    def warmup(self, batch_sizes=(1, 8, 32)):
+        """
+        Ejecutar lotes de ceros para trazar la función antes del primer request.
+        """
+        for batch_size in batch_sizes:
+            self.predict(np.zeros((batch_size, self.max_sequence_length), dtype=np.int32))
+
+    def predict(self, secuencias_pad: np.ndarray) -> np.ndarray:
+        """
+        Devolver las probabilidades (n, 3) para una matriz de secuencias con padding.
+        """
+        entrada = np.asarray(secuencias_pad, dtype=np.int32)
+        return self.sesion[2](entrada).numpy()
+
+
+def _clase_interprete_tflite():
+    """
+    Buscar un intérprete TFLite, del más liviano al más pesado.
+    """
+    try:
+        from ai_edge_litert.interpreter import Interpreter
+        return Interpreter
+    except ImportError:
+        pass
+    try:
+        from tflite_runtime.interpreter import Interpreter
+        return Interpreter
+    except ImportError:
+        pass
+    import tensorflow as tf
+    return tf.lite.Interpreter
+
+
+class TFLiteInferenceEngine(_SesionPorProceso):
+    def __init__(self, model_path: str, max_sequence_length: int):
+        """
+        Cargar un modelo .tflite generado con convert_model.py.
+
+        El LSTM solo se puede convertir a operaciones nativas de TFLite con
+        un tamaño de lote fijo, por eso el archivo trae una firma por tamaño
+        (serve_1, serve_8, serve_32, ...). Cada lote se reparte entre esas
+        firmas y el último bloque se completa con ceros.
+
+        El archivo se lee una vez (los workers comparten esos bytes: el
+        intérprete usa el flatbuffer sin copiarlo) y el intérprete se crea
+        en cada proceso.
+        """
+        self.model_path = model_path
+        self.max_sequence_length = max_sequence_length
+        self.longitud_variable = False
+        with open(model_path, 'rb') as handle:
+            self._contenido = handle.read()
+        self._lock = threading.Lock()
+        self._iniciar_sesion_por_proceso()
+
+    def _crear_sesion(self):
+        interpreter = _clase_interprete_tflite()(model_content=self._contenido)
+        runners = {}
+        for clave, firma in interpreter.get_signature_list().items():
+            coincidencia = re.fullmatch(r'serve_(\d+)', clave)
+            if coincidencia:
+                runners[int(coincidencia.group(1))] = (
+                    interpreter.get_signature_runner(clave),
+                    firma['inputs'][0],
+                    firma['outputs'][0],
+                )
+        if not runners:
+            raise ValueError(f"El modelo TFLite no tiene firmas 'serve_<lote>': {self.model_path}")
+        return interpreter, runners, sorted(runners)
+
+    @property
+    def interpreter(self):
+        return self.sesion[0]
+
+    @property
+    def batch_sizes(self):
+        return self.sesion[2]
+
+    def warmup(self):
+        for batch_size in self.batch_sizes:
+            self.predict(np.zeros((batch_size, self.max_sequence_length), dtype=np.int32))
+
+    def _tamano_bloque(self, restante: int) -> int:
+        # La firma más chica que cubre lo que falta; si ninguna alcanza, la más grande
+        for batch_size in self.batch_sizes:
+            if batch_size >= restante:
+                return batch_size
+        return self.batch_sizes[-1]
+
+    def predict(self, secuencias_pad: np.ndarray) -> np.ndarray:
+        entrada = np.asarray(secuencias_pad, dtype=np.int32)
+        resultados = []
+        inicio = 0
+        runners = self.sesion[1]
+        with self._lock:
+            while inicio < len(entrada):
+                batch_size = self._tamano_bloque(len(entrada) - inicio)
+                bloque = entrada[inicio:inicio + batch_size]
+                filas = len(bloque)
+                if filas < batch_size:
+                    relleno = np.zeros((batch_size - filas, entrada.shape[1]), dtype=np.int32)
+                    bloque = np.concatenate([bloque, relleno])
+
+                runner, nombre_entrada, nombre_salida = runners[batch_size]
+                salida = runner(**{nombre_entrada: bloque})[nombre_salida]
+                resultados.append(np.array(salida[:filas]))
+                inicio += filas
+        if not resultados:
+            return np.zeros((0, 3), dtype=np.float32)
+        return np.concatenate(resultados)
+
+
+class ONNXInferenceEngine(_SesionPorProceso):
+    def __init__(self, model_path: str, max_sequence_length: int):
+        """
+        Cargar un modelo .onnx generado con convert_model.py usando onnxruntime.
+        El archivo se lee una vez; la InferenceSession (con sus hilos) se crea
+        en cada proceso.
+        """
+        self.model_path = model_path
+        self.max_sequence_length = max_sequence_length
+        self.longitud_variable = False
+        with open(model_path, 'rb') as handle:
+            self._contenido = handle.read()
+        self._iniciar_sesion_por_proceso()
+
+    def _crear_sesion(self):
+        import onnxruntime as ort
+
+        return ort.InferenceSession(self._contenido, providers=['CPUExecutionProvider'])
+
+    @property
+    def session(self):
+        return self.sesion
+
+    def warmup(self, batch_sizes=(1, 8, 32)):
+        for batch_size in batch_sizes:
+            self.predict(np.zeros((batch_size, self.max_sequence_length), dtype=np.int32))
+
+    def predict(self, secuencias_pad: np.ndarray) -> np.ndarray:
+        entrada = np.asarray(secuencias_pad, dtype=np.int32)
+        sesion = self.sesion
+        return sesion.run(None, {sesion.get_inputs()[0].name: entrada})[0]
+
+
+class NumpyInferenceEngine:
+    def __init__(self, model_path: str, max_sequence_length: int):
+        """
+        Ejecutar el BiLSTM en NumPy puro con los pesos leídos del .h5 (ver bilstm_numpy.py).
+
+        Acepta matrices más angostas que max_sequence_length: la red repone el
+        padding implícito de forma exacta, así que las cubetas cortas dan el
+        mismo resultado que el padding completo.
+
+        No tiene estado por proceso: con --preload los pesos cargados en el
+        maestro se comparten tal cual entre los workers.
+
+        model_path puede ser también un directorio de artefacto (artefacto.py):
+        los pesos se abren con np.memmap en vez de leerse del .h5.
+        """
+        from bilstm_numpy import BiLSTMNumpy
+
+        self.max_sequence_length = max_sequence_length
+        self.longitud_variable = True
+        if os.path.isdir(model_path):
+            self.red = BiLSTMNumpy.desde_artefacto(model_path)
+            self.max_sequence_length = self.red.max_sequence_length
+        else:
+            self.red = BiLSTMNumpy.desde_h5(model_path, max_sequence_length)
+
+    def warmup(self):
+        self.predict(np.zeros((1, self.max_sequence_length), dtype=np.int32))
+
+    def predict(self, secuencias_pad: np.ndarray) -> np.ndarray:
+        return self.red.predict(secuencias_pad)
+
+
+def crear_motor(backend: str, model_path: str, max_sequence_length: int):
+    """
+    Crear el motor de inferencia para el backend indicado ('keras', 'tflite', 'onnx' o 'numpy').
+    """
+    motores = {
+        'keras': KerasInferenceEngine,
+        'tflite': TFLiteInferenceEngine,
+        'onnx': ONNXInferenceEngine,
+        'numpy': NumpyInferenceEngine,
+    }
+    if backend not in motores:
+        raise ValueError(f"INFERENCE_BACKEND desconocido: '{backend}'. Opciones: {', '.join(BACKENDS)}")
+    return motores[backend](model_path, max_sequence_length)
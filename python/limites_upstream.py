@@ -0,0 +1,406 @@
+"""
+Planificador de solicitudes a las APIs externas (Bluesky, Reddit)
+
+Por cada upstream mantiene:
+- un token bucket que reparte las solicitudes (tasa y ráfaga configurables)
+- los límites anunciados por las cabeceras de rate limit (RateLimit-*,
+  X-RateLimit-*, Retry-After): al agotarse se espera al reinicio de la ventana
+- reintentos con backoff exponencial y jitter, acotados por un presupuesto
+  de reintentos (no más de ~20% de solicitudes extra)
+- un circuit breaker que deja de llamar tras varios fallos seguidos
+
+Los fallos del upstream se informan con ErrorUpstream en vez de parecer
+"sin resultados".
+"""
+
+import asyncio
+import os
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+# Códigos HTTP que indican un problema pasajero del upstream
+ESTADOS_REINTENTABLES = {408, 425, 429, 500, 502, 503, 504}
+# Excepciones de red (sin respuesta HTTP) de httpx/atproto, requests/prawcore
+EXCEPCIONES_DE_RED = {
+    'NetworkError', 'InvokeTimeoutError', 'RequestException', 'ConnectionError',
+    'Timeout', 'ReadTimeout', 'ConnectTimeout', 'TimeoutError', 'TimeoutException',
+}
+
+# Configuración por upstream: (solicitudes por segundo, ráfaga)
+UPSTREAMS = {
+    'bluesky': (float(os.getenv('UPSTREAM_RATE_BLUESKY', 10)), int(os.getenv('UPSTREAM_BURST_BLUESKY', 20))),
+    'reddit': (float(os.getenv('UPSTREAM_RATE_REDDIT', 1.5)), int(os.getenv('UPSTREAM_BURST_REDDIT', 5))),
+}
+UPSTREAM_MAX_RETRIES = int(os.getenv('UPSTREAM_MAX_RETRIES', 3))
+UPSTREAM_BACKOFF_BASE = float(os.getenv('UPSTREAM_BACKOFF_BASE', 0.25))
+UPSTREAM_BACKOFF_MAX = float(os.getenv('UPSTREAM_BACKOFF_MAX', 8))
+# Espera máxima antes de una solicitud: si el límite exige más, se falla
+# enseguida con retry_after en vez de retener el hilo de la solicitud
+UPSTREAM_MAX_WAIT = float(os.getenv('UPSTREAM_MAX_WAIT', 10))
+UPSTREAM_RETRY_RATIO = float(os.getenv('UPSTREAM_RETRY_RATIO', 0.2))
+UPSTREAM_RETRY_BUDGET = float(os.getenv('UPSTREAM_RETRY_BUDGET', 10))
+UPSTREAM_BREAKER_FAILURES = int(os.getenv('UPSTREAM_BREAKER_FAILURES', 5))
+UPSTREAM_BREAKER_SECONDS = float(os.getenv('UPSTREAM_BREAKER_SECONDS', 30))
+
+
+class ErrorUpstream(Exception):
+    def __init__(self, host: str, motivo: str, retry_after: Optional[float] = None,
+                 status: Optional[int] = None):
+        """
+        El upstream no pudo responder. motivo es 'rate_limited',
+        'circuit_open' o 'unavailable'; retry_after (segundos) es cuándo
+        conviene volver a intentar, si se sabe.
+        """
+        self.host = host
+        self.motivo = motivo
+        self.retry_after = retry_after
+        self.status = status
+        detalle = f", reintentar en {retry_after:.0f}s" if retry_after else ""
+        super().__init__(f"{host}: {motivo} (HTTP {status}){detalle}" if status else f"{host}: {motivo}{detalle}")
+
+
+def _cabecera(headers, nombre: str) -> Optional[str]:
+    if not headers:
+        return None
+    for clave, valor in headers.items():
+        if clave.lower() == nombre:
+            return valor
+    return None
+
+
+def _segundos(valor: Optional[str]) -> Optional[float]:
+    """
+    Convertir un valor de reinicio/Retry-After a segundos desde ahora:
+    acepta segundos, un timestamp unix o una fecha HTTP.
+    """
+    if valor is None:
+        return None
+    try:
+        numero = float(str(valor).split(',')[0].strip())
+    except ValueError:
+        try:
+            return max(0.0, parsedate_to_datetime(valor).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+    # Valores enormes son un instante (epoch), no una duración
+    return max(0.0, numero - time.time()) if numero > 1e9 else max(0.0, numero)
+
+
+def leer_cabeceras_limite(headers) -> Tuple[Optional[float], Optional[float], Optional[float]]:
+    """
+    Devolver (restantes, segundos hasta el reinicio, retry_after) a partir
+    de las cabeceras de Bluesky (RateLimit-*) o Reddit (X-RateLimit-*).
+    """
+    restantes = _cabecera(headers, 'ratelimit-remaining') or _cabecera(headers, 'x-ratelimit-remaining')
+    reinicio = _cabecera(headers, 'ratelimit-reset') or _cabecera(headers, 'x-ratelimit-reset')
+    try:
+        restantes = float(str(restantes).split(',')[0]) if restantes is not None else None
+    except ValueError:
+        restantes = None
+    return restantes, _segundos(reinicio), _segundos(_cabecera(headers, 'retry-after'))
+
+
+def clasificar_error(error: Exception) -> Tuple[bool, Optional[int], Any]:
+    """
+    Devolver (reintentable, status HTTP, cabeceras) de una excepción de
+    atproto o de prawcore.
+    """
+    respuesta = getattr(error, 'response', None)
+    status = getattr(respuesta, 'status_code', None)
+    headers = getattr(respuesta, 'headers', None)
+    if status is not None:
+        return status in ESTADOS_REINTENTABLES, status, headers
+    return type(error).__name__ in EXCEPCIONES_DE_RED, None, None
+
+
+class TokenBucket:
+    def __init__(self, tasa: float, rafaga: int):
+        self.tasa = max(float(tasa), 1e-6)
+        self.rafaga = max(1, int(rafaga))
+        self.tokens = float(self.rafaga)
+        self._actualizado = time.monotonic()
+        # Tasa reducida mientras rija un límite anunciado por el upstream
+        self._tasa_temporal = None
+        self._tasa_temporal_hasta = 0.0
+
+    def _tasa_actual(self, ahora: float) -> float:
+        if self._tasa_temporal is not None and ahora < self._tasa_temporal_hasta:
+            return min(self.tasa, self._tasa_temporal)
+        return self.tasa
+
+    def reservar(self, ahora: float) -> float:
+        """
+        Tomar un token y devolver cuántos segundos hay que esperar para
+        usarlo (0 si había uno disponible). Se llama con el lock del host.
+        """
+        tasa = self._tasa_actual(ahora)
+        self.tokens = min(self.rafaga, self.tokens + (ahora - self._actualizado) * tasa)
+        self._actualizado = ahora
+        self.tokens -= 1.0
+        return 0.0 if self.tokens >= 0 else -self.tokens / tasa
+
+    def limitar(self, tasa: float, hasta: float):
+        self._tasa_temporal = max(tasa, 1e-3)
+        self._tasa_temporal_hasta = hasta
+
+
+class EstadoUpstream:
+    def __init__(self, host: str, tasa: float, rafaga: int):
+        self.host = host
+        self.bucket = TokenBucket(tasa, rafaga)
+        self.lock = threading.Lock()
+
+        self.bloqueado_hasta = 0.0
+        self.circuito = 'closed'
+        self.fallos_seguidos = 0
+        self.circuito_abierto_hasta = 0.0
+        self.prueba_en_curso = False
+        self.saldo_reintentos = UPSTREAM_RETRY_BUDGET
+
+        self.restantes = None
+        self.reinicio_en = None
+        self.contadores = {
+            'requests': 0, 'successes': 0, 'failures': 0, 'retries': 0, 'rate_limited': 0,
+            'rejected_circuit_open': 0, 'rejected_rate_limit': 0, 'retry_budget_exhausted': 0,
+        }
+        self.segundos_esperados = 0.0
+
+    # --- Antes de cada intento ---
+
+    def antes_de_llamar(self) -> float:
+        """
+        Verificar el circuito y el rate limit; devolver la espera necesaria
+        o lanzar ErrorUpstream si hay que fallar sin llamar.
+        """
+        with self.lock:
+            ahora = time.monotonic()
+            if self.circuito == 'open':
+                if ahora < self.circuito_abierto_hasta:
+                    self.contadores['rejected_circuit_open'] += 1
+                    raise ErrorUpstream(self.host, 'circuit_open', retry_after=self.circuito_abierto_hasta - ahora)
+                self.circuito = 'half_open'
+            if self.circuito == 'half_open':
+                # Una sola solicitud de prueba a la vez
+                if self.prueba_en_curso:
+                    self.contadores['rejected_circuit_open'] += 1
+                    raise ErrorUpstream(self.host, 'circuit_open', retry_after=1.0)
+                self.prueba_en_curso = True
+
+            espera = max(self.bucket.reservar(ahora), self.bloqueado_hasta - ahora)
+            if espera > UPSTREAM_MAX_WAIT:
+                # Devolver el token: esta solicitud no se hará
+                self.bucket.tokens += 1.0
+                self.prueba_en_curso = False
+                self.contadores['rejected_rate_limit'] += 1
+                raise ErrorUpstream(self.host, 'rate_limited', retry_after=espera)
+
+            self.contadores['requests'] += 1
+            self.segundos_esperados += espera
+            self.saldo_reintentos = min(UPSTREAM_RETRY_BUDGET, self.saldo_reintentos + UPSTREAM_RETRY_RATIO)
+            return espera
+
+    # --- Después de cada intento ---
+
+    def registrar_cabeceras(self, headers):
+        restantes, reinicio, retry_after = leer_cabeceras_limite(headers)
+        if restantes is None and retry_after is None:
+            return
+        with self.lock:
+            ahora = time.monotonic()
+            if retry_after:
+                self.bloqueado_hasta = max(self.bloqueado_hasta, ahora + retry_after)
+            if restantes is not None:
+                self.restantes = restantes
+                self.reinicio_en = reinicio
+                if reinicio:
+                    if restantes < 1:
+                        self.bloqueado_hasta = max(self.bloqueado_hasta, ahora + reinicio)
+                    else:
+                        # Repartir lo que queda de la ventana en vez de agotarlo en una ráfaga
+                        self.bucket.limitar(restantes / reinicio, ahora + reinicio)
+
+    def registrar_exito(self):
+        with self.lock:
+            self.contadores['successes'] += 1
+            self.fallos_seguidos = 0
+            self.circuito = 'closed'
+            self.prueba_en_curso = False
+
+    def registrar_fallo(self, status: Optional[int], headers):
+        if headers:
+            self.registrar_cabeceras(headers)
+        with self.lock:
+            self.contadores['failures'] += 1
+            if status == 429:
+                self.contadores['rate_limited'] += 1
+            self.fallos_seguidos += 1
+            self.prueba_en_curso = False
+            if self.circuito == 'half_open' or self.fallos_seguidos >= UPSTREAM_BREAKER_FAILURES:
+                self.circuito = 'open'
+                self.circuito_abierto_hasta = time.monotonic() + UPSTREAM_BREAKER_SECONDS
+
+    def liberar_prueba(self):
+        # El intento terminó con un error que no dice nada de la salud del upstream
+        with self.lock:
+            self.prueba_en_curso = False
+
+    def gastar_reintento(self) -> bool:
+        with self.lock:
+            if self.saldo_reintentos < 1.0:
+                self.contadores['retry_budget_exhausted'] += 1
+                return False
+            self.saldo_reintentos -= 1.0
+            self.contadores['retries'] += 1
+            return True
+
+    def espera_reintento(self, intento: int) -> float:
+        """
+        Backoff exponencial con jitter completo, o lo que pida el upstream
+        (Retry-After / reinicio de la ventana) si es mayor.
+        """
+        espera = random.uniform(0, min(UPSTREAM_BACKOFF_MAX, UPSTREAM_BACKOFF_BASE * (2 ** intento)))
+        return max(espera, self.bloqueado_hasta - time.monotonic())
+
+    def estadisticas(self) -> Dict:
+        with self.lock:
+            ahora = time.monotonic()
+            return {
+                "circuit": self.circuito,
+                "circuit_open_for_seconds": round(max(0.0, self.circuito_abierto_hasta - ahora), 2)
+                if self.circuito == 'open' else 0.0,
+                "consecutive_failures": self.fallos_seguidos,
+                "rate_per_second": self.bucket._tasa_actual(ahora),
+                "burst": self.bucket.rafaga,
+                "tokens": round(max(self.bucket.tokens, 0.0), 2),
+                "blocked_for_seconds": round(max(0.0, self.bloqueado_hasta - ahora), 2),
+                "upstream_remaining": self.restantes,
+                "upstream_reset_seconds": round(self.reinicio_en, 2) if self.reinicio_en is not None else None,
+                "retry_budget": round(self.saldo_reintentos, 2),
+                "waited_seconds": round(self.segundos_esperados, 3),
+                **self.contadores,
+            }
+
+
+class PlanificadorUpstream:
+    def __init__(self, configuracion: Dict[str, Tuple[float, int]] = None):
+        self.configuracion = dict(configuracion or UPSTREAMS)
+        self._estados: Dict[str, EstadoUpstream] = {}
+        self._lock = threading.Lock()
+
+    def estado(self, host: str) -> EstadoUpstream:
+        estado = self._estados.get(host)
+        if estado is None:
+            with self._lock:
+                estado = self._estados.get(host)
+                if estado is None:
+                    tasa, rafaga = self.configuracion.get(host, (10.0, 10))
+                    estado = self._estados[host] = EstadoUpstream(host, tasa, rafaga)
+        return estado
+
+    def _manejar_error(self, estado: EstadoUpstream, error: Exception, intento: int) -> float:
+        """
+        Registrar un intento fallido. Devuelve la espera antes de reintentar
+        o lanza la excepción que corresponde si no hay que reintentar.
+        """
+        reintentable, status, headers = clasificar_error(error)
+        if not reintentable:
+            # 4xx (no encontrado, sesión expirada, ...): el upstream está sano
+            estado.liberar_prueba()
+            raise error
+
+        estado.registrar_fallo(status, headers)
+        motivo = 'rate_limited' if status == 429 else 'unavailable'
+        espera = estado.espera_reintento(intento)
+        # Si el upstream pide esperar demasiado no se retiene el hilo: se
+        # informa enseguida con retry_after
+        if (intento >= UPSTREAM_MAX_RETRIES or espera > UPSTREAM_MAX_WAIT
+                or estado.circuito == 'open' or not estado.gastar_reintento()):
+            retry_after = max(0.0, estado.bloqueado_hasta - time.monotonic()) or None
+            raise ErrorUpstream(estado.host, motivo, retry_after=retry_after, status=status) from error
+        return espera
+
+    def ejecutar(self, host: str, funcion: Callable[[], Any]) -> Any:
+        """
+        Llamar funcion() respetando el rate limit del host, con reintentos
+        y circuit breaker.
+        """
+        estado = self.estado(host)
+        intento = 0
+        while True:
+            espera = estado.antes_de_llamar()
+            if espera > 0:
+                time.sleep(espera)
+            try:
+                resultado = funcion()
+            except Exception as e:
+                time.sleep(self._manejar_error(estado, e, intento))
+                intento += 1
+                continue
+            estado.registrar_exito()
+            return resultado
+
+    async def ejecutar_async(self, host: str, funcion: Callable[[], Awaitable]) -> Any:
+        """
+        Igual que ejecutar() para corrutinas: las esperas no bloquean el loop.
+        """
+        estado = self.estado(host)
+        intento = 0
+        while True:
+            espera = estado.antes_de_llamar()
+            if espera > 0:
+                await asyncio.sleep(espera)
+            try:
+                resultado = await funcion()
+            except asyncio.CancelledError:
+                estado.liberar_prueba()
+                raise
+            except Exception as e:
+                await asyncio.sleep(self._manejar_error(estado, e, intento))
+                intento += 1
+                continue
+            estado.registrar_exito()
+            return resultado
+
+    def estadisticas(self) -> Dict:
+        return {host: estado.estadisticas() for host, estado in sorted(self._estados.items())}
+
+
+# Planificador compartido por todos los servicios del proceso
+planificador = PlanificadorUpstream()
+
+
+def observar_cliente_atproto(client, host: str = 'bluesky'):
+    """
+    Leer las cabeceras de rate limit de todas las respuestas (también las
+    exitosas) de un Client o AsyncClient de atproto, enganchándose a su
+    cliente httpx.
+    """
+    http = getattr(getattr(client, 'request', None), '_client', None)
+    if http is None:
+        return
+    estado = planificador.estado(host)
+    hooks = {clave: list(valor) for clave, valor in http.event_hooks.items()}
+    if asyncio.iscoroutinefunction(getattr(http, 'aclose', None)):
+        async def al_responder(respuesta):
+            estado.registrar_cabeceras(respuesta.headers)
+    else:
+        def al_responder(respuesta):
+            estado.registrar_cabeceras(respuesta.headers)
+    hooks.setdefault('response', []).append(al_responder)
+    http.event_hooks = hooks
+
+
+def sesion_http_observada(host: str = 'reddit'):
+    """
+    requests.Session que registra las cabeceras de rate limit de cada
+    respuesta (para pasarla a PRAW con requestor_kwargs={'session': ...}).
+    """
+    import requests
+
+    estado = planificador.estado(host)
+    sesion = requests.Session()
+    sesion.hooks['response'].append(lambda respuesta, *args, **kwargs: estado.registrar_cabeceras(respuesta.headers))
+    return sesion
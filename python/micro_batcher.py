@@ -0,0 +1,122 @@
+"""
+Agrupador dinámico de solicitudes (micro-batching) para la inferencia del modelo
+"""
+
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Sequence
+
+
+class MicroBatcher:
+    def __init__(self, funcion_lote: Callable[[List[Any]], Sequence[Any]],
+                 max_batch_size: int = 64, max_wait_ms: float = 5.0):
+        """
+        Agrupar llamadas concurrentes en un solo lote.
+
+        Cada llamada a submit() encola un elemento y devuelve un Future. Un hilo
+        de fondo junta los elementos pendientes hasta llegar a max_batch_size o
+        hasta que pasen max_wait_ms desde el primero, llama una sola vez a
+        funcion_lote con la lista completa y reparte cada resultado a su Future.
+        """
+        self.funcion_lote = funcion_lote
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+
+        self._lock = threading.Lock()
+        self._pid = None
+        self._cola = None
+        self._hilo = None
+
+        self.lotes_procesados = 0
+        self.elementos_procesados = 0
+        self.lote_maximo = 0
+
+    def submit(self, elemento: Any) -> Future:
+        """
+        Encolar un elemento y devolver el Future con su resultado.
+        """
+        futuro = Future()
+        self._asegurar_hilo().put((elemento, futuro))
+        return futuro
+
+    def predict(self, elemento: Any, timeout: float = None) -> Any:
+        """
+        Encolar un elemento y esperar su resultado.
+        """
+        return self.submit(elemento).result(timeout=timeout)
+
+    def estadisticas(self) -> Dict:
+        """
+        Contadores del agrupador (útiles para /health).
+        """
+        lotes = self.lotes_procesados
+        return {
+            "batches": lotes,
+            "items": self.elementos_procesados,
+            "avg_batch_size": round(self.elementos_procesados / lotes, 2) if lotes else 0.0,
+            "max_batch_size_seen": self.lote_maximo,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000.0,
+        }
+
+    def _asegurar_hilo(self) -> queue.Queue:
+        """
+        Arrancar el hilo de fondo en el primer uso.
+
+        Se vuelve a crear si el proceso cambió (fork de gunicorn), porque los
+        hilos no sobreviven al fork.
+        """
+        pid = os.getpid()
+        if self._pid == pid:
+            return self._cola
+
+        with self._lock:
+            if self._pid != pid:
+                self._cola = queue.Queue()
+                self._hilo = threading.Thread(
+                    target=self._bucle, args=(self._cola,),
+                    name="micro-batcher", daemon=True
+                )
+                self._hilo.start()
+                self._pid = pid
+        return self._cola
+
+    def _bucle(self, cola: queue.Queue):
+        while True:
+            lote = [cola.get()]
+            limite = time.monotonic() + self.max_wait
+
+            while len(lote) < self.max_batch_size:
+                restante = limite - time.monotonic()
+                try:
+                    if restante <= 0:
+                        lote.append(cola.get_nowait())
+                    else:
+                        lote.append(cola.get(timeout=restante))
+                except queue.Empty:
+                    break
+
+            self._procesar(lote)
+
+    def _procesar(self, lote: List):
+        # Descartar los futuros cancelados antes de llegar al modelo
+        lote = [(elemento, futuro) for elemento, futuro in lote if futuro.set_running_or_notify_cancel()]
+        if not lote:
+            return
+
+        try:
+            resultados = self.funcion_lote([elemento for elemento, _ in lote])
+        except Exception as e:
+            for _, futuro in lote:
+                futuro.set_exception(e)
+            return
+
+        for (_, futuro), resultado in zip(lote, resultados):
+            futuro.set_result(resultado)
+
+        self.lotes_procesados += 1
+        self.elementos_procesados += len(lote)
+        self.lote_maximo = max(self.lote_maximo, len(lote))
@@ -0,0 +1,141 @@
+"""
+Clasificador rápido de primera etapa: regresión logística sobre n-gramas con hashing
+
+Se entrena con destilar_modelo_rapido.py imitando las probabilidades del
+BiLSTM. En la API responde solo los textos en los que su confianza (la
+probabilidad máxima) llega al umbral ajustado en el entrenamiento; el resto
+se deriva al BiLSTM.
+
+Cada texto limpio (normalizacion.py) se parte en palabras y se toman sus
+n-gramas de 1 a ngramas palabras; cada n-grama va a una de `buckets` columnas
+por CRC32 (estable entre procesos, a diferencia de hash()). Las
+características valen 1/sqrt(k) para los k n-gramas distintos del texto, y
+predecir es sumar las filas de pesos de sus columnas: no hay vocabulario ni
+multiplicación de matrices.
+
+Archivo (.npz sin comprimir):
+    pesos (buckets, clases) float32, sesgo (clases,), umbral, ngramas,
+    version_bilstm (modelo del que se destiló)
+"""
+
+import os
+import threading
+import zlib
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+FAST_FORMAT_VERSION = 1
+RUTA_RAPIDA = 'fast'
+RUTA_BILSTM = 'bilstm'
+
+
+def ngramas_de(texto: str, ngramas: int = 2) -> List[str]:
+    palabras = texto.split()
+    resultado = list(palabras)
+    for n in range(2, ngramas + 1):
+        resultado.extend(' '.join(palabras[i:i + n]) for i in range(len(palabras) - n + 1))
+    return resultado
+
+
+def caracteristicas(textos: Iterable[str], buckets: int, ngramas: int = 2) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Matriz dispersa de características en formato COO: (filas, columnas, valores).
+    """
+    filas: List[int] = []
+    columnas: List[int] = []
+    valores: List[float] = []
+    for fila, texto in enumerate(textos):
+        indices = {zlib.crc32(ngrama.encode('utf-8')) % buckets for ngrama in ngramas_de(texto, ngramas)}
+        if not indices:
+            continue
+        valor = 1.0 / np.sqrt(len(indices))
+        filas.extend([fila] * len(indices))
+        columnas.extend(indices)
+        valores.extend([valor] * len(indices))
+    return (np.asarray(filas, dtype=np.int64), np.asarray(columnas, dtype=np.int64),
+            np.asarray(valores, dtype=np.float32))
+
+
+def _softmax(logits: np.ndarray) -> np.ndarray:
+    salida = np.exp(logits - logits.max(axis=1, keepdims=True))
+    salida /= salida.sum(axis=1, keepdims=True)
+    return salida
+
+
+class ClasificadorRapido:
+    def __init__(self, pesos: np.ndarray, sesgo: np.ndarray, umbral: float, ngramas: int = 2,
+                 version_bilstm: Optional[str] = None):
+        """
+        pesos tiene una fila por bucket y una columna por categoría (en el
+        orden de CATEGORIAS).
+        """
+        self.pesos = np.ascontiguousarray(pesos, dtype=np.float32)
+        self.sesgo = np.asarray(sesgo, dtype=np.float32)
+        self.umbral = float(umbral)
+        self.ngramas = int(ngramas)
+        self.version_bilstm = version_bilstm
+        self.buckets = self.pesos.shape[0]
+
+        self._lock = threading.Lock()
+        self.respondidos = 0
+        self.derivados = 0
+
+    @classmethod
+    def cargar(cls, ruta: str, umbral: Optional[float] = None) -> 'ClasificadorRapido':
+        """
+        Leer el .npz de destilar_modelo_rapido.py; umbral reemplaza al ajustado.
+        """
+        with np.load(ruta, allow_pickle=False) as datos:
+            if int(datos['format_version']) != FAST_FORMAT_VERSION:
+                raise ValueError(f"Versión de clasificador rápido no soportada en {ruta}: {int(datos['format_version'])}")
+            version_bilstm = str(datos['version_bilstm']) or None
+            return cls(datos['pesos'], datos['sesgo'], float(datos['umbral']) if umbral is None else umbral,
+                       int(datos['ngramas']), version_bilstm)
+
+    def guardar(self, ruta: str):
+        # Archivo temporal + os.replace: un worker nunca lee un .npz a medias
+        temporal = ruta + '.tmp'
+        with open(temporal, 'wb') as handle:
+            np.savez(handle, format_version=FAST_FORMAT_VERSION, pesos=self.pesos, sesgo=self.sesgo,
+                     umbral=np.float64(self.umbral), ngramas=self.ngramas,
+                     version_bilstm=self.version_bilstm or '')
+        os.replace(temporal, ruta)
+
+    def predict_proba(self, textos_limpios: List[str]) -> np.ndarray:
+        """
+        Probabilidades (n, clases) para textos ya limpios.
+        """
+        n = len(textos_limpios)
+        filas, columnas, valores = caracteristicas(textos_limpios, self.buckets, self.ngramas)
+        logits = np.empty((n, len(self.sesgo)), dtype=np.float32)
+        for clase in range(len(self.sesgo)):
+            logits[:, clase] = np.bincount(filas, weights=self.pesos[columnas, clase] * valores, minlength=n)
+        logits += self.sesgo
+        return _softmax(logits)
+
+    def filtrar(self, textos_limpios: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Devolver (probabilidades, confiables): confiables marca los textos que
+        el clasificador responde solo; los demás van al BiLSTM.
+        """
+        probabilidades = self.predict_proba(textos_limpios)
+        confiables = probabilidades.max(axis=1) >= self.umbral
+        respondidos = int(confiables.sum())
+        with self._lock:
+            self.respondidos += respondidos
+            self.derivados += len(textos_limpios) - respondidos
+        return probabilidades, confiables
+
+    def estadisticas(self) -> Dict:
+        total = self.respondidos + self.derivados
+        return {
+            "enabled": True,
+            "threshold": self.umbral,
+            "buckets": self.buckets,
+            "ngrams": self.ngramas,
+            "distilled_from": self.version_bilstm,
+            RUTA_RAPIDA: self.respondidos,
+            RUTA_BILSTM: self.derivados,
+            "fast_ratio": round(self.respondidos / total, 4) if total else 0.0,
+        }
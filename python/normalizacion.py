@@ -0,0 +1,71 @@
+"""
+Normalización de texto compartida por el entrenamiento y la API
+
+Es la misma limpieza con la que se generó text_clean en
+DATASET_LIMPIO_FINAL.csv (y con la que se ajustó el tokenizer):
+1. Minúsculas
+2. Eliminar URLs, menciones (@usuario) y hashtags
+3. Eliminar emojis y caracteres especiales (se conservan letras acentuadas)
+4. Eliminar stopwords (español e inglés) y palabras de 2 letras o menos
+
+Los pasos 2 y 3 se hacen en una sola pasada con una expresión regular
+compilada una vez; las stopwords son un frozenset cargado de stopwords.txt.
+"""
+
+import os
+import re
+from typing import FrozenSet, Iterable, List
+
+STOPWORDS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'stopwords.txt')
+
+# Se conservan solo las palabras con más de LARGO_MINIMO - 1 caracteres
+LARGO_MINIMO = 3
+
+# URLs | menciones y hashtags | cualquier carácter que no sea letra, número o espacio
+# (los emojis entran en el último grupo). La mención se corta antes de una URL
+# pegada ("@xhttp://...") para dar lo mismo que quitar primero las URLs.
+_PATRON_RUIDO = re.compile(r'https?://\S+|www\.\S+|[@#](?:(?!https?://\S|www\.\S)\w)+|[^\w\s]')
+
+
+def cargar_stopwords(ruta: str = STOPWORDS_PATH) -> FrozenSet[str]:
+    """
+    Leer la lista de stopwords (una por línea, '#' para comentarios).
+    """
+    with open(ruta, 'r', encoding='utf-8') as handle:
+        return frozenset(
+            linea.strip() for linea in handle
+            if linea.strip() and not linea.startswith('#')
+        )
+
+
+STOPWORDS = cargar_stopwords()
+
+
+def limpiar_texto(texto) -> str:
+    """
+    Normalizar un texto para el modelo; devuelve "" si no es un str.
+    """
+    if not isinstance(texto, str):
+        return ""
+    palabras = _PATRON_RUIDO.sub(' ', texto.lower()).split()
+    return ' '.join([p for p in palabras if len(p) >= LARGO_MINIMO and p not in STOPWORDS])
+
+
+def limpiar_muchos(textos: Iterable) -> List[str]:
+    """
+    limpiar_texto() sobre un lote (lista, Series de pandas, ...), con las
+    búsquedas de atributos resueltas una sola vez fuera del bucle.
+    """
+    sustituir = _PATRON_RUIDO.sub
+    stopwords = STOPWORDS
+    largo_minimo = LARGO_MINIMO
+
+    resultado = []
+    agregar = resultado.append
+    for texto in textos:
+        if not isinstance(texto, str):
+            agregar("")
+            continue
+        palabras = sustituir(' ', texto.lower()).split()
+        agregar(' '.join([p for p in palabras if len(p) >= largo_minimo and p not in stopwords]))
+    return resultado
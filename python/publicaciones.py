@@ -0,0 +1,160 @@
+"""
+Registro único de publicaciones (posts y comentarios) de Bluesky y Reddit
+
+Todos los servicios convierten lo que devuelven atproto y PRAW a Publicacion
+y las rutas la puntúan y serializan sin pasar por diccionarios intermedios.
+Usa __slots__: sin __dict__ por instancia, lo que reduce memoria y tiempo de
+creación en las descargas paginadas grandes.
+
+Forma JSON (a_dict): los campos que valen None no se incluyen.
+    platform, id, title, text, author, likes, replies, reposts, created, url
+    uri, subreddit                            (según la plataforma)
+    parent_id, thread_id, depth               (comentarios de Reddit)
+    sentiment, confidence, probabilities,     (una vez puntuada; route es el
+    route                                     modelo que respondió)
+"""
+
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+BLUESKY_WEB = "https://bsky.app/profile"
+REDDIT_WEB = "https://reddit.com"
+
+# Campos que se copian/serializan, en orden
+_CAMPOS = (
+    'platform', 'id', 'title', 'text', 'author', 'likes', 'replies', 'reposts', 'created', 'url',
+    'uri', 'subreddit', 'parent_id', 'thread_id', 'depth',
+    'sentiment', 'confidence', 'probabilities', 'route',
+)
+
+
+def _fecha_unix(segundos: Optional[float]) -> Optional[str]:
+    return datetime.fromtimestamp(segundos, timezone.utc).isoformat() if segundos is not None else None
+
+
+class Publicacion:
+    __slots__ = _CAMPOS
+
+    def __init__(self, platform: str, id: str, text: str, author: str, created: Optional[str] = None,
+                 likes: int = 0, replies: int = 0, reposts: int = 0, url: Optional[str] = None,
+                 title: Optional[str] = None, uri: Optional[str] = None, subreddit: Optional[str] = None,
+                 parent_id: Optional[str] = None, thread_id: Optional[str] = None, depth: Optional[int] = None):
+        self.platform = platform
+        self.id = id
+        self.title = title
+        self.text = text
+        self.author = author
+        self.likes = likes
+        self.replies = replies
+        self.reposts = reposts
+        self.created = created
+        self.url = url
+        self.uri = uri
+        self.subreddit = subreddit
+        self.parent_id = parent_id
+        self.thread_id = thread_id
+        self.depth = depth
+        self.sentiment = None
+        self.confidence = None
+        self.probabilities = None
+        self.route = None
+
+    # --- Conversión desde las librerías ---
+
+    @classmethod
+    def desde_bluesky(cls, post) -> 'Publicacion':
+        """
+        Desde un PostView de atproto.
+        """
+        handle = post.author.handle
+        uri = post.uri
+        id_post = uri[uri.rfind('/') + 1:]
+        return cls(
+            'bluesky', id_post, post.record.text, handle,
+            created=getattr(post.record, 'created_at', None),
+            likes=post.like_count or 0,
+            replies=post.reply_count or 0,
+            reposts=post.repost_count or 0,
+            url=f"{BLUESKY_WEB}/{handle}/post/{id_post}",
+            title=f"Post de {handle}",
+            uri=uri,
+        )
+
+    @classmethod
+    def desde_reddit(cls, submission) -> 'Publicacion':
+        """
+        Desde un Submission de PRAW; el texto es título + cuerpo.
+        """
+        return cls(
+            'reddit', submission.id, submission.title + '\n\n' + submission.selftext,
+            submission.author.name if submission.author else '[deleted]',
+            created=_fecha_unix(submission.created_utc),
+            likes=submission.score,
+            replies=submission.num_comments,
+            url=f"{REDDIT_WEB}{submission.permalink}",
+            title=submission.title,
+            subreddit=submission.subreddit.display_name,
+        )
+
+    @classmethod
+    def desde_reddit_comentario(cls, comment, profundidad: int = 0,
+                                hilo: Optional[str] = None) -> 'Publicacion':
+        """
+        Desde un Comment de PRAW. hilo es el id del comentario de primer
+        nivel del que cuelga.
+        """
+        return cls(
+            'reddit', comment.id, comment.body,
+            comment.author.name if comment.author else '[deleted]',
+            created=_fecha_unix(comment.created_utc),
+            likes=comment.score,
+            url=f"{REDDIT_WEB}{comment.permalink}" if getattr(comment, 'permalink', None) else None,
+            parent_id=comment.parent_id,
+            thread_id=hilo or comment.id,
+            depth=profundidad,
+        )
+
+    # --- Uso en las rutas ---
+
+    def puntuar(self, prediccion: Dict):
+        """
+        Guardar el resultado de formatear_prediccion().
+        """
+        self.sentiment = prediccion['sentiment']
+        self.confidence = prediccion['confidence']
+        self.probabilities = prediccion['probabilities']
+        self.route = prediccion.get('route')
+
+    def copiar(self) -> 'Publicacion':
+        copia = Publicacion.__new__(Publicacion)
+        for campo in _CAMPOS:
+            setattr(copia, campo, getattr(self, campo))
+        return copia
+
+    def a_dict(self) -> Dict:
+        return {campo: valor for campo in _CAMPOS for valor in (getattr(self, campo),) if valor is not None}
+
+    def formato_app(self) -> Dict:
+        """
+        Forma de Post del frontend (src/app/types.ts).
+        """
+        return {
+            'id': self.id,
+            'author': {
+                'name': self.author,
+                'handle': self.author,
+                'avatarUrl': f"https://api.dicebear.com/7.x/avataaars/svg?seed={self.author}",
+            },
+            'content': self.text,
+            'timestamp': self.created,
+            'stats': {
+                'likes': self.likes,
+                'comments': self.replies,
+                'shares': self.reposts,
+            },
+            'platform': self.platform,
+            'url': self.url,
+        }
+
+    def __repr__(self) -> str:
+        return f"Publicacion({self.platform}:{self.id})"
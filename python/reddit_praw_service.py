@@ -2,59 +2,335 @@
 Servicio de Reddit usando PRAW Anonymous Mode - Funciona sin credenciales
 """
 
-import praw
-from typing import Dict, List, Optional
-from datetime import datetime
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from cache import LRUCache
+from limites_upstream import ErrorUpstream, planificador, sesion_http_observada
+from publicaciones import Publicacion
+
+try:
+    import praw
+    from praw.models import MoreComments
+    PRAW_AVAILABLE = True
+except ImportError:
+    PRAW_AVAILABLE = False
+
+    class MoreComments:
+        pass
+
+# Árbol completo de comentarios: profundidad máxima (0 = solo los de primer
+# nivel), tope de comentarios y expansiones de "MoreComments" en paralelo
+REDDIT_COMMENT_MAX_DEPTH = int(os.getenv('REDDIT_COMMENT_MAX_DEPTH', 8))
+REDDIT_COMMENT_MAX = int(os.getenv('REDDIT_COMMENT_MAX', 2000))
+REDDIT_MORE_CONCURRENCY = int(os.getenv('REDDIT_MORE_CONCURRENCY', 4))
+
+# Caché de respuestas de Reddit por (método, argumentos); 0 = desactivada.
+# Cada endpoint tiene su propio TTL en segundos.
+REDDIT_CACHE_SIZE = int(os.getenv('REDDIT_CACHE_SIZE', 1000))
+REDDIT_CACHE_TTLS = {
+    'post': float(os.getenv('REDDIT_CACHE_TTL_POST', 60)),
+    'subreddit': float(os.getenv('REDDIT_CACHE_TTL_SUBREDDIT', 60)),
+    'search': float(os.getenv('REDDIT_CACHE_TTL_SEARCH', 120)),
+}
+# Espera mínima (segundos) antes de reintentar crear el cliente si falló
+REDDIT_INIT_RETRY_SECONDS = float(os.getenv('REDDIT_INIT_RETRY_SECONDS', 30))
+
+
+def convertir_comentario(comment, profundidad: int = 0, hilo: Optional[str] = None) -> Publicacion:
+    """
+    Comentario de PRAW como Publicacion. hilo es el id del comentario de
+    primer nivel del que cuelga.
+    """
+    return Publicacion.desde_reddit_comentario(comment, profundidad, hilo)
+
+
+def copiar_resultado(resultado):
+    # Las rutas agregan el sentimiento a cada post/comentario: se entrega una
+    # copia para no modificar lo que quedó en la caché
+    if isinstance(resultado, list):
+        return [post.copiar() for post in resultado]
+    copia = dict(resultado)
+    copia['post'] = resultado['post'].copiar()
+    copia['comments'] = [comentario.copiar() for comentario in resultado['comments']]
+    return copia
+
+
+class ArbolComentarios:
+    def __init__(self, submission, max_depth: int = None, max_comments: int = None,
+                 max_concurrency: int = None, cliente: Callable = None):
+        """
+        Recorrido del árbol completo de comentarios de un post.
+
+        Se itera una sola vez y entrega los comentarios (como Publicacion)
+        a medida que están disponibles: primero los que
+        vinieron con el post y, mientras tanto, los "MoreComments" se expanden
+        en un pool de hilos con a lo sumo max_concurrency solicitudes en curso
+        (todas pasan por el planificador de 'reddit').
+
+        PRAW no es thread-safe: cliente() devuelve el praw.Reddit del hilo
+        que lo llama y cada expansión se hace con el de su hilo del pool,
+        nunca con el que descargó el post. Sin cliente las expansiones van
+        de a una.
+
+        Al terminar, truncated indica si se cortó por max_comments y
+        failed_expansions cuántas expansiones fallaron (sus comentarios faltan).
+        """
+        self.submission = submission
+        self.max_depth = REDDIT_COMMENT_MAX_DEPTH if max_depth is None else max_depth
+        self.max_comments = REDDIT_COMMENT_MAX if max_comments is None else max_comments
+        self.cliente = cliente
+        if cliente is None:
+            self.max_concurrency = 1
+        else:
+            self.max_concurrency = max(1, max_concurrency or REDDIT_MORE_CONCURRENCY)
+
+        self.count = 0
+        self.expansions = 0
+        self.failed_expansions = 0
+        self.truncated = False
+
+    def __iter__(self) -> Iterator[Publicacion]:
+        return (comentario for comentario in self._recorrer() if comentario is not None)
+
+    def lotes(self, tamano: int) -> Iterator[List[Publicacion]]:
+        """
+        Agrupar los comentarios en listas de hasta `tamano`. Un lote
+        incompleto se entrega antes de quedarse esperando a la red, así quien
+        consume puede procesarlo mientras siguen llegando expansiones.
+        """
+        lote = []
+        for comentario in self._recorrer():
+            if comentario is not None:
+                lote.append(comentario)
+                if len(lote) < tamano:
+                    continue
+            if lote:
+                yield lote
+                lote = []
+        if lote:
+            yield lote
+
+    def _expandir(self, mas) -> List:
+        """
+        Expandir un "MoreComments" en el hilo actual del pool, con el cliente
+        de PRAW de ese hilo.
+        """
+        if self.cliente is not None:
+            reddit = self.cliente()
+            if reddit is None:
+                raise RuntimeError("no hay cliente de Reddit en este hilo")
+            # MoreComments.comments() hace la solicitud con self._reddit
+            mas._reddit = reddit
+        return mas.comments()
+
+    def _recorrer(self) -> Iterator[Optional[Publicacion]]:
+        """
+        Generador de comentarios; produce None justo antes de bloquear
+        esperando una expansión.
+        """
+        # fullname -> (profundidad, hilo) de los comentarios ya vistos, para
+        # ubicar los que llegan sueltos de /api/morechildren
+        ubicacion = {self.submission.fullname: (-1, None)}
+        # (item, (profundidad, hilo) por si no se conoce su padre)
+        pendientes = deque((item, (0, None)) for item in self.submission.comments)
+        en_espera = deque()
+        en_curso = {}
+        esperados = 0
+
+        executor = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix='reddit-more')
+        try:
+            while True:
+                while pendientes:
+                    item, respaldo = pendientes.popleft()
+                    padre = ubicacion.get(item.parent_id)
+                    profundidad, hilo = (padre[0] + 1, padre[1]) if padre else respaldo
+                    es_mas = isinstance(item, MoreComments)
+                    if not es_mas:
+                        hilo = hilo or item.id
+                        # También los que se descartan, para no confundir a
+                        # sus respuestas con comentarios de primer nivel
+                        ubicacion[item.fullname] = (profundidad, hilo)
+                    if profundidad > self.max_depth:
+                        continue
+                    if es_mas:
+                        en_espera.append((item, (profundidad, hilo)))
+                        continue
+
+                    # Los borrados no se entregan, pero sus respuestas sí
+                    if item.author is not None:
+                        if self.count >= self.max_comments:
+                            self.truncated = True
+                            return
+                        self.count += 1
+                        yield convertir_comentario(item, profundidad, hilo)
+                    pendientes.extend((respuesta, (profundidad + 1, hilo)) for respuesta in item.replies)
+
+                # No se piden más expansiones de las que caben en el tope
+                while (en_espera and len(en_curso) < self.max_concurrency
+                       and self.count + esperados < self.max_comments):
+                    mas, posicion = en_espera.popleft()
+                    futuro = executor.submit(planificador.ejecutar, 'reddit', lambda mas=mas: self._expandir(mas))
+                    en_curso[futuro] = (mas, posicion)
+                    esperados += max(mas.count, 1)
+
+                if not en_curso:
+                    self.truncated = self.truncated or bool(en_espera)
+                    return
+
+                yield None
+                listos, _ = wait(en_curso, return_when=FIRST_COMPLETED)
+                for futuro in listos:
+                    mas, posicion = en_curso.pop(futuro)
+                    esperados -= max(mas.count, 1)
+                    try:
+                        nuevos = futuro.result()
+                    except Exception as e:
+                        # Una rama que falla no invalida el resto del árbol
+                        print(f"⚠️ No se pudo expandir {mas!r}: {e}")
+                        self.failed_expansions += 1
+                        continue
+                    self.expansions += 1
+                    pendientes.extend((item, posicion) for item in nuevos)
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
 
 class RedditPrawService:
     def __init__(self):
         """
-        Inicializar Reddit en modo anonymous.
+        Reddit en modo anonymous.
         No necesita credenciales - usa modo read-only oficial de Reddit.
+
+        El cliente de PRAW se crea recién en la primera consulta, así el
+        arranque de la app (y de cada worker) no paga por él. PRAW no es
+        thread-safe, así que cada hilo tiene el suyo.
+        """
+        self.cache = LRUCache(REDDIT_CACHE_SIZE) if REDDIT_CACHE_SIZE > 0 else None
+        self._clientes = threading.local()
+        self._conectado = False
+        self._ultimo_fallo = None
+
+        if not PRAW_AVAILABLE:
+            print("⚠️  praw no está instalado")
+
+    @property
+    def reddit(self):
+        """
+        Cliente de PRAW del hilo actual, o None si praw no está instalado o
+        no se pudo crear (se reintenta tras REDDIT_INIT_RETRY_SECONDS).
         """
+        reddit = getattr(self._clientes, 'reddit', None)
+        if reddit is not None or not PRAW_AVAILABLE:
+            return reddit
+        if self._ultimo_fallo is not None and time.monotonic() - self._ultimo_fallo < REDDIT_INIT_RETRY_SECONDS:
+            return None
+
         try:
-            self.reddit = praw.Reddit(
+            reddit = praw.Reddit(
                 client_id="DO_NOT_EDIT_ME",
                 client_secret=None,
-                user_agent="SentimentAnalyzer/1.0"
+                user_agent="SentimentAnalyzer/1.0",
+                # Sesión HTTP que informa las cabeceras X-RateLimit-* al planificador
+                requestor_kwargs={"session": sesion_http_observada('reddit')}
             )
-            print("✅ Reddit PRAW: Conectado en modo anonymous")
         except Exception as e:
             print(f"❌ Error inicializando Reddit: {e}")
-            self.reddit = None
+            self._ultimo_fallo = time.monotonic()
+            return None
+        if not self._conectado:
+            print("✅ Reddit PRAW: Conectado en modo anonymous")
+            self._conectado = True
+        self._ultimo_fallo = None
+        self._clientes.reddit = reddit
+        return reddit
+
+    def _cacheado(self, endpoint: str, clave: Tuple, descargar: Callable):
+        """
+        Responder desde la caché o descargar una sola vez aunque lleguen
+        varias solicitudes iguales a la vez. Los resultados vacíos (sin
+        resultados o error) no se guardan.
+        """
+        if self.cache is None:
+            return descargar()
+        resultado = self.cache.obtener_o_calcular(
+            (endpoint,) + clave, descargar, ttl=REDDIT_CACHE_TTLS[endpoint], guardar_si=bool
+        )
+        return copiar_resultado(resultado) if resultado else resultado
 
-    def get_post_from_url(self, post_url: str) -> Optional[Dict]:
+    def get_post_from_url(self, post_url: str, full_tree: bool = False, max_depth: int = None,
+                          max_comments: int = None) -> Optional[Dict]:
         """
         Obtener un post específico de Reddit por URL.
         
+        Por defecto trae los primeros 10 comentarios de primer nivel; con
+        full_tree=True recorre el árbol completo (ver comment_tree).
+        
         Ejemplo: https://www.reddit.com/r/python/comments/abc123/titulo/
         """
+        return self._cacheado(
+            'post', (post_url, full_tree, max_depth, max_comments),
+            lambda: self._get_post_from_url(post_url, full_tree, max_depth, max_comments)
+        )
+
+    def get_subreddit_posts(self, subreddit: str, sort: str = 'hot', limit: int = 10) -> List[Publicacion]:
+        """
+        Obtener posts de un subreddit.
+        
+        Ejemplo: get_subreddit_posts('python', sort='hot', limit=5)
+        """
+        return self._cacheado(
+            'subreddit', (subreddit.lower(), sort, limit),
+            lambda: self._get_subreddit_posts(subreddit, sort, limit)
+        )
+
+    def search_posts(self, subreddit: str, query: str, limit: int = 5) -> List[Publicacion]:
+        """
+        Buscar posts en un subreddit.
+        
+        Ejemplo: search_posts('python', 'machine learning', limit=5)
+        """
+        return self._cacheado(
+            'search', (subreddit.lower(), query, limit),
+            lambda: self._search_posts(subreddit, query, limit)
+        )
+
+    def _cargar_submission(self, post_url: str):
+        """
+        Descargar un post (y sus comentarios iniciales) por URL.
+        PRAW parsea la URL; el primer acceso a un atributo hace la solicitud.
+        """
+        submission = self.reddit.submission(url=post_url)
+        planificador.ejecutar('reddit', lambda: submission.title)
+        return submission
+
+    def _get_post_from_url(self, post_url: str, full_tree: bool, max_depth: Optional[int],
+                           max_comments: Optional[int]) -> Optional[Dict]:
         if not self.reddit:
             return None
         
         try:
             print(f"📄 Obteniendo post de: {post_url[:80]}...")
             
-            # PRAW parsea la URL automáticamente
-            submission = self.reddit.submission(url=post_url)
+            submission = self._cargar_submission(post_url)
+            post = Publicacion.desde_reddit(submission)
             
-            post = {
-                'id': submission.id,
-                'author': {
-                    'name': submission.author.name if submission.author else '[deleted]',
-                    'handle': submission.author.name if submission.author else 'deleted',
-                    'avatarUrl': f"https://reddit.com/u/{submission.author.name}/about.json" if submission.author else None,
-                },
-                'content': submission.title + '\n\n' + submission.selftext,
-                'timestamp': datetime.fromtimestamp(submission.created_utc).isoformat(),
-                'stats': {
-                    'likes': submission.score,
-                    'comments': submission.num_comments,
-                    'shares': 0,
-                },
-                'subreddit': submission.subreddit.display_name,
-                'url': submission.url,
-            }
+            if full_tree:
+                arbol = ArbolComentarios(submission, max_depth=max_depth, max_comments=max_comments,
+                                         cliente=lambda: self.reddit)
+                comments = list(arbol)
+                print(f"✅ Post obtenido: {submission.title[:60]}... ({len(comments)} comentarios, "
+                      f"{arbol.expansions} expansiones)")
+                return {
+                    'post': post,
+                    'comments': comments,
+                    'truncated': arbol.truncated,
+                    'failed_expansions': arbol.failed_expansions,
+                }
             
             # Obtener comentarios
             submission.comments.replace_more(limit=0)
@@ -66,30 +342,41 @@ class RedditPrawService:
                 if comment.author is None:
                     continue
                 
-                comments.append({
-                    'id': comment.id,
-                    'author': {
-                        'name': comment.author.name,
-                        'handle': comment.author.name,
-                        'avatarUrl': f"https://reddit.com/u/{comment.author.name}/about.json",
-                    },
-                    'content': comment.body,
-                    'timestamp': datetime.fromtimestamp(comment.created_utc).isoformat(),
-                })
+                comments.append(convertir_comentario(comment))
             
             print(f"✅ Post obtenido: {submission.title[:60]}... ({len(comments)} comentarios)")
             return {'post': post, 'comments': comments}
         
+        except ErrorUpstream:
+            # Rate limit / upstream caído: no es lo mismo que "sin resultados"
+            raise
         except Exception as e:
             print(f"❌ Error obteniendo post: {e}")
             return None
 
-    def get_subreddit_posts(self, subreddit: str, sort: str = 'hot', limit: int = 10) -> List[Dict]:
+    def comment_tree(self, post_url: str, max_depth: int = None, max_comments: int = None,
+                     max_concurrency: int = None):
         """
-        Obtener posts de un subreddit.
-        
-        Ejemplo: get_subreddit_posts('python', sort='hot', limit=5)
+        Descargar el post y devolver (post, ArbolComentarios) para recorrer
+        sus comentarios a medida que llegan. Devuelve None si no hay cliente
+        o el post no se pudo obtener.
         """
+        if not self.reddit:
+            return None
+        
+        try:
+            submission = self._cargar_submission(post_url)
+            arbol = ArbolComentarios(submission, max_depth=max_depth, max_comments=max_comments,
+                                     max_concurrency=max_concurrency, cliente=lambda: self.reddit)
+            return Publicacion.desde_reddit(submission), arbol
+        
+        except ErrorUpstream:
+            raise
+        except Exception as e:
+            print(f"❌ Error obteniendo post: {e}")
+            return None
+
+    def _get_subreddit_posts(self, subreddit: str, sort: str, limit: int) -> List[Publicacion]:
         if not self.reddit:
             return []
         
@@ -100,39 +387,30 @@ class RedditPrawService:
             results = []
             
             if sort == 'hot':
-                posts = subreddit_obj.hot(limit=limit)
+                listado = lambda: subreddit_obj.hot(limit=limit)
             elif sort == 'new':
-                posts = subreddit_obj.new(limit=limit)
+                listado = lambda: subreddit_obj.new(limit=limit)
             elif sort == 'top':
-                posts = subreddit_obj.top(time_filter='day', limit=limit)
+                listado = lambda: subreddit_obj.top(time_filter='day', limit=limit)
             else:
-                posts = subreddit_obj.hot(limit=limit)
+                listado = lambda: subreddit_obj.hot(limit=limit)
+            # Los listados de PRAW son perezosos: se recorren dentro del planificador
+            posts = planificador.ejecutar('reddit', lambda: list(listado()))
             
             for submission in posts:
-                results.append({
-                    'id': submission.id,
-                    'title': submission.title,
-                    'url': f"https://reddit.com{submission.permalink}",
-                    'author': submission.author.name if submission.author else '[deleted]',
-                    'subreddit': submission.subreddit.display_name,
-                    'score': submission.score,
-                    'num_comments': submission.num_comments,
-                    'created': datetime.fromtimestamp(submission.created_utc).isoformat(),
-                })
+                results.append(Publicacion.desde_reddit(submission))
             
             print(f"✅ Se obtuvieron {len(results)} posts de r/{subreddit}")
             return results
         
+        except ErrorUpstream:
+            # Rate limit / upstream caído: no es lo mismo que "sin resultados"
+            raise
         except Exception as e:
             print(f"❌ Error obteniendo subreddit r/{subreddit}: {e}")
             return []
 
-    def search_posts(self, subreddit: str, query: str, limit: int = 5) -> List[Dict]:
-        """
-        Buscar posts en un subreddit.
-        
-        Ejemplo: search_posts('python', 'machine learning', limit=5)
-        """
+    def _search_posts(self, subreddit: str, query: str, limit: int) -> List[Publicacion]:
         if not self.reddit:
             return []
         
@@ -142,19 +420,18 @@ class RedditPrawService:
             subreddit_obj = self.reddit.subreddit(subreddit)
             results = []
             
-            for submission in subreddit_obj.search(query, time_filter='week', limit=limit):
-                results.append({
-                    'id': submission.id,
-                    'title': submission.title,
-                    'url': f"https://reddit.com{submission.permalink}",
-                    'author': submission.author.name if submission.author else '[deleted]',
-                    'score': submission.score,
-                    'num_comments': submission.num_comments,
-                })
+            encontrados = planificador.ejecutar(
+                'reddit', lambda: list(subreddit_obj.search(query, time_filter='week', limit=limit))
+            )
+            for submission in encontrados:
+                results.append(Publicacion.desde_reddit(submission))
             
             print(f"✅ Se encontraron {len(results)} resultados")
             return results
         
+        except ErrorUpstream:
+            # Rate limit / upstream caído: no es lo mismo que "sin resultados"
+            raise
         except Exception as e:
             print(f"❌ Error buscando: {e}")
             return []
@@ -0,0 +1,401 @@
+"""
+Registro de versiones del modelo con recarga en caliente
+
+Cada versión cargada es un ModeloCargado: motor de inferencia, tokenizer y
+clasificador rápido de esa versión. El registro:
+- vigila en un hilo de fondo un directorio de modelos (una subcarpeta por
+  versión) o, sin él, los archivos del modelo único, y carga las versiones
+  nuevas o modificadas con warmup antes de exponerlas;
+- cambia la versión activa con una sola asignación: cada solicitud toma una
+  versión al empezar (adquirir) y la usa hasta terminar, así que la versión
+  anterior sigue atendiendo lo que ya estaba en vuelo y se libera cuando esas
+  solicitudes terminan (drenado);
+- con canary_percent > 0 manda ese porcentaje de las solicitudes a la versión
+  candidata (la más nueva) hasta que se promueve.
+
+Directorio de modelos:
+    modelos/
+        2026-10-01/     artefacto (artefacto.py) o archivos del backend y vocabulario
+        2026-10-18/
+        ACTIVE          opcional: nombre de la versión activa. Fija la versión
+                        aunque haya otras más nuevas; con canary, escribir aquí
+                        el nombre de la candidata la promueve en todos los workers
+Las versiones se ordenan por nombre (la más nueva es la última). Las carpetas
+ocultas o terminadas en .tmp / .anterior (publicación en curso) se ignoran.
+"""
+
+import os
+import random
+import threading
+import time
+import traceback
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from inference import predecir_por_cubetas
+
+ARCHIVO_ACTIVA = 'ACTIVE'
+SUFIJOS_IGNORADOS = ('.tmp', '.anterior')
+# Tamaños de los lotes de prueba del warmup (uno por lote pedido)
+TAMANOS_WARMUP = (1, 8, 32, 64)
+
+
+class ModeloCargado:
+    def __init__(self, nombre: str, version: str, motor, tokenizer, max_sequence_length: int,
+                 cuantizacion: Optional[str] = None, rapido=None):
+        """
+        nombre identifica la versión en el registro (carpeta de MODELS_DIR);
+        version es la huella del modelo (claves de caché, cabecera de respuesta).
+        """
+        self.nombre = nombre
+        self.version = version
+        self.motor = motor
+        self.tokenizer = tokenizer
+        self.max_sequence_length = max_sequence_length
+        self.cuantizacion = cuantizacion
+        self.rapido = rapido
+
+        self.firma = None
+        self.cargado_en = time.time()
+        self.retirado_en = None
+        # Contadores protegidos por el lock del registro
+        self.en_vuelo = 0
+        self.solicitudes = 0
+
+    def calentar(self, cubetas: Iterable[int], lotes: int = 3):
+        """
+        Crear la sesión del motor en este proceso y pasar lotes de prueba de
+        distintos tamaños y largos por las mismas cubetas que usa la API.
+        """
+        self.motor.warmup()
+        # Índices dentro del vocabulario (y del Embedding) del modelo
+        tope = len(self.tokenizer.word_index) + 1
+        if self.tokenizer.num_words:
+            tope = min(tope, self.tokenizer.num_words)
+        tope = max(2, min(tope, 100))
+        rng = np.random.default_rng(0)
+        for tamano in TAMANOS_WARMUP[:max(0, lotes)]:
+            largos = rng.integers(1, self.max_sequence_length + 1, size=tamano)
+            secuencias = [rng.integers(1, tope, size=largo).tolist() for largo in largos]
+            predecir_por_cubetas(self.motor, secuencias, cubetas, self.max_sequence_length)
+
+    def estadisticas(self) -> Dict:
+        return {
+            "name": self.nombre,
+            "version": self.version,
+            "quantization": self.cuantizacion,
+            "fast_path": self.rapido is not None,
+            "loaded_at": time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(self.cargado_en)),
+            "in_flight": self.en_vuelo,
+            "requests": self.solicitudes,
+        }
+
+
+def _firma(rutas: Iterable[str]) -> Tuple:
+    """
+    Huella barata de cambios: mtime y tamaño de cada archivo (de los archivos
+    de primer nivel si es una carpeta).
+    """
+    firma = []
+    for ruta in rutas:
+        if os.path.isdir(ruta):
+            with os.scandir(ruta) as entradas:
+                firma.append(tuple(sorted((entrada.name, entrada.stat().st_mtime_ns, entrada.stat().st_size)
+                                          for entrada in entradas if entrada.is_file())))
+        elif os.path.exists(ruta):
+            estado = os.stat(ruta)
+            firma.append((estado.st_mtime_ns, estado.st_size))
+        else:
+            firma.append(None)
+    return tuple(firma)
+
+
+class RegistroModelos:
+    def __init__(self, cargar: Callable[[str, str], ModeloCargado], directorio: Optional[str] = None,
+                 ruta_unica: Optional[str] = None, archivos_vigilados: Iterable[str] = (),
+                 cubetas: Iterable[int] = (), canary_percent: float = 0.0, intervalo: float = 10.0,
+                 drain_timeout: float = 120.0, reintento: float = 60.0, lotes_warmup: int = 3):
+        """
+        cargar(nombre, ruta) arma un ModeloCargado o lanza una excepción.
+
+        Con directorio se vigilan sus subcarpetas; sin él hay una sola versión
+        ('default') en ruta_unica, que se recarga cuando cambia alguno de
+        archivos_vigilados. Una versión que falla no se reintenta hasta que
+        cambian sus archivos o pasan `reintento` segundos.
+        """
+        self.cargar = cargar
+        self.directorio = directorio
+        self.ruta_unica = ruta_unica
+        self.archivos_vigilados = list(archivos_vigilados) or ([ruta_unica] if ruta_unica else [])
+        self.cubetas = list(cubetas)
+        self.canary_percent = min(max(float(canary_percent), 0.0), 100.0)
+        self.intervalo = intervalo
+        self.drain_timeout = drain_timeout
+        self.reintento = reintento
+        self.lotes_warmup = lotes_warmup
+
+        self.activo: Optional[ModeloCargado] = None
+        self.candidato: Optional[ModeloCargado] = None
+        self.ultimo_error: Optional[str] = None
+        self._retirados: List[ModeloCargado] = []
+        self._fallidos: Dict[str, Tuple] = {}
+        self._lock = threading.Lock()
+        # Un solo escaneo/carga a la vez (hilo de fondo o llamada directa)
+        self._lock_revision = threading.Lock()
+        self._pid = None
+        self._hilo = None
+
+        self.cambios = 0
+
+    # --- Uso desde las solicitudes ---
+
+    def adquirir(self) -> Optional[ModeloCargado]:
+        """
+        Elegir la versión para una solicitud (la candidata con probabilidad
+        canary_percent) y marcarla en uso hasta liberar().
+        """
+        with self._lock:
+            modelo = self.activo
+            if self.candidato is not None and random.random() * 100.0 < self.canary_percent:
+                modelo = self.candidato
+            if modelo is not None:
+                modelo.en_vuelo += 1
+                modelo.solicitudes += 1
+            return modelo
+
+    def liberar(self, modelo: ModeloCargado):
+        with self._lock:
+            modelo.en_vuelo -= 1
+            if modelo.retirado_en is not None and modelo.en_vuelo <= 0:
+                self._descartar(modelo, drenado=True)
+
+    # --- Carga y cambio de versiones ---
+
+    def revisar(self, calentar: bool = True):
+        """
+        Comparar lo que hay en disco con lo cargado y cargar, promover o
+        retirar versiones. Es lo que ejecuta el hilo de fondo en cada vuelta.
+        """
+        with self._lock_revision:
+            disponibles = self._versiones_disponibles()
+            nombres = sorted(disponibles)
+            if nombres:
+                objetivo_activo, objetivo_candidato = self._objetivos(nombres)
+                self._actualizar_activo(objetivo_activo, nombres, disponibles, calentar)
+                self._actualizar_candidato(objetivo_candidato, disponibles, calentar)
+            elif self.candidato is not None:
+                self._reemplazar_candidato(None)
+            self._drenar_vencidos()
+
+    def calentar_cargados(self):
+        """
+        Warmup de las versiones ya cargadas (en cada worker tras el fork).
+        Una versión cuyo warmup falla se retira y queda como fallida (igual
+        que si no hubiera cargado): el worker arranca igual y la vigilancia
+        la reintenta tras `reintento` segundos.
+        """
+        with self._lock_revision:
+            for modelo in (self.activo, self.candidato):
+                if modelo is None:
+                    continue
+                try:
+                    modelo.calentar(self.cubetas, self.lotes_warmup)
+                except Exception as e:
+                    self._fallidos[modelo.nombre] = (modelo.firma, time.monotonic())
+                    self.ultimo_error = f"{modelo.nombre}: {e}"
+                    print(f"❌ Registro de modelos: falló el warmup de {modelo.nombre} ({modelo.version}): "
+                          f"{e}\n{traceback.format_exc()}", flush=True)
+                    with self._lock:
+                        if modelo is self.activo:
+                            self.activo = None
+                        elif modelo is self.candidato:
+                            self.candidato = None
+                        self._retirar(modelo)
+
+    def iniciar_vigilancia(self):
+        """
+        Arrancar el hilo que revisa el disco cada `intervalo` segundos. Se
+        vuelve a crear si el proceso cambió (fork de gunicorn).
+        """
+        if not self.intervalo or self.intervalo <= 0:
+            return
+        pid = os.getpid()
+        with self._lock:
+            if self._pid == pid:
+                return
+            self._pid = pid
+            self._hilo = threading.Thread(target=self._bucle, name="registro-modelos", daemon=True)
+            self._hilo.start()
+
+    def _bucle(self):
+        while True:
+            time.sleep(self.intervalo)
+            try:
+                self.revisar()
+            except Exception as e:
+                print(f"❌ Registro de modelos: error revisando versiones: {e}\n{traceback.format_exc()}", flush=True)
+
+    def _versiones_disponibles(self) -> Dict[str, Tuple[str, Tuple]]:
+        """
+        nombre -> (ruta, firma) de cada versión en disco.
+        """
+        if not self.directorio:
+            return {'default': (self.ruta_unica, _firma(self.archivos_vigilados))}
+        if not os.path.isdir(self.directorio):
+            return {}
+        versiones = {}
+        with os.scandir(self.directorio) as entradas:
+            for entrada in entradas:
+                if (not entrada.is_dir() or entrada.name.startswith('.')
+                        or entrada.name.endswith(SUFIJOS_IGNORADOS)):
+                    continue
+                versiones[entrada.name] = (entrada.path, _firma([entrada.path]))
+        return versiones
+
+    def _version_fijada(self) -> Optional[str]:
+        if not self.directorio:
+            return None
+        try:
+            with open(os.path.join(self.directorio, ARCHIVO_ACTIVA), 'r', encoding='utf-8') as handle:
+                return handle.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def _objetivos(self, nombres: List[str]) -> Tuple[str, Optional[str]]:
+        """
+        (versión que debe estar activa, candidata o None).
+
+        ACTIVE manda si nombra una versión existente. Si no: sin canary la
+        activa es la más nueva; con canary se mantiene la activa actual y la
+        más nueva pasa a candidata.
+        """
+        mas_nueva = nombres[-1]
+        fijada = self._version_fijada()
+        if fijada in nombres:
+            activa = fijada
+        elif self.canary_percent > 0 and self.activo is not None and self.activo.nombre in nombres:
+            activa = self.activo.nombre
+        else:
+            activa = mas_nueva
+        candidata = mas_nueva if self.canary_percent > 0 and mas_nueva != activa else None
+        return activa, candidata
+
+    def _actualizar_activo(self, objetivo: str, nombres: List[str], disponibles: Dict, calentar: bool):
+        ruta, firma = disponibles[objetivo]
+        if self.activo is not None and self.activo.nombre == objetivo and self.activo.firma == firma:
+            return
+
+        # Promoción: la candidata ya está cargada y caliente
+        candidato = self.candidato
+        if candidato is not None and candidato.nombre == objetivo and candidato.firma == firma:
+            with self._lock:
+                anterior, self.activo, self.candidato = self.activo, candidato, None
+                self._retirar(anterior)
+                self.cambios += 1
+            print(f"✅ Registro de modelos: candidata {objetivo} ({candidato.version}) promovida a activa", flush=True)
+            return
+
+        # Sin versión activa se prueban las demás, de la más nueva a la más vieja
+        intentos = [objetivo]
+        if self.activo is None:
+            intentos += [nombre for nombre in reversed(nombres) if nombre != objetivo]
+        for nombre in intentos:
+            nuevo = self._cargar(nombre, *disponibles[nombre], calentar=calentar)
+            if nuevo is not None:
+                self._activar(nuevo)
+                return
+
+    def _actualizar_candidato(self, objetivo: Optional[str], disponibles: Dict, calentar: bool):
+        if objetivo is None:
+            if self.candidato is not None:
+                self._reemplazar_candidato(None)
+            return
+        ruta, firma = disponibles[objetivo]
+        if self.candidato is not None and self.candidato.nombre == objetivo and self.candidato.firma == firma:
+            return
+        nuevo = self._cargar(objetivo, ruta, firma, calentar=calentar)
+        if nuevo is not None:
+            self._reemplazar_candidato(nuevo)
+            print(f"🐤 Registro de modelos: {objetivo} ({nuevo.version}) es candidata "
+                  f"con el {self.canary_percent:g}% del tráfico", flush=True)
+
+    def _cargar(self, nombre: str, ruta: str, firma: Tuple, calentar: bool) -> Optional[ModeloCargado]:
+        fallido = self._fallidos.get(nombre)
+        if fallido is not None and fallido[0] == firma and time.monotonic() - fallido[1] < self.reintento:
+            return None
+
+        inicio = time.monotonic()
+        try:
+            modelo = self.cargar(nombre, ruta)
+            modelo.firma = firma
+            if calentar:
+                modelo.calentar(self.cubetas, self.lotes_warmup)
+        except Exception as e:
+            self._fallidos[nombre] = (firma, time.monotonic())
+            self.ultimo_error = f"{nombre}: {e}"
+            print(f"❌ Registro de modelos: no se pudo cargar {nombre} ({ruta}): {e}\n{traceback.format_exc()}",
+                  flush=True)
+            return None
+
+        self._fallidos.pop(nombre, None)
+        print(f"✅ Registro de modelos: {nombre} ({modelo.version}) cargada en "
+              f"{time.monotonic() - inicio:.1f}s{' con warmup' if calentar else ''}", flush=True)
+        return modelo
+
+    def _activar(self, nuevo: ModeloCargado):
+        with self._lock:
+            anterior, self.activo = self.activo, nuevo
+            self._retirar(anterior)
+            self.cambios += 1
+            self.ultimo_error = None
+        print(f"✅ Registro de modelos: versión activa {nuevo.nombre} ({nuevo.version})", flush=True)
+
+    def _reemplazar_candidato(self, nuevo: Optional[ModeloCargado]):
+        with self._lock:
+            anterior, self.candidato = self.candidato, nuevo
+            self._retirar(anterior)
+
+    # --- Drenado (siempre con self._lock tomado) ---
+
+    def _retirar(self, modelo: Optional[ModeloCargado]):
+        if modelo is None:
+            return
+        modelo.retirado_en = time.monotonic()
+        if modelo.en_vuelo <= 0:
+            self._descartar(modelo, drenado=True, registrado=False)
+        else:
+            self._retirados.append(modelo)
+
+    def _descartar(self, modelo: ModeloCargado, drenado: bool, registrado: bool = True):
+        if registrado and modelo in self._retirados:
+            self._retirados.remove(modelo)
+        if drenado:
+            # Ninguna solicitud la usa ni puede adquirirla: se sueltan el motor y el tokenizer
+            modelo.motor = None
+            modelo.tokenizer = None
+            modelo.rapido = None
+            print(f"♻️ Registro de modelos: {modelo.nombre} ({modelo.version}) liberada", flush=True)
+        else:
+            print(f"⚠️ Registro de modelos: {modelo.nombre} ({modelo.version}) sigue con {modelo.en_vuelo} "
+                  f"solicitudes tras {self.drain_timeout:g}s; se deja de seguir", flush=True)
+
+    def _drenar_vencidos(self):
+        with self._lock:
+            ahora = time.monotonic()
+            for modelo in list(self._retirados):
+                if ahora - modelo.retirado_en >= self.drain_timeout:
+                    self._descartar(modelo, drenado=False)
+
+    def estadisticas(self) -> Dict:
+        with self._lock:
+            return {
+                "directory": self.directorio,
+                "active": self.activo.estadisticas() if self.activo is not None else None,
+                "candidate": self.candidato.estadisticas() if self.candidato is not None else None,
+                "canary_percent": self.canary_percent,
+                "draining": [modelo.estadisticas() for modelo in self._retirados],
+                "swaps": self.cambios,
+                "last_error": self.ultimo_error,
+                "watch_interval": self.intervalo,
+            }
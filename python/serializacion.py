@@ -0,0 +1,67 @@
+"""
+Serialización JSON de las respuestas de la API
+
+Usa orjson si está instalado (varias veces más rápido que json y escribe
+bytes UTF-8 directamente); si no, json de la librería estándar. Las
+Publicacion se serializan con su a_dict() sin armar antes la estructura
+completa de diccionarios.
+"""
+
+import json
+from typing import Any
+
+from flask.json.provider import JSONProvider
+
+from publicaciones import Publicacion
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+
+def _por_defecto(objeto: Any) -> Any:
+    if isinstance(objeto, Publicacion):
+        return objeto.a_dict()
+    # Escalares de numpy (p. ej. float32 de las probabilidades)
+    if hasattr(objeto, 'item'):
+        return objeto.item()
+    raise TypeError(f"No se puede serializar {type(objeto).__name__} a JSON")
+
+
+if ORJSON_AVAILABLE:
+    _OPCIONES = orjson.OPT_SERIALIZE_NUMPY
+
+    def a_json(objeto: Any) -> bytes:
+        return orjson.dumps(objeto, default=_por_defecto, option=_OPCIONES)
+
+    def linea_ndjson(objeto: Any) -> bytes:
+        return orjson.dumps(objeto, default=_por_defecto, option=_OPCIONES | orjson.OPT_APPEND_NEWLINE)
+
+    desde_json = orjson.loads
+else:
+    def a_json(objeto: Any) -> bytes:
+        return json.dumps(objeto, default=_por_defecto, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+    def linea_ndjson(objeto: Any) -> bytes:
+        return a_json(objeto) + b'\n'
+
+    desde_json = json.loads
+
+
+class ProveedorJSON(JSONProvider):
+    """
+    Proveedor JSON de Flask (jsonify, request.get_json) basado en a_json.
+    """
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        return a_json(obj).decode('utf-8')
+
+    def loads(self, s, **kwargs: Any) -> Any:
+        return desde_json(s)
+
+    def response(self, *args: Any, **kwargs: Any):
+        # Se arma la respuesta con los bytes de a_json, sin pasar por str
+        return self._app.response_class(a_json(self._prepare_response_obj(args, kwargs)),
+                                        mimetype='application/json')
@@ -0,0 +1,65 @@
+"""
+Fixtures compartidas: un BiLSTM chico con pesos aleatorios (misma
+arquitectura que el modelo real) exportado como artefacto, para probar sin el
+.h5 ni TensorFlow.
+"""
+
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from artefacto import exportar_artefacto  # noqa: E402
+from vocabulario import CompactTokenizer  # noqa: E402
+
+MAX_SEQUENCE_LENGTH = 20
+PALABRAS = ['bueno', 'malo', 'feliz', 'triste', 'odio', 'amo', 'normal', 'casa', 'perro', 'gato', 'día', 'noche']
+
+
+def pesos_bilstm(semilla: int = 0, vocab: int = 16, dim: int = 8, units: int = 6):
+    """
+    (pesos, configs) de Embedding -> SpatialDropout1D -> Bidirectional(LSTM)
+    -> Dense(softmax), como los devuelve leer_pesos_h5.
+    """
+    rng = np.random.default_rng(semilla)
+
+    def matriz(*forma):
+        return rng.normal(0, 0.5, forma).astype(np.float32)
+
+    pesos = {
+        'embedding': [matriz(vocab, dim)],
+        'bidirectional': [matriz(dim, 4 * units), matriz(units, 4 * units), matriz(4 * units),
+                          matriz(dim, 4 * units), matriz(units, 4 * units), matriz(4 * units)],
+        'dense': [matriz(2 * units, 3), matriz(3)],
+    }
+    configs = [
+        ('Embedding', {'name': 'embedding', 'mask_zero': False}),
+        ('SpatialDropout1D', {'name': 'spatial_dropout1d'}),
+        ('Bidirectional', {'name': 'bidirectional', 'merge_mode': 'concat',
+                           'layer': {'config': {'activation': 'tanh', 'recurrent_activation': 'sigmoid'}}}),
+        ('Dense', {'name': 'dense', 'activation': 'softmax'}),
+    ]
+    return pesos, configs
+
+
+def tokenizer_de_prueba() -> CompactTokenizer:
+    return CompactTokenizer(['<OOV>'] + PALABRAS, num_words=16, oov_index=1,
+                            filters='!"#$%&()*+,-./:;<=>?@[\\]^_`{|}~\t\n')
+
+
+def exportar_bilstm(directorio: str, semilla: int = 0) -> str:
+    """
+    Exportar un artefacto con pesos aleatorios y devolver su versión.
+    """
+    pesos, configs = pesos_bilstm(semilla)
+    return exportar_artefacto(directorio, pesos, configs, tokenizer_de_prueba(), MAX_SEQUENCE_LENGTH)
+
+
+@pytest.fixture
+def artefacto_bilstm(tmp_path):
+    directorio = str(tmp_path / 'artefacto')
+    exportar_bilstm(directorio)
+    return directorio
@@ -0,0 +1,107 @@
+import json
+import os
+import random
+import sys
+
+import pandas as pd
+import pytest
+
+import batch_score
+from conftest import PALABRAS, tokenizer_de_prueba
+
+
+class Interrupcion(Exception):
+    pass
+
+
+@pytest.fixture
+def entrada(tmp_path, artefacto_bilstm):
+    """
+    CSV de 23 filas y el vocabulario del artefacto de prueba.
+    """
+    rng = random.Random(0)
+    filas = [{'uri': f'at://post/{i}', 'text': ' '.join(rng.choices(PALABRAS + ['@alguien', '¡muy!'], k=rng.randint(0, 8)))}
+             for i in range(23)]
+    ruta = str(tmp_path / 'posts.csv')
+    pd.DataFrame(filas).to_csv(ruta, index=False)
+    vocab = str(tmp_path / 'vocabulario.json')
+    tokenizer_de_prueba().guardar_json(vocab)
+    return ruta, vocab
+
+
+def ejecutar(monkeypatch, entrada, artefacto, salida, *extra):
+    ruta, vocab = entrada
+    monkeypatch.setattr(sys, 'argv', [
+        'batch_score.py', '--input', ruta, '--output', salida, '--id-column', 'uri',
+        '--backend', 'numpy', '--model', artefacto, '--vocab', vocab, '--tokenizer', 'no_existe.pickle',
+        '--chunk-size', '5', '--workers', '1', *extra])
+    return batch_score.main()
+
+
+def interrumpir_tras(monkeypatch, bloques: int):
+    """
+    Hacer fallar la ejecución al armar el bloque número bloques + 1.
+    """
+    original = batch_score.armar_resultados
+    llamadas = []
+
+    def armar(*args, **kwargs):
+        llamadas.append(1)
+        if len(llamadas) > bloques:
+            raise Interrupcion()
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(batch_score, 'armar_resultados', armar)
+
+
+def leer_salida(ruta: str) -> pd.DataFrame:
+    if batch_score.es_parquet(ruta):
+        partes = sorted(nombre for nombre in os.listdir(ruta) if nombre.endswith('.parquet'))
+        return pd.concat([pd.read_parquet(os.path.join(ruta, parte)) for parte in partes], ignore_index=True)
+    return pd.read_csv(ruta, keep_default_na=False)
+
+
+def test_puntua_todas_las_filas(monkeypatch, tmp_path, entrada, artefacto_bilstm):
+    salida = str(tmp_path / 'puntuados.csv')
+    assert ejecutar(monkeypatch, entrada, artefacto_bilstm, salida) == 0
+
+    resultado = leer_salida(salida)
+    assert resultado['uri'].tolist() == [f'at://post/{i}' for i in range(23)]
+    assert set(resultado['sentiment']) <= {'Negative', 'Neutral', 'Positive'}
+    with open(batch_score.ruta_avance(salida), 'r', encoding='utf-8') as handle:
+        assert json.load(handle)['rows'] == 23
+
+
+@pytest.mark.parametrize('nombre', ['puntuados.csv', 'puntuados.parquet'])
+def test_resume_da_lo_mismo_que_sin_interrupcion(monkeypatch, tmp_path, entrada, artefacto_bilstm, nombre):
+    if nombre.endswith('.parquet'):
+        pytest.importorskip('pyarrow')
+    referencia = str(tmp_path / ('referencia_' + nombre))
+    ejecutar(monkeypatch, entrada, artefacto_bilstm, referencia)
+
+    salida = str(tmp_path / nombre)
+    with monkeypatch.context() as contexto:
+        interrumpir_tras(contexto, 2)
+        with pytest.raises(Interrupcion):
+            ejecutar(contexto, entrada, artefacto_bilstm, salida)
+    # Un bloque escrito a medias después del último avance registrado
+    if batch_score.es_parquet(salida):
+        open(os.path.join(salida, 'part-00002.parquet'), 'wb').close()
+    else:
+        with open(salida, 'a', encoding='utf-8') as handle:
+            handle.write('at://post/10,Posi')
+
+    assert ejecutar(monkeypatch, entrada, artefacto_bilstm, salida, '--resume') == 0
+
+    pd.testing.assert_frame_equal(leer_salida(salida), leer_salida(referencia))
+
+
+def test_resume_rechaza_avance_de_otra_ejecucion(monkeypatch, tmp_path, entrada, artefacto_bilstm):
+    salida = str(tmp_path / 'puntuados.csv')
+    with monkeypatch.context() as contexto:
+        interrumpir_tras(contexto, 1)
+        with pytest.raises(Interrupcion):
+            ejecutar(contexto, entrada, artefacto_bilstm, salida)
+
+    with pytest.raises(ValueError):
+        ejecutar(monkeypatch, entrada, artefacto_bilstm, salida, '--resume', '--chunk-size', '7')
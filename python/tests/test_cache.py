@@ -0,0 +1,174 @@
+import asyncio
+import threading
+import time
+
+import numpy as np
+import pytest
+
+import cache as modulo_cache
+from cache import LRUCache, RedisPredictionCache
+
+
+def esperar_hasta(condicion, limite: float = 5.0):
+    fin = time.monotonic() + limite
+    while not condicion():
+        assert time.monotonic() < fin, "la condición no se cumplió a tiempo"
+        time.sleep(0.001)
+
+
+def test_lru_expulsa_la_menos_usada():
+    cache = LRUCache(max_size=2)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    assert cache.get('a') == 1
+    cache.set('c', 3)
+
+    assert cache.get('b') is None
+    assert cache.get('a') == 1 and cache.get('c') == 3
+    assert cache.evictions == 1
+
+
+def test_ttl_expira(monkeypatch):
+    ahora = [100.0]
+    monkeypatch.setattr(time, 'monotonic', lambda: ahora[0])
+    cache = LRUCache(ttl=5)
+    cache.set('a', 1)
+    ahora[0] += 4.9
+    assert cache.get('a') == 1
+    ahora[0] += 0.2
+    assert cache.get('a') is None
+
+
+def test_obtener_o_calcular_calcula_una_sola_vez_con_hilos():
+    cache = LRUCache()
+    empezo = threading.Event()
+    seguir = threading.Event()
+    llamadas = []
+
+    def calcular():
+        llamadas.append(1)
+        empezo.set()
+        seguir.wait(5)
+        return 'valor'
+
+    resultados = []
+    hilos = [threading.Thread(target=lambda: resultados.append(cache.obtener_o_calcular('k', calcular)))
+             for _ in range(8)]
+    hilos[0].start()
+    assert empezo.wait(5)
+    for hilo in hilos[1:]:
+        hilo.start()
+    # Los demás hilos quedan esperando el cálculo en curso
+    esperar_hasta(lambda: cache.coalesced == len(hilos) - 1)
+    seguir.set()
+    for hilo in hilos:
+        hilo.join(5)
+
+    assert len(llamadas) == 1
+    assert resultados == ['valor'] * len(hilos)
+    assert cache.get('k') == 'valor'
+
+
+def test_obtener_o_calcular_comparte_la_excepcion_y_no_guarda():
+    cache = LRUCache()
+    empezo = threading.Event()
+    seguir = threading.Event()
+
+    def fallar():
+        empezo.set()
+        seguir.wait(5)
+        raise RuntimeError('upstream caído')
+
+    errores = []
+
+    def consultar():
+        try:
+            cache.obtener_o_calcular('k', fallar)
+        except RuntimeError as e:
+            errores.append(str(e))
+
+    primero = threading.Thread(target=consultar)
+    primero.start()
+    assert empezo.wait(5)
+    segundo = threading.Thread(target=consultar)
+    segundo.start()
+    esperar_hasta(lambda: cache.coalesced == 1)
+    seguir.set()
+    primero.join(5)
+    segundo.join(5)
+
+    assert errores == ['upstream caído'] * 2
+    # La clave queda libre: la próxima consulta vuelve a calcular
+    assert cache.obtener_o_calcular('k', lambda: 'nuevo') == 'nuevo'
+
+
+def test_guardar_si_no_guarda_valores_rechazados():
+    cache = LRUCache()
+    assert cache.obtener_o_calcular('k', lambda: [], guardar_si=bool) == []
+    assert cache.obtener_o_calcular('k', lambda: ['post'], guardar_si=bool) == ['post']
+    assert cache.get('k') == ['post']
+
+
+def test_obtener_o_calcular_async_calcula_una_sola_vez():
+    cache = LRUCache()
+    llamadas = []
+
+    async def calcular():
+        llamadas.append(1)
+        await asyncio.sleep(0.01)
+        return 'valor'
+
+    async def principal():
+        return await asyncio.gather(*(cache.obtener_o_calcular_async('k', calcular) for _ in range(10)))
+
+    assert asyncio.run(principal()) == ['valor'] * 10
+    assert len(llamadas) == 1
+    assert cache.coalesced == 9
+
+
+def test_obtener_o_calcular_async_cancelar_a_uno_no_cancela_a_los_demas():
+    cache = LRUCache()
+
+    async def calcular():
+        await asyncio.sleep(0.02)
+        return 'valor'
+
+    async def principal():
+        primera = asyncio.ensure_future(cache.obtener_o_calcular_async('k', calcular))
+        await asyncio.sleep(0)
+        segunda = asyncio.ensure_future(cache.obtener_o_calcular_async('k', calcular))
+        await asyncio.sleep(0)
+        segunda.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await segunda
+        return await primera
+
+    assert asyncio.run(principal()) == 'valor'
+
+
+class RedisFalso:
+    def __init__(self):
+        self.datos = {}
+        self.expiraciones = {}
+
+    def set(self, clave, valor, ex=None, px=None):
+        if ex is not None and ex <= 0 or px is not None and px <= 0:
+            raise ValueError("invalid expire time in 'set' command")
+        self.datos[clave] = valor
+        self.expiraciones[clave] = px if px is not None else ex and ex * 1000
+
+    def get(self, clave):
+        return self.datos.get(clave)
+
+
+@pytest.mark.parametrize('ttl, milisegundos', [(0.5, 500), (0.0001, 1), (30, 30000), (None, None)])
+def test_redis_guarda_ttl_en_milisegundos(monkeypatch, ttl, milisegundos):
+    monkeypatch.setattr(modulo_cache, 'REDIS_AVAILABLE', True)
+    cache = RedisPredictionCache('redis://localhost', ttl=ttl)
+    cache._cliente = RedisFalso()
+
+    cache.set('clave', np.array([0.1, 0.2, 0.7]))
+
+    assert cache.errors == 0
+    assert cache._cliente.expiraciones['sentiment:clave'] == milisegundos
+    np.testing.assert_allclose(cache.get('clave'), [0.1, 0.2, 0.7])
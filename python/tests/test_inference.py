@@ -0,0 +1,60 @@
+import numpy as np
+
+from conftest import MAX_SEQUENCE_LENGTH
+from inference import aplicar_padding, crear_motor, predecir_por_cubetas
+
+
+def secuencias_variadas(semilla: int = 1):
+    rng = np.random.default_rng(semilla)
+    largos = [0, 1, 3, 4, 5, 8, 9, 15, 16, 19, 20, 21, 35]
+    return [list(rng.integers(1, 16, largo)) for largo in largos]
+
+
+class MotorDeAnchoFijo:
+    """
+    Motor que no acepta anchos menores: registra los anchos que recibe.
+    """
+    longitud_variable = False
+
+    def __init__(self, motor):
+        self.motor = motor
+        self.anchos = []
+
+    def predict(self, secuencias_pad):
+        self.anchos.append(secuencias_pad.shape[1])
+        return self.motor.predict(secuencias_pad)
+
+
+def test_aplicar_padding_igual_a_pad_sequences():
+    matriz = aplicar_padding([[1, 2], [], [3, 4, 5, 6]], 3)
+    np.testing.assert_array_equal(matriz, [[0, 1, 2], [0, 0, 0], [4, 5, 6]])
+
+
+def test_cubetas_igual_a_padding_completo(artefacto_bilstm):
+    motor = crear_motor('numpy', artefacto_bilstm, MAX_SEQUENCE_LENGTH)
+    secuencias = secuencias_variadas()
+
+    completo = motor.predict(aplicar_padding(secuencias, MAX_SEQUENCE_LENGTH))
+    por_cubetas = predecir_por_cubetas(motor, secuencias, (4, 8, 16), MAX_SEQUENCE_LENGTH)
+
+    assert por_cubetas.shape == (len(secuencias), 3)
+    np.testing.assert_allclose(por_cubetas, completo, rtol=1e-5, atol=1e-6)
+
+
+def test_cubetas_igual_a_cada_secuencia_sola(artefacto_bilstm):
+    motor = crear_motor('numpy', artefacto_bilstm, MAX_SEQUENCE_LENGTH)
+    secuencias = secuencias_variadas(2)
+
+    por_cubetas = predecir_por_cubetas(motor, secuencias, (4, 8, 16), MAX_SEQUENCE_LENGTH)
+    for fila, secuencia in zip(por_cubetas, secuencias):
+        sola = motor.predict(aplicar_padding([secuencia], MAX_SEQUENCE_LENGTH))[0]
+        np.testing.assert_allclose(fila, sola, rtol=1e-5, atol=1e-6)
+
+
+def test_motor_sin_longitud_variable_usa_padding_completo(artefacto_bilstm):
+    motor = MotorDeAnchoFijo(crear_motor('numpy', artefacto_bilstm, MAX_SEQUENCE_LENGTH))
+    secuencias = secuencias_variadas()
+
+    predecir_por_cubetas(motor, secuencias, (4, 8, 16), MAX_SEQUENCE_LENGTH)
+
+    assert motor.anchos == [MAX_SEQUENCE_LENGTH]
@@ -0,0 +1,241 @@
+import asyncio
+
+import pytest
+
+import limites_upstream
+from limites_upstream import ErrorUpstream, PlanificadorUpstream, TokenBucket
+
+
+class Reloj:
+    """
+    Reemplazo de time (y del jitter de random) en limites_upstream: sleep
+    avanza el reloj al instante y registra la espera.
+    """
+
+    def __init__(self):
+        self.ahora = 1000.0
+        self.esperas = []
+
+    def monotonic(self):
+        return self.ahora
+
+    def time(self):
+        return 1.7e9 + self.ahora
+
+    def sleep(self, segundos):
+        self.esperas.append(round(segundos, 6))
+        self.ahora += segundos
+
+    def uniform(self, minimo, maximo):
+        # Jitter fijo en el máximo: el backoff queda determinista
+        return maximo
+
+
+class Respuesta:
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+
+class ErrorHTTP(Exception):
+    def __init__(self, status_code, headers=None):
+        super().__init__(f"HTTP {status_code}")
+        self.response = Respuesta(status_code, headers)
+
+
+def falla_y_luego_responde(*errores):
+    pendientes = list(errores)
+    llamadas = []
+
+    def funcion():
+        llamadas.append(1)
+        if pendientes:
+            raise pendientes.pop(0)
+        return 'ok'
+    funcion.llamadas = llamadas
+    return funcion
+
+
+@pytest.fixture
+def reloj(monkeypatch):
+    reloj = Reloj()
+    monkeypatch.setattr(limites_upstream, 'time', reloj)
+    monkeypatch.setattr(limites_upstream, 'random', reloj)
+    monkeypatch.setattr(limites_upstream, 'UPSTREAM_MAX_RETRIES', 3)
+    monkeypatch.setattr(limites_upstream, 'UPSTREAM_BACKOFF_BASE', 0.25)
+    monkeypatch.setattr(limites_upstream, 'UPSTREAM_BACKOFF_MAX', 8)
+    monkeypatch.setattr(limites_upstream, 'UPSTREAM_MAX_WAIT', 10)
+    monkeypatch.setattr(limites_upstream, 'UPSTREAM_RETRY_RATIO', 0.2)
+    monkeypatch.setattr(limites_upstream, 'UPSTREAM_RETRY_BUDGET', 10)
+    monkeypatch.setattr(limites_upstream, 'UPSTREAM_BREAKER_FAILURES', 3)
+    monkeypatch.setattr(limites_upstream, 'UPSTREAM_BREAKER_SECONDS', 30)
+    return reloj
+
+
+@pytest.fixture
+def planificador(reloj):
+    return PlanificadorUpstream({'prueba': (2.0, 3)})
+
+
+def test_token_bucket_rafaga_y_recarga(reloj):
+    bucket = TokenBucket(tasa=2.0, rafaga=3)
+    assert [bucket.reservar(reloj.ahora) for _ in range(3)] == [0.0, 0.0, 0.0]
+    # Sin tokens: cada reserva espera medio segundo más que la anterior
+    assert bucket.reservar(reloj.ahora) == pytest.approx(0.5)
+    assert bucket.reservar(reloj.ahora) == pytest.approx(1.0)
+
+    reloj.ahora += 10
+    assert bucket.reservar(reloj.ahora) == 0.0
+    assert bucket.tokens == pytest.approx(2.0)
+
+
+def test_token_bucket_limite_temporal(reloj):
+    bucket = TokenBucket(tasa=10.0, rafaga=1)
+    bucket.limitar(1.0, hasta=reloj.ahora + 5)
+    bucket.reservar(reloj.ahora)
+    assert bucket.reservar(reloj.ahora) == pytest.approx(1.0)
+
+    reloj.ahora += 6
+    bucket.reservar(reloj.ahora)
+    assert bucket.reservar(reloj.ahora) == pytest.approx(0.1)
+
+
+def test_planificador_espera_al_bucket(reloj, planificador):
+    for _ in range(5):
+        planificador.ejecutar('prueba', lambda: 'ok')
+    assert reloj.esperas == [0.5, 0.5]
+
+
+def test_reintenta_con_backoff_exponencial(reloj, planificador):
+    funcion = falla_y_luego_responde(ErrorHTTP(503), ErrorHTTP(502))
+
+    assert planificador.ejecutar('prueba', funcion) == 'ok'
+
+    assert len(funcion.llamadas) == 3
+    # 0.25 y 0.5 s de backoff (sin esperas del bucket: la ráfaga alcanza)
+    assert reloj.esperas == [0.25, 0.5]
+    estado = planificador.estado('prueba')
+    assert estado.contadores['retries'] == 2
+    assert estado.fallos_seguidos == 0 and estado.circuito == 'closed'
+
+
+def test_backoff_acotado(reloj, monkeypatch, planificador):
+    monkeypatch.setattr(limites_upstream, 'UPSTREAM_BACKOFF_MAX', 3)
+    estado = planificador.estado('prueba')
+    assert [estado.espera_reintento(intento) for intento in range(6)] == [0.25, 0.5, 1.0, 2.0, 3, 3]
+
+
+def test_respeta_retry_after(reloj, planificador):
+    funcion = falla_y_luego_responde(ErrorHTTP(429, {'Retry-After': '4'}))
+
+    assert planificador.ejecutar('prueba', funcion) == 'ok'
+
+    assert reloj.esperas[0] == 4.0
+    assert planificador.estado('prueba').contadores['rate_limited'] == 1
+
+
+def test_retry_after_mayor_a_la_espera_maxima_falla_enseguida(reloj, planificador):
+    funcion = falla_y_luego_responde(ErrorHTTP(429, {'Retry-After': '60'}))
+
+    with pytest.raises(ErrorUpstream) as error:
+        planificador.ejecutar('prueba', funcion)
+
+    assert error.value.motivo == 'rate_limited'
+    assert error.value.retry_after == pytest.approx(60)
+    assert reloj.esperas == []
+    # Mientras dure el bloqueo ni siquiera se llama
+    with pytest.raises(ErrorUpstream):
+        planificador.ejecutar('prueba', funcion)
+    assert len(funcion.llamadas) == 1
+
+
+def test_error_no_reintentable_se_propaga_sin_contar_como_fallo(reloj, planificador):
+    funcion = falla_y_luego_responde(ErrorHTTP(404))
+
+    with pytest.raises(ErrorHTTP):
+        planificador.ejecutar('prueba', funcion)
+
+    estado = planificador.estado('prueba')
+    assert estado.fallos_seguidos == 0 and estado.circuito == 'closed'
+
+
+def test_agota_los_reintentos(reloj, planificador):
+    funcion = falla_y_luego_responde(*[ErrorHTTP(503)] * 10)
+
+    with pytest.raises(ErrorUpstream) as error:
+        planificador.ejecutar('prueba', funcion)
+
+    assert error.value.motivo == 'unavailable' and error.value.status == 503
+    # Se abre el circuito al tercer fallo seguido (UPSTREAM_BREAKER_FAILURES)
+    assert len(funcion.llamadas) == 3
+
+
+def test_circuit_breaker_abre_prueba_y_cierra(reloj, planificador):
+    estado = planificador.estado('prueba')
+    for _ in range(3):
+        estado.antes_de_llamar()
+        estado.registrar_fallo(503, None)
+    assert estado.circuito == 'open'
+
+    llamadas = []
+    with pytest.raises(ErrorUpstream) as error:
+        planificador.ejecutar('prueba', lambda: llamadas.append(1))
+    assert error.value.motivo == 'circuit_open'
+    assert error.value.retry_after == pytest.approx(30)
+    assert llamadas == []
+
+    # Pasado el tiempo, una solicitud de prueba a la vez (half-open)
+    reloj.ahora += 31
+    estado.antes_de_llamar()
+    assert estado.circuito == 'half_open'
+    with pytest.raises(ErrorUpstream):
+        estado.antes_de_llamar()
+    estado.registrar_exito()
+    assert estado.circuito == 'closed'
+    assert planificador.ejecutar('prueba', lambda: 'ok') == 'ok'
+
+
+def test_circuit_breaker_vuelve_a_abrir_si_la_prueba_falla(reloj, planificador):
+    estado = planificador.estado('prueba')
+    for _ in range(3):
+        estado.antes_de_llamar()
+        estado.registrar_fallo(503, None)
+    reloj.ahora += 31
+
+    with pytest.raises(ErrorUpstream):
+        planificador.ejecutar('prueba', falla_y_luego_responde(ErrorHTTP(503)))
+
+    assert estado.circuito == 'open'
+    assert estado.circuito_abierto_hasta == pytest.approx(reloj.ahora + 30)
+
+
+def test_presupuesto_de_reintentos(reloj, monkeypatch, planificador):
+    monkeypatch.setattr(limites_upstream, 'UPSTREAM_BREAKER_FAILURES', 100)
+    estado = planificador.estado('prueba')
+    estado.saldo_reintentos = 0.0
+    funcion = falla_y_luego_responde(ErrorHTTP(503), ErrorHTTP(503))
+
+    with pytest.raises(ErrorUpstream):
+        planificador.ejecutar('prueba', funcion)
+
+    # Cada solicitud suma 0.2 al saldo: sin saldo no se reintenta
+    assert len(funcion.llamadas) == 1
+    assert estado.contadores['retry_budget_exhausted'] == 1
+
+
+def test_ejecutar_async_reintenta(reloj, monkeypatch, planificador):
+    esperas = []
+
+    async def dormir(segundos):
+        esperas.append(segundos)
+
+    monkeypatch.setattr(limites_upstream.asyncio, 'sleep', dormir)
+    pendientes = [ErrorHTTP(503)]
+
+    async def funcion():
+        if pendientes:
+            raise pendientes.pop()
+        return 'ok'
+
+    assert asyncio.run(planificador.ejecutar_async('prueba', funcion)) == 'ok'
+    assert esperas == [0.25]
@@ -0,0 +1,60 @@
+import random
+import re
+
+import pytest
+
+from normalizacion import LARGO_MINIMO, STOPWORDS, limpiar_muchos, limpiar_texto
+
+
+def limpiar_en_cuatro_pasadas(texto) -> str:
+    """
+    Limpieza anterior (un re.sub por paso) seguida del filtro de stopwords
+    y largo con el que se generó text_clean.
+    """
+    if not isinstance(texto, str):
+        return ""
+    texto = texto.lower()
+    texto = re.sub(r'https?://\S+|www\.\S+', ' ', texto)
+    texto = re.sub(r'@\w+|#\w+', ' ', texto)
+    texto = re.sub(r'[^\w\s]', ' ', texto)
+    texto = re.sub(r'\s+', ' ', texto).strip()
+    return ' '.join(p for p in texto.split() if len(p) >= LARGO_MINIMO and p not in STOPWORDS)
+
+
+CASOS = [
+    "¡Me ENCANTA este producto! 😍😍 https://t.co/abc123",
+    "@usuario_1 qué opinas de #Elecciones2024? www.ejemplo.com/x?y=1",
+    "@xhttp://pegado.com/ruta texto después",
+    "#tag@mencion#otro palabra",
+    "canción, corazón y pingüino... ñandú!!!",
+    "snake_case y números 12345 y 3.14",
+    "  espacios\t\ty\nsaltos  de   línea  ",
+    "http:/incompleto https:// vacío www. punto",
+    "emoji🙂pegado y ✔️ marcas ™ ©",
+    "the movie was not good at all",
+    "",
+]
+
+
+@pytest.mark.parametrize('texto', CASOS)
+def test_igual_a_cuatro_pasadas(texto):
+    assert limpiar_texto(texto) == limpiar_en_cuatro_pasadas(texto)
+
+
+def test_igual_a_cuatro_pasadas_con_textos_aleatorios():
+    rng = random.Random(0)
+    piezas = ['hola', 'Mundo', 'película', 'ñ', '_', '@', '#', 'http://', 'https://x.co/', 'www.', '.', ',',
+              '!', '¿', '?', '😀', '👍🏽', ' ', ' ', '\n', '\t', 'abc', '123', 'Ü', 'straße', 'ÉXITO', '-', '/']
+    for _ in range(2000):
+        texto = ''.join(rng.choice(piezas) for _ in range(rng.randint(0, 25)))
+        assert limpiar_texto(texto) == limpiar_en_cuatro_pasadas(texto), repr(texto)
+
+
+@pytest.mark.parametrize('valor', [None, 3.5, float('nan'), 42])
+def test_no_str_devuelve_vacio(valor):
+    assert limpiar_texto(valor) == ""
+
+
+def test_limpiar_muchos_igual_a_limpiar_texto():
+    textos = CASOS + [None, float('nan')]
+    assert limpiar_muchos(textos) == [limpiar_texto(texto) for texto in textos]
@@ -0,0 +1,276 @@
+import os
+
+import numpy as np
+import pytest
+
+import registro_modelos
+from conftest import MAX_SEQUENCE_LENGTH, exportar_bilstm, tokenizer_de_prueba
+from inference import crear_motor
+from registro_modelos import ARCHIVO_ACTIVA, ModeloCargado, RegistroModelos
+
+
+class MotorFalso:
+    longitud_variable = False
+
+    def __init__(self):
+        self.lotes = []
+
+    def warmup(self):
+        self.lotes.append('warmup')
+
+    def predict(self, secuencias_pad):
+        self.lotes.append(secuencias_pad.shape)
+        return np.zeros((len(secuencias_pad), 3), dtype=np.float32)
+
+
+class Cargador:
+    """
+    cargar(nombre, ruta) para el registro: la versión es el contenido de
+    version.txt y una carpeta con ROTO falla al cargar.
+    """
+
+    def __init__(self):
+        self.cargas = []
+
+    def __call__(self, nombre, ruta):
+        self.cargas.append(nombre)
+        if os.path.exists(os.path.join(ruta, 'ROTO')):
+            raise ValueError(f"modelo dañado en {ruta}")
+        with open(os.path.join(ruta, 'version.txt'), 'r', encoding='utf-8') as handle:
+            version = handle.read()
+        return ModeloCargado(nombre, version, MotorFalso(), tokenizer_de_prueba(), MAX_SEQUENCE_LENGTH)
+
+
+def publicar(directorio, nombre, version=None):
+    carpeta = os.path.join(directorio, nombre)
+    os.makedirs(carpeta, exist_ok=True)
+    with open(os.path.join(carpeta, 'version.txt'), 'w', encoding='utf-8') as handle:
+        handle.write(version or nombre)
+    return carpeta
+
+
+def fijar_activa(directorio, nombre):
+    with open(os.path.join(directorio, ARCHIVO_ACTIVA), 'w', encoding='utf-8') as handle:
+        handle.write(nombre)
+
+
+@pytest.fixture
+def directorio(tmp_path):
+    return str(tmp_path / 'modelos')
+
+
+@pytest.fixture
+def cargador():
+    return Cargador()
+
+
+def crear_registro(directorio, cargador, **opciones):
+    opciones.setdefault('reintento', 60.0)
+    return RegistroModelos(cargador, directorio=directorio, cubetas=(4, 8, 16), intervalo=0, **opciones)
+
+
+def test_sin_versiones_no_hay_modelo(directorio, cargador):
+    registro = crear_registro(directorio, cargador)
+    registro.revisar()
+
+    assert registro.adquirir() is None
+    assert registro.estadisticas()['active'] is None
+
+
+def test_carga_la_mas_nueva_e_ignora_publicaciones_en_curso(directorio, cargador):
+    publicar(directorio, '2026-10-01')
+    publicar(directorio, '2026-10-18')
+    publicar(directorio, '2026-10-30.tmp')
+    publicar(directorio, '.oculta')
+    registro = crear_registro(directorio, cargador)
+
+    registro.revisar(calentar=False)
+
+    assert registro.activo.nombre == '2026-10-18'
+    assert cargador.cargas == ['2026-10-18']
+
+
+def test_cambio_de_version_drena_la_anterior(directorio, cargador):
+    publicar(directorio, 'v1')
+    registro = crear_registro(directorio, cargador)
+    registro.revisar(calentar=False)
+    en_curso = registro.adquirir()
+    motor_v1 = en_curso.motor
+
+    publicar(directorio, 'v2')
+    registro.revisar(calentar=False)
+
+    # Las solicitudes nuevas usan v2; la que estaba en vuelo sigue con v1 intacta
+    nueva = registro.adquirir()
+    assert nueva.nombre == 'v2'
+    assert en_curso.motor is motor_v1
+    assert [modelo['name'] for modelo in registro.estadisticas()['draining']] == ['v1']
+
+    registro.liberar(en_curso)
+    assert en_curso.motor is None and en_curso.tokenizer is None
+    assert registro.estadisticas()['draining'] == []
+    assert registro.cambios == 2
+
+    registro.liberar(nueva)
+    assert nueva.motor is not None
+
+
+def test_version_sin_solicitudes_se_libera_enseguida(directorio, cargador):
+    publicar(directorio, 'v1')
+    registro = crear_registro(directorio, cargador)
+    registro.revisar(calentar=False)
+    v1 = registro.activo
+
+    publicar(directorio, 'v2')
+    registro.revisar(calentar=False)
+
+    assert v1.motor is None
+    assert registro.estadisticas()['draining'] == []
+
+
+def test_drain_timeout_deja_de_seguir_sin_liberar(directorio, cargador):
+    publicar(directorio, 'v1')
+    registro = crear_registro(directorio, cargador, drain_timeout=0)
+    registro.revisar(calentar=False)
+    atascada = registro.adquirir()
+
+    publicar(directorio, 'v2')
+    registro.revisar(calentar=False)
+
+    # Vencido el plazo se deja de seguir, pero no se suelta lo que aún usa
+    assert registro.estadisticas()['draining'] == []
+    assert atascada.motor is not None
+
+
+def test_version_rota_no_reemplaza_a_la_activa(directorio, cargador):
+    publicar(directorio, 'v1')
+    registro = crear_registro(directorio, cargador)
+    registro.revisar(calentar=False)
+
+    rota = publicar(directorio, 'v2')
+    open(os.path.join(rota, 'ROTO'), 'w').close()
+    registro.revisar(calentar=False)
+    registro.revisar(calentar=False)
+
+    assert registro.activo.nombre == 'v1'
+    assert 'v2' in registro.ultimo_error
+    # Sin cambios en la carpeta no se reintenta antes de `reintento` segundos
+    assert cargador.cargas == ['v1', 'v2']
+
+    os.remove(os.path.join(rota, 'ROTO'))
+    registro.revisar(calentar=False)
+    assert registro.activo.nombre == 'v2'
+
+
+def test_si_la_mas_nueva_falla_al_arrancar_usa_la_anterior(directorio, cargador):
+    publicar(directorio, 'v1')
+    open(os.path.join(publicar(directorio, 'v2'), 'ROTO'), 'w').close()
+    registro = crear_registro(directorio, cargador)
+
+    registro.revisar(calentar=False)
+
+    assert registro.activo.nombre == 'v1'
+
+
+def test_active_fija_la_version(directorio, cargador):
+    publicar(directorio, 'v1')
+    publicar(directorio, 'v2')
+    fijar_activa(directorio, 'v1')
+    registro = crear_registro(directorio, cargador)
+
+    registro.revisar(calentar=False)
+
+    assert registro.activo.nombre == 'v1'
+
+
+def test_canary_reparte_y_active_promueve_sin_recargar(monkeypatch, directorio, cargador):
+    publicar(directorio, 'v1')
+    registro = crear_registro(directorio, cargador, canary_percent=30)
+    registro.revisar(calentar=False)
+    publicar(directorio, 'v2')
+    registro.revisar(calentar=False)
+
+    assert registro.activo.nombre == 'v1'
+    assert registro.candidato.nombre == 'v2'
+
+    sorteos = iter(np.arange(100) / 100.0)
+    monkeypatch.setattr(registro_modelos.random, 'random', lambda: next(sorteos))
+    elegidos = [registro.adquirir() for _ in range(100)]
+    assert sum(modelo.nombre == 'v2' for modelo in elegidos) == 30
+    for modelo in elegidos:
+        registro.liberar(modelo)
+
+    candidata = registro.candidato
+    fijar_activa(directorio, 'v2')
+    registro.revisar(calentar=False)
+
+    assert registro.activo is candidata
+    assert registro.candidato is None
+    assert cargador.cargas == ['v1', 'v2']
+
+
+def test_borrar_la_candidata_la_descarta(directorio, cargador):
+    import shutil
+
+    publicar(directorio, 'v1')
+    registro = crear_registro(directorio, cargador, canary_percent=10)
+    registro.revisar(calentar=False)
+    carpeta = publicar(directorio, 'v2')
+    registro.revisar(calentar=False)
+    candidata = registro.candidato
+
+    shutil.rmtree(carpeta)
+    registro.revisar(calentar=False)
+
+    assert registro.candidato is None and candidata.motor is None
+    assert registro.activo.nombre == 'v1'
+
+
+def test_modo_archivo_unico_recarga_al_cambiar(tmp_path, cargador):
+    carpeta = publicar(str(tmp_path), 'unico', 'a')
+    registro = RegistroModelos(cargador, ruta_unica=carpeta,
+                               archivos_vigilados=[os.path.join(carpeta, 'version.txt')], intervalo=0)
+    registro.revisar(calentar=False)
+    registro.revisar(calentar=False)
+    assert registro.activo.version == 'a' and cargador.cargas == ['default']
+
+    publicar(str(tmp_path), 'unico', 'bb')
+    registro.revisar(calentar=False)
+
+    assert registro.activo.version == 'bb'
+    assert cargador.cargas == ['default', 'default']
+
+
+def test_warmup_pasa_lotes_por_el_motor(directorio, cargador):
+    publicar(directorio, 'v1')
+    registro = crear_registro(directorio, cargador, lotes_warmup=2)
+
+    registro.revisar()
+
+    assert registro.activo.motor.lotes == ['warmup', (1, MAX_SEQUENCE_LENGTH), (8, MAX_SEQUENCE_LENGTH)]
+
+
+def test_warmup_fallido_retira_la_version_sin_lanzar(directorio, cargador):
+    publicar(directorio, 'v1')
+    registro = crear_registro(directorio, cargador)
+    registro.revisar(calentar=False)
+    v1 = registro.activo
+
+    def fallar():
+        raise RuntimeError('sin memoria')
+    v1.motor.warmup = fallar
+    registro.calentar_cargados()
+
+    assert registro.activo is None and v1.motor is None
+    assert 'sin memoria' in registro.ultimo_error
+    # Queda como fallida: no se recarga antes de `reintento` segundos
+    registro.revisar(calentar=False)
+    assert registro.activo is None and cargador.cargas == ['v1']
+
+
+def test_warmup_con_motor_numpy(tmp_path):
+    exportar_bilstm(str(tmp_path / 'artefacto'))
+    motor = crear_motor('numpy', str(tmp_path / 'artefacto'), MAX_SEQUENCE_LENGTH)
+    modelo = ModeloCargado('v1', 'x', motor, tokenizer_de_prueba(), MAX_SEQUENCE_LENGTH)
+
+    modelo.calentar((4, 8, 16), lotes=3)
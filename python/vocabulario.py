@@ -0,0 +1,165 @@
+"""
+Vocabulario compacto y tokenizador de servicio
+
+Reemplaza al Tokenizer de Keras guardado en tokenizer.pickle en tiempo de
+servicio: solo se guardan las palabras con índice < num_words (las únicas que
+texts_to_sequences puede devolver) más el índice OOV, y la tokenización
+reproduce exactamente la de Keras sin importar TensorFlow.
+
+Exportar desde el pickle (no necesita Keras instalado):
+    python vocabulario.py --tokenizer tokenizer.pickle --output vocabulario.json
+"""
+
+import argparse
+import json
+import pickle
+import sys
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+VOCAB_FORMAT_VERSION = 1
+
+
+class _TokenizerPickle:
+    """
+    Sustituto vacío de keras...text.Tokenizer: al deserializar solo interesan
+    sus atributos (word_index, num_words, oov_token, filters, ...).
+    """
+
+
+class _UnpicklerSinKeras(pickle.Unpickler):
+    def find_class(self, module, name):
+        if name == 'Tokenizer' and module.split('.')[0] in ('keras', 'tensorflow', 'tf_keras', 'keras_preprocessing'):
+            return _TokenizerPickle
+        return super().find_class(module, name)
+
+
+def cargar_tokenizer_pickle(ruta: str):
+    """
+    Leer tokenizer.pickle sin importar Keras.
+    """
+    with open(ruta, 'rb') as handle:
+        return _UnpicklerSinKeras(handle).load()
+
+
+class CompactTokenizer:
+    def __init__(self, palabras: List[str], num_words: Optional[int], oov_index: Optional[int],
+                 filters: str, lower: bool = True, split: str = ' '):
+        """
+        palabras[i] es la palabra con índice i + 1, como en word_index de Keras.
+        """
+        self.palabras = palabras
+        self.num_words = num_words
+        self.oov_index = oov_index
+        self.filters = filters
+        self.lower = lower
+        self.split = split
+
+        self.word_index: Dict[str, int] = {palabra: i + 1 for i, palabra in enumerate(palabras)}
+        self._tabla = str.maketrans({caracter: split for caracter in filters})
+
+    @classmethod
+    def desde_tokenizer(cls, tokenizer) -> 'CompactTokenizer':
+        """
+        Construir a partir de un Tokenizer de Keras (o del sustituto del pickle).
+        """
+        num_words = tokenizer.num_words
+        limite = len(tokenizer.word_index) + 1
+        if num_words:
+            limite = min(limite, num_words)
+        palabras = [None] * (limite - 1)
+        for palabra, indice in tokenizer.word_index.items():
+            if indice < limite:
+                palabras[indice - 1] = palabra
+
+        oov_token = tokenizer.oov_token
+        oov_index = tokenizer.word_index.get(oov_token) if oov_token is not None else None
+        return cls(palabras, num_words, oov_index,
+                   filters=tokenizer.filters, lower=tokenizer.lower, split=tokenizer.split)
+
+    @classmethod
+    def desde_json(cls, ruta: str) -> 'CompactTokenizer':
+        with open(ruta, 'r', encoding='utf-8') as handle:
+            datos = json.load(handle)
+        if datos.get('format_version') != VOCAB_FORMAT_VERSION:
+            raise ValueError(f"Versión de vocabulario no soportada en {ruta}: {datos.get('format_version')}")
+        return cls(datos['words'], datos['num_words'], datos['oov_index'],
+                   filters=datos['filters'], lower=datos['lower'], split=datos['split'])
+
+    def guardar_json(self, ruta: str):
+        datos = {
+            'format_version': VOCAB_FORMAT_VERSION,
+            'num_words': self.num_words,
+            'oov_index': self.oov_index,
+            'filters': self.filters,
+            'lower': self.lower,
+            'split': self.split,
+            'words': self.palabras,
+        }
+        with open(ruta, 'w', encoding='utf-8') as handle:
+            json.dump(datos, handle, ensure_ascii=False, separators=(',', ':'))
+
+    def _palabras_de(self, texto: str) -> List[str]:
+        # Mismo proceso que text_to_word_sequence de Keras
+        if self.lower:
+            texto = texto.lower()
+        return [palabra for palabra in texto.translate(self._tabla).split(self.split) if palabra]
+
+    def texts_to_sequences(self, textos: Iterable[str]) -> List[List[int]]:
+        """
+        Misma salida que Tokenizer.texts_to_sequences de Keras.
+        """
+        indices = self.word_index
+        oov = self.oov_index
+        secuencias = []
+        for texto in textos:
+            if oov is None:
+                secuencia = [indices[p] for p in self._palabras_de(texto) if p in indices]
+            else:
+                secuencia = [indices.get(p, oov) for p in self._palabras_de(texto)]
+            secuencias.append(secuencia)
+        return secuencias
+
+    def texts_to_matrix_int32(self, textos: Iterable[str], maxlen: int) -> np.ndarray:
+        """
+        Tokenizar y aplicar padding al inicio en un solo paso (matriz int32).
+        """
+        from inference import aplicar_padding
+        return aplicar_padding(self.texts_to_sequences(textos), maxlen)
+
+
+def cargar_tokenizer(ruta_vocabulario: str, ruta_pickle: str = None) -> CompactTokenizer:
+    """
+    Cargar el vocabulario compacto; si no existe, convertir el pickle en memoria.
+    """
+    try:
+        return CompactTokenizer.desde_json(ruta_vocabulario)
+    except FileNotFoundError:
+        if not ruta_pickle:
+            raise
+        return CompactTokenizer.desde_tokenizer(cargar_tokenizer_pickle(ruta_pickle))
+
+
+def exportar_vocabulario(tokenizer, ruta_salida: str) -> CompactTokenizer:
+    """
+    Guardar el vocabulario compacto de un Tokenizer de Keras.
+    """
+    compacto = CompactTokenizer.desde_tokenizer(tokenizer)
+    compacto.guardar_json(ruta_salida)
+    return compacto
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Exportar el vocabulario compacto desde tokenizer.pickle")
+    parser.add_argument('--tokenizer', default='tokenizer.pickle')
+    parser.add_argument('--output', default='vocabulario.json')
+    args = parser.parse_args()
+
+    compacto = exportar_vocabulario(cargar_tokenizer_pickle(args.tokenizer), args.output)
+    print(f"✅ Vocabulario exportado: {args.output} ({len(compacto.palabras):,} palabras, OOV={compacto.oov_index})")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())